@@ -1,184 +1,32 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+import argparse
+import gzip
+import os
 import re
 import json
+import sys
+import threading
+import time
+
+from catalog import Catalog, CatalogSource
+from optimizer import optimize_operator_graph, CostModel
+from table_stats import Statistics, analyze_columnar, analyze_sqlite
+from executor import Database, ExecutionError, EXECUTION_MODES, execute_graph
+from sql_parser import (
+    tokenize, parse, format_predicate, format_sort_keys, ParseError, SelectStmt, is_keyword,
+    KEYWORD, IDENT, QUALIFIED, NUMBER, OPERATOR, LPAREN, RPAREN, SEMICOLON,
+    LOGICAL_OPERATORS, COMPARISON_OPERATORS, OPERAND_KINDS,
+)
 
 app = Flask(__name__)
 
-
-def optimize_operator_graph(graph: dict) -> dict:
-    """Aplica heurísticas simples de otimização (HU4) sobre um grafo de operadores.
-
-    Heurísticas aplicadas:
-    - Push-down de seleções que referenciam uma única tabela (aplicar antes de junções)
-    - Push-down de projeções: inserir projeções próximas aos SCANs para reduzir atributos
-    - Evitar produto cartesiano sempre que possível (não cria novos joins, apenas tenta
-      garantir que seleções/projeções sejam aplicadas antes)
-
-    Observação: este otimizador usa heurísticas estáticas e não estatísticas.
-    """
-    # Cópia defensiva
-    nodes = [dict(n) for n in graph.get('nodes', [])]
-    edges = [dict(e) for e in graph.get('edges', [])]
-
-    id_node = {n['id']: n for n in nodes}
-
-    # Construir mapas de adjacência (direção: child -> parent)
-    parents = {n['id']: [] for n in nodes}
-    children = {n['id']: [] for n in nodes}
-    for e in edges:
-        children[e['from']].append(e['to'])
-        parents[e['to']].append(e['from'])
-
-    def remove_edge(fr, to):
-        nonlocal edges, parents, children
-        edges = [e for e in edges if not (e['from'] == fr and e['to'] == to)]
-        if to in parents and fr in parents[to]:
-            parents[to].remove(fr)
-        if fr in children and to in children[fr]:
-            children[fr].remove(to)
-
-    def add_edge(fr, to):
-        nonlocal edges, parents, children
-        edges.append({'from': fr, 'to': to})
-        if to not in parents:
-            parents[to] = []
-        if fr not in children:
-            children[fr] = []
-        if fr not in parents[to]:
-            parents[to].append(fr)
-        if to not in children[fr]:
-            children[fr].append(to)
-
-    # Helper: extrai tabelas referenciadas de um predicado (padrão alias.col ou table.col)
-    def referenced_tables_from_pred(pred: str):
-        if not pred:
-            return set()
-        toks = re.findall(r"(\w+)\.\w+", pred)
-        return set(toks)
-
-    # 1) Push-down de seleções que referenciam uma única tabela
-    selection_nodes = [n for n in nodes if n['type'] == 'SELECTION']
-    for sel in selection_nodes:
-        sel_id = sel['id']
-        cond = sel['details'].get('condition') if sel['details'] else None
-        refs = referenced_tables_from_pred(cond or '')
-
-        # somente quando a seleção refere-se a uma tabela específica
-        if len(refs) == 1:
-            target_label = list(refs)[0]
-            # encontrar scan correspondente (label pode ser alias ou nome)
-            scan_nodes = [n for n in nodes if n['type'] == 'SCAN' and n['label'] == target_label]
-            if not scan_nodes:
-                # talvez o label seja o nome real da tabela
-                scan_nodes = [n for n in nodes if n['type'] == 'SCAN' and n['details'].get('table') == target_label]
-            if not scan_nodes:
-                continue
-            scan = scan_nodes[0]
-
-            # encontrar o operador que atualmente alimenta a seleção (deveria existir)
-            in_parents = parents.get(sel_id, [])
-            out_children = children.get(sel_id, [])
-            # normalmente há apenas um parent (por exemplo, um JOIN ou CROSS_PRODUCT)
-            if not in_parents:
-                continue
-            current_input = in_parents[0]
-
-            # Se o scan já alimenta diretamente a seleção, nada a fazer
-            if scan['id'] in in_parents:
-                continue
-
-            # Remover ligação atual: current_input -> sel
-            remove_edge(current_input, sel_id)
-
-            # Remover ligação scan -> current_input (vamos inserir sel entre eles)
-            # Só remover se existir explicitamente
-            if scan['id'] in parents.get(current_input, []):
-                remove_edge(scan['id'], current_input)
-
-            # Conectar: scan -> sel -> current_input
-            add_edge(scan['id'], sel_id)
-            add_edge(sel_id, current_input)
-
-            # Rewire: se havia saída da seleção para um pai (ex: PROJECTION), conectar current_input -> that parent
-            for p in out_children:
-                # remover sel -> p e adicionar current_input -> p (já foi sel->p removido ao remover edge?)
-                remove_edge(sel_id, p)
-                # evitar duplicar arestas
-                if current_input not in parents.get(p, []):
-                    add_edge(current_input, p)
-
-    # 2) Push-down de projeções: para cada PROJECTION raiz, tentar inserir projeções locais nos SCANs
-    projection_nodes = [n for n in nodes if n['type'] == 'PROJECTION']
-    # identificar raiz projection (por id=graph['root'])
-    root_id = graph.get('root')
-    root_proj = next((n for n in projection_nodes if n['id'] == root_id), None)
-    if root_proj and root_proj['details']:
-        # atributos solicitados na projeção final
-        attrs_raw = root_proj['details'].get('attributes', '')
-        try:
-            proj_attrs = [a.strip() for a in re.split(r',', attrs_raw) if a.strip()]
-        except Exception:
-            proj_attrs = []
-
-        # coletar atributos necessários para junções (para não projetar fora atributos de join)
-        join_nodes = [n for n in nodes if n['type'] in ('JOIN', 'CROSS_PRODUCT')]
-        join_needed = {}
-        for j in join_nodes:
-            cond = j['details'].get('condition') if j['details'] else ''
-            refs = re.findall(r"(\w+)\.(\w+)", cond or '')
-            for table, col in refs:
-                join_needed.setdefault(table, set()).add(col)
-
-        # Para cada SCAN, criar projeção local contendo os atributos necessários
-        for scan in [n for n in nodes if n['type'] == 'SCAN']:
-            label = scan['label']
-            # atributos do root_proj que pertencem a este scan
-            local_attrs = []
-            for a in proj_attrs:
-                m = re.match(r"(\w+)\.(\w+)$", a)
-                if m and m.group(1) == label:
-                    local_attrs.append(a)
-
-            # incluir atributos necessários para join
-            needed = join_needed.get(label, set())
-            for col in needed:
-                qual = f"{label}.{col}"
-                if qual not in local_attrs:
-                    local_attrs.append(qual)
-
-            # Se houver atributos locais a projetar e não for *
-            if local_attrs and not (len(proj_attrs) == 1 and proj_attrs[0] == '*'):
-                # criar nó de projeção local
-                new_proj = {
-                    'id': max(id_node.keys()) + 1,
-                    'type': 'PROJECTION',
-                    'label': 'π',
-                    'details': {'attributes': ','.join(local_attrs)}
-                }
-                # atualizar mapas
-                nodes.append(new_proj)
-                id_node[new_proj['id']] = new_proj
-                parents[new_proj['id']] = []
-                children[new_proj['id']] = []
-
-                # reconectar: todas as arestas scan -> X passam a ser new_proj -> X
-                out_edges = list(children.get(scan['id'], []))
-                for dest in out_edges:
-                    # remover scan->dest
-                    remove_edge(scan['id'], dest)
-                    # adicionar new_proj->dest
-                    add_edge(new_proj['id'], dest)
-
-                # adicionar scan->new_proj
-                add_edge(scan['id'], new_proj['id'])
-
-    # Recomputar estrutura final e identificar novo root (manter mesmo root se possível)
-    optimized = {
-        'nodes': nodes,
-        'edges': edges,
-        'root': graph.get('root')
-    }
-    return optimized
+# Sequência de três ou mais símbolos de comparação (ex.: "===", "<=>")
+_REPEATED_OPERATOR = re.compile(r'[=<>]{3,}')
+_WHITESPACE = re.compile(r'\s+')
 
 
 def generate_execution_plan(graph: dict) -> list:
@@ -205,10 +53,10 @@ def generate_execution_plan(graph: dict) -> list:
             children[e['from']].append(e['to'])
 
     # Kahn's algorithm para topo sort (nodes com in_deg 0 primeiro)
-    queue = [nid for nid, deg in in_deg.items() if deg == 0]
+    queue = deque(nid for nid, deg in in_deg.items() if deg == 0)
     ordered = []
     while queue:
-        nid = queue.pop(0)
+        nid = queue.popleft()
         ordered.append(nid)
         for ch in children.get(nid, []):
             in_deg[ch] -= 1
@@ -216,7 +64,8 @@ def generate_execution_plan(graph: dict) -> list:
                 queue.append(ch)
 
     # Se houver ciclo ou nós não processados, inclua-os no final
-    remaining = [nid for nid in nodes if nid not in ordered]
+    seen = set(ordered)
+    remaining = [nid for nid in nodes if nid not in seen]
     ordered.extend(remaining)
 
     # Converter em passos legíveis
@@ -239,10 +88,24 @@ def generate_execution_plan(graph: dict) -> list:
         elif t == 'JOIN':
             cond = n.get('details', {}).get('condition')
             desc = f"JOIN cond={cond}"
+            if n.get('details', {}).get('algorithm') == 'hash':
+                side = 'esquerda' if n['details'].get('build') == 'left' else 'direita'
+                relations = ', '.join(n['details'].get('build_relations', []))
+                desc += f" [hash join, construção: {side} ({relations})]"
+            elif n.get('details', {}).get('algorithm') == 'merge':
+                desc += f" [merge join: {' = '.join(n['details'].get('merge_keys', []))}]"
+        elif t == 'SORT':
+            keys = n.get('details', {}).get('keys')
+            desc = f"SORT chaves={keys}"
+            if n.get('details', {}).get('presorted'):
+                desc += " [entrada já ordenada]"
         elif t == 'CROSS_PRODUCT':
             left = n.get('details', {}).get('left')
             right = n.get('details', {}).get('right')
             desc = f"CROSS_PRODUCT {left} × {right}"
+        elif t == 'EMPTY':
+            reason = n.get('details', {}).get('reason')
+            desc = f"EMPTY (nenhuma linha: {reason} é contraditório)"
         else:
             desc = f"{t}"
 
@@ -266,332 +129,395 @@ METADATA = {
                            'quantidade', 'precounitario']
 }
 
+class ValidationContext:
+    """Estado de uma única validação: consulta normalizada, tokens, AST e mapa de aliases.
+
+    É criado a cada chamada de SQLValidator.validate, o que permite compartilhar
+    o mesmo validador entre threads.
+    """
+    __slots__ = ('query', 'tokens', 'statement', 'aliases', 'relations')
+
+    def __init__(self, query='', tokens=None, statement=None, aliases=None):
+        self.query = query
+        self.tokens = tokens
+        self.statement = statement
+        self.aliases = aliases if aliases is not None else {}
+        # label (alias ou nome) -> tabela, para resolver atributos não qualificados
+        self.relations = {}
+
+
 class SQLValidator:
-    """Validador de consultas SQL conforme HU1"""
+    """Validador de consultas SQL conforme HU1.
+
+    Não guarda estado por consulta (ver ValidationContext): uma única instância
+    por esquema pode ser reutilizada por todas as requisições e threads.
+    """
+
+    valid_keywords = frozenset(['select', 'from', 'where', 'inner', 'join', 'on', 'and', 'or',
+                                'order', 'by', 'asc', 'desc'])
+    valid_operators = COMPARISON_OPERATORS
     
-    def __init__(self, metadata):
+    def __init__(self, metadata, statistics: Statistics | None = None):
+        """`metadata` pode ser o dicionário tabela -> atributos ou um Catalog já construído;
+        `statistics` alimenta o modelo de custo do otimizador"""
         self.metadata = metadata
-        self.valid_keywords = ['select', 'from', 'where', 'join', 'on', 'and', 'or']
-        self.valid_operators = ['=', '>', '<', '<=', '>=', '<>']
-        self.table_aliases = {}
+        self.catalog = metadata if isinstance(metadata, Catalog) else Catalog.from_metadata(metadata)
+        self.cost_model = CostModel(self.catalog, statistics)
         
     def normalize_query(self, query):
         """Remove espaços extras, normaliza e converte tudo para minúsculas"""
-        query = re.sub(r'\s+', ' ', query.strip())
-        query = query.lower()
-        return query
+        return _WHITESPACE.sub(' ', query.strip()).lower()
     
-    def validate_syntax(self, query):
-        """Valida a sintaxe básica da consulta SQL"""
+    def validate_syntax(self, query, tokens=None):
+        """Valida a sintaxe básica da consulta SQL.
+
+        Todas as verificações são feitas sobre a lista de tokens produzida pelo
+        lexer (uma única passada sobre a consulta). Se `tokens` não for
+        informado, a consulta é tokenizada aqui.
+        """
         errors = []
         warnings = []
 
-        if not query.startswith('select'):
+        if tokens is None:
+            tokens = tokenize(query)
+
+        # Uma passada sobre os tokens para localizar as cláusulas
+        join_positions = []
+        on_positions = []
+        where_pos = None
+        has_from = False
+        open_parens = close_parens = 0
+        for i, tok in enumerate(tokens):
+            kind = tok.kind
+            if kind == KEYWORD:
+                word = tok.value
+                if word == 'join':
+                    join_positions.append(i)
+                elif word == 'on':
+                    on_positions.append(i)
+                elif word == 'from':
+                    has_from = True
+                elif word == 'where' and where_pos is None:
+                    where_pos = i
+            elif kind == LPAREN:
+                open_parens += 1
+            elif kind == RPAREN:
+                close_parens += 1
+
+        if not tokens or not is_keyword(tokens[0], 'select'):
             errors.append('A consulta deve começar com SELECT')
             
-        if 'from' not in query:
+        if not has_from:
             errors.append('A consulta deve conter a cláusula FROM')
 
-        if query.count('(') != query.count(')'):
+        if open_parens != close_parens:
             errors.append('Parênteses não estão balanceados')
 
         # Verificação dos JOINs
-        if 'join' in query:
-            join_count = len(re.findall(r'\bjoin\b', query))
-            on_count = len(re.findall(r'\bon\b', query))
-            
-            if join_count > on_count:
+        if join_positions:
+            if len(join_positions) > len(on_positions):
                 errors.append('Toda cláusula JOIN deve ter uma condição ON correspondente')
-            elif on_count > join_count:
+            elif len(on_positions) > len(join_positions):
                 errors.append('Cláusula ON encontrada sem JOIN correspondente')
             
-            # Verificar se ON vem depois de JOIN
-            join_positions = [m.start() for m in re.finditer(r'\bjoin\b', query)]
-            on_positions = [m.start() for m in re.finditer(r'\bon\b', query)]
-            
+            # Verificar se ON vem depois de JOIN: basta comparar com o último ON
+            last_on = on_positions[-1] if on_positions else -1
             for join_pos in join_positions:
-                # Deve haver pelo menos um ON depois deste JOIN
-                if not any(on_pos > join_pos for on_pos in on_positions):
+                if join_pos > last_on:
                     errors.append('JOIN sem condição ON subsequente')
-        elif re.search(r'\bon\b', query) and not re.search(r'\bjoin\b', query):
+        elif on_positions:
             errors.append('Cláusula ON encontrada sem JOIN correspondente')
         
         # Validar operadores lógicos no WHERE
-        if 'where' in query:
-            where_clause = self._extract_where_clause(query)
-            if where_clause:
+        if where_pos is not None:
+            where_tokens = self._extract_where_tokens(tokens, where_pos)
+            if where_tokens:
                 # Verificar AND/OR isolados ou no início/fim
-                if re.search(r'\b(and|or)\s*$', where_clause, re.IGNORECASE):
+                if where_tokens[-1].value in LOGICAL_OPERATORS and where_tokens[-1].kind == KEYWORD:
                     errors.append('Operador lógico (AND/OR) incompleto no final da cláusula WHERE')
                 
-                if re.search(r'^\s*(and|or)\b', where_clause, re.IGNORECASE):
+                if where_tokens[0].value in LOGICAL_OPERATORS and where_tokens[0].kind == KEYWORD:
                     errors.append('Operador lógico (AND/OR) no início da cláusula WHERE')
                 
-                # Verificar operadores lógicos duplicados (AND AND, OR OR, AND OR AND, etc)
-                if re.search(r'\b(and|or)\s+(and|or)\b', where_clause, re.IGNORECASE):
+                comparison_count = 0
+                logical_ops_count = 0
+                has_operator = False
+                consecutive_logical = False
+                previous_logical = False
+                last = len(where_tokens) - 1
+                for i, tok in enumerate(where_tokens):
+                    logical = tok.kind == KEYWORD and tok.value in LOGICAL_OPERATORS
+                    if logical:
+                        logical_ops_count += 1
+                        # Operadores lógicos duplicados (AND AND, OR OR, AND OR, etc)
+                        if previous_logical:
+                            consecutive_logical = True
+                    elif tok.kind == OPERATOR:
+                        has_operator = True
+                        if (0 < i < last and where_tokens[i - 1].kind in OPERAND_KINDS
+                                and where_tokens[i + 1].kind in OPERAND_KINDS):
+                            comparison_count += 1
+                    previous_logical = logical
+
+                if consecutive_logical:
                     errors.append('Operadores lógicos (AND/OR) consecutivos sem condição entre eles')
                 
                 # Verificar se há operadores de comparação válidos
-                if not re.search(r'[=<>]|<=|>=|<>', where_clause):
+                if not has_operator:
                     errors.append('Cláusula WHERE sem operador de comparação válido')
                 
                 # Verificar se há múltiplas condições sem operadores lógicos
                 # Exemplo: "campo1 = 1 campo2 = 2" (faltando AND/OR)
-                comparison_count = len(re.findall(r'\w+\s*[=<>]+\s*[\w\'\"]+', where_clause))
-                logical_ops_count = len(re.findall(r'\b(and|or)\b', where_clause, re.IGNORECASE))
-                
                 # Se tem mais de uma comparação, deve ter pelo menos (n-1) operadores lógicos
                 if comparison_count > 1 and logical_ops_count < comparison_count - 1:
                     errors.append('Múltiplas condições no WHERE sem operadores lógicos (AND/OR) entre elas')
                 
                 # Validar cada condição individualmente
-                self._validate_where_conditions(where_clause, errors)
+                self._validate_where_conditions(where_tokens, errors)
         
         # Validar condições no ON (para JOINs)
-        if 'on' in query and 'join' in query:
-            on_clauses = self._extract_on_clauses(query)
-            for on_clause in on_clauses:
+        if join_positions and on_positions:
+            for on_clause in self._extract_on_clauses(tokens, on_positions):
                 self._validate_on_condition(on_clause, errors)
         
         # Validar operadores de comparação completos
-        # Procurar por operadores seguidos de ponto-e-vírgula ou fim sem valor
-        if re.search(r'[=<>]\s*;?\s*$', query):
+        # Procurar por operador seguido de ponto-e-vírgula ou fim sem valor
+        tail = len(tokens) - 1
+        while tail >= 0 and tokens[tail].kind == SEMICOLON:
+            tail -= 1
+        if tail >= 0 and tokens[tail].kind == OPERATOR:
             errors.append('Operador de comparação incompleto (sem valor após o operador)')
         
         # Verificar se há múltiplos operadores de comparação juntos
-        if re.search(r'[=<>]{3,}', query):
+        if any(tok.kind == OPERATOR and _REPEATED_OPERATOR.search(tok.value) for tok in tokens):
             errors.append('Operadores de comparação inválidos ou repetidos')
             
         return errors, warnings
     
-    def _extract_where_clause(self, query):
-        """Extrai a cláusula WHERE da query"""
-        where_match = re.search(r'where\s+(.+?)(?:$|;)', query, re.IGNORECASE)
-        if where_match:
-            return where_match.group(1).strip()
-        return None
+    def _extract_where_tokens(self, tokens, where_pos):
+        """Extrai os tokens da cláusula WHERE (até FROM, JOIN, ORDER BY, ponto-e-vírgula ou fim)"""
+        end = where_pos + 1
+        total = len(tokens)
+        while end < total:
+            tok = tokens[end]
+            if tok.kind == SEMICOLON or is_keyword(tok, 'from', 'inner', 'join', 'order'):
+                break
+            end += 1
+        return tokens[where_pos + 1:end]
     
-    def _validate_where_conditions(self, where_clause, errors):
+    def _validate_where_conditions(self, where_tokens, errors):
         """Valida as condições individuais no WHERE"""
-        # Remover parênteses para facilitar análise
-        where_clean = re.sub(r'[()]', ' ', where_clause)
-        
-        # Dividir por AND e OR para pegar cada condição
-        conditions = re.split(r'\b(and|or)\b', where_clean, flags=re.IGNORECASE)
-        
-        for i, part in enumerate(conditions):
-            part = part.strip()
-            # Pular os próprios operadores AND/OR
-            if part.lower() in ['and', 'or', '']:
-                continue
-            
-            # Verificar se a condição tem um operador de comparação
-            has_operator = re.search(r'[=<>]|<=|>=|<>', part)
-            
-            if has_operator:
-                # Verificar se há algo antes e depois do operador
-                # Padrão esperado: atributo operador valor
-                # Exemplo: cliente.nome = 'joão' ou idcliente > 1
-                
-                # Verificar operador sem valor à direita
-                if re.search(r'[=<>]+\s*$', part):
-                    errors.append(f"Condição incompleta: operador sem valor à direita")
-                    continue
-                
-                # Verificar operador sem atributo à esquerda  
-                if re.search(r'^\s*[=<>]', part):
-                    errors.append(f"Condição incompleta: operador sem atributo à esquerda")
-                    continue
-                
-                # Verificar padrão completo: algo operador algo
-                # Deve ter pelo menos: palavra/ponto operador palavra/número/string
-                pattern = r'[\w.]+\s*(?:=|<>|<=|>=|<|>)\s*[\w.\'\"-]+'
-                if not re.search(pattern, part):
-                    # Pode ser que tenha operador mas falta valor ou atributo
-                    if '=' in part or '<' in part or '>' in part:
-                        errors.append(f"Condição malformada no WHERE")
-            else:
-                # Condição sem operador de comparação
-                # Pode ser um erro, a menos que seja uma subcondição válida
-                if part and not part.isspace():
-                    # Verificar se não é apenas espaços em branco
-                    if len(part.strip()) > 0:
-                        errors.append(f"Condição sem operador de comparação no WHERE")
+        # Ignorar parênteses e dividir por AND e OR para pegar cada condição
+        part = []
+        for tok in where_tokens:
+            if tok.kind == KEYWORD and tok.value in LOGICAL_OPERATORS:
+                self._validate_where_condition(part, errors)
+                part = []
+            elif tok.kind not in (LPAREN, RPAREN):
+                part.append(tok)
+        self._validate_where_condition(part, errors)
+
+    def _validate_where_condition(self, part, errors):
+        """Valida uma condição do WHERE (padrão esperado: atributo operador valor)"""
+        if not part:
+            return
+
+        operator_positions = [i for i, tok in enumerate(part) if tok.kind == OPERATOR]
+        if not operator_positions:
+            # Condição sem operador de comparação
+            errors.append("Condição sem operador de comparação no WHERE")
+            return
+
+        # Verificar operador sem valor à direita
+        if part[-1].kind == OPERATOR:
+            errors.append("Condição incompleta: operador sem valor à direita")
+            return
+
+        # Verificar operador sem atributo à esquerda
+        if part[0].kind == OPERATOR:
+            errors.append("Condição incompleta: operador sem atributo à esquerda")
+            return
+
+        # Verificar padrão completo: atributo/valor operador atributo/número/string
+        if not any(
+            part[i].value in COMPARISON_OPERATORS
+            and part[i - 1].kind in (IDENT, QUALIFIED, NUMBER)
+            and part[i + 1].kind in OPERAND_KINDS
+            for i in operator_positions
+        ):
+            errors.append("Condição malformada no WHERE")
     
     def _validate_on_condition(self, on_clause, errors):
-        """Valida a condição de um JOIN ON"""
-        on_clause = on_clause.strip()
-        
+        """Valida a condição (lista de tokens) de um JOIN ON"""
         if not on_clause:
             return
         
+        operator_positions = [i for i, tok in enumerate(on_clause) if tok.kind == OPERATOR]
+
         # Deve ter um operador de comparação (geralmente =)
-        if not re.search(r'[=<>]|<=|>=|<>', on_clause):
-            errors.append(f"Cláusula ON sem operador de comparação")
+        if not operator_positions:
+            errors.append("Cláusula ON sem operador de comparação")
             return
         
         # Verificar operador sem valor à direita
-        if re.search(r'[=<>]+\s*$', on_clause):
-            errors.append(f"Cláusula ON incompleta: operador sem valor à direita")
+        if on_clause[-1].kind == OPERATOR:
+            errors.append("Cláusula ON incompleta: operador sem valor à direita")
             return
         
         # Verificar operador sem atributo à esquerda
-        if re.search(r'^\s*[=<>]', on_clause):
-            errors.append(f"Cláusula ON incompleta: operador sem atributo à esquerda")
+        if on_clause[0].kind == OPERATOR:
+            errors.append("Cláusula ON incompleta: operador sem atributo à esquerda")
             return
         
         # Verificar padrão completo: tabela.campo = tabela.campo
-        if not re.search(r'[\w.]+\s*=\s*[\w.]+', on_clause):
-            errors.append(f"Cláusula ON malformada")
+        operand_kinds = (IDENT, QUALIFIED, NUMBER)
+        if not any(
+            on_clause[i].value == '='
+            and on_clause[i - 1].kind in operand_kinds
+            and on_clause[i + 1].kind in operand_kinds
+            for i in operator_positions
+        ):
+            errors.append("Cláusula ON malformada")
     
-    def _extract_on_clauses(self, query):
-        """Extrai todas as cláusulas ON da query"""
+    def _extract_on_clauses(self, tokens, on_positions):
+        """Extrai os tokens de cada cláusula ON (até WHERE, outro JOIN, ORDER BY, ponto-e-vírgula ou fim)"""
         on_clauses = []
-        # Padrão: ON ... (até encontrar WHERE, outro JOIN, ou fim)
-        on_matches = re.finditer(r'on\s+(.+?)(?:\s+where|\s+join|$)', query, re.IGNORECASE)
-        for match in on_matches:
-            on_clauses.append(match.group(1).strip())
+        total = len(tokens)
+        for pos in on_positions:
+            end = pos + 1
+            while end < total:
+                tok = tokens[end]
+                if tok.kind == SEMICOLON or is_keyword(tok, 'where', 'inner', 'join', 'on', 'order'):
+                    break
+                end += 1
+            on_clauses.append(tokens[pos + 1:end])
         return on_clauses
     
     def extract_tables(self, query):
         """Extrai as tabelas da consulta (FROM e JOIN) - mantido para compatibilidade"""
         return self.extract_tables_and_aliases(query)
     
-    def extract_tables_and_aliases(self, query):
-        """Extrai as tabelas e seus aliases da consulta (FROM e JOIN)"""
-        tables = []
-        self.table_aliases = {}
-        
-        # Extrair tabelas do FROM - suporta alias
-        # Padrão: FROM Tabela [alias] ou FROM Tabela alias
-        from_pattern = r'from\s+([\w\s,]+?)(?:\s+where|\s+join|$)'
-        from_match = re.search(from_pattern, query, re.IGNORECASE)
-        
-        if from_match:
-            table_list = from_match.group(1)
-            for table_expr in table_list.split(','):
-                table_expr = table_expr.strip()
-                # Dividir em partes (pode ser "Tabela alias" ou só "Tabela")
-                parts = table_expr.split()
-                if len(parts) >= 2:
-                    table_name = parts[0]
-                    alias = parts[1]
-                    tables.append(table_name)
-                    self.table_aliases[alias] = table_name
-                elif len(parts) == 1:
-                    table_name = parts[0]
-                    tables.append(table_name)
-        
-        # Extrair tabelas dos JOINs - suporta alias
-        # Padrão: JOIN Tabela [alias] ON
-        join_pattern = r'join\s+([\w]+)(?:\s+(\w+))?\s+on'
-        join_matches = re.finditer(join_pattern, query, re.IGNORECASE)
-        
-        for match in join_matches:
-            table_name = match.group(1)
-            alias = match.group(2)
-            tables.append(table_name)
-            if alias:
-                self.table_aliases[alias] = table_name
-            
-        return list(set(tables))
+    def extract_tables_and_aliases(self, query, context=None):
+        """Extrai as tabelas e seus aliases da consulta (FROM e JOIN).
+
+        Aceita a consulta normalizada ou a AST (SelectStmt) já construída; se um
+        ValidationContext for informado, o mapa de aliases é registrado nele.
+        """
+        stmt = _as_statement(query)
+        if context is not None:
+            context.aliases = stmt.aliases
+            context.relations = {t.label: t.name for t in stmt.tables}
+        # remover duplicatas preservando a ordem em que aparecem
+        return list(dict.fromkeys(t.name for t in stmt.tables))
     
     def validate_tables(self, tables):
         """Valida se as tabelas existem no modelo"""
         errors = []
         
         for table in tables:
-            if table not in self.metadata:
+            if table not in self.catalog:
                 errors.append(f"Tabela '{table}' não existe no modelo")
                 
         return errors
     
     def extract_attributes(self, query):
-        """Extrai os atributos da cláusula SELECT e WHERE"""
+        """Extrai os atributos (qualificados ou não) das cláusulas SELECT, WHERE, ON e ORDER BY.
+
+        Aceita a consulta normalizada ou a AST (SelectStmt) já construída.
+        """
+        stmt = _as_statement(query)
         attributes = []
         
-        select_pattern = r'select\s+(.*?)\s+from'
-        select_match = re.search(select_pattern, query, re.IGNORECASE)
-        
-        if select_match:
-            select_clause = select_match.group(1)
-            if select_clause.strip() != '*':
-                for attr in select_clause.split(','):
-                    attr = re.sub(r'\s+as\s+\w+', '', attr, flags=re.IGNORECASE)
-                    attr = attr.strip()
-                    if '.' in attr:
-                        attributes.append(attr)
-        
-        where_pattern = r'where\s+(.*?)(?:$|\s+order|\s+group)'
-        where_match = re.search(where_pattern, query, re.IGNORECASE)
-        
-        if where_match:
-            where_clause = where_match.group(1)
-            attr_pattern = r'(\w+\.\w+)'
-            attr_matches = re.finditer(attr_pattern, where_clause)
-            for match in attr_matches:
-                attributes.append(match.group(1))
-        
-        on_pattern = r'on\s+([\w.]+)\s*=\s*([\w.]+)'
-        on_matches = re.finditer(on_pattern, query, re.IGNORECASE)
-        
-        for match in on_matches:
-            attributes.append(match.group(1))
-            attributes.append(match.group(2))
+        if not stmt.is_star:
+            for item in stmt.items:
+                if item.column is not None:
+                    attributes.append(item.column.qualified)
+        
+        if stmt.where is not None:
+            attributes.extend(c.qualified for c in stmt.where.columns())
+        
+        for join in stmt.joins:
+            attributes.extend(c.qualified for c in join.condition.columns())
+
+        attributes.extend(key.column.qualified for key in stmt.order_by)
             
         return attributes
     
-    def resolve_table_name(self, table_or_alias):
+    def resolve_table_name(self, table_or_alias, context=None):
         """Resolve um alias para o nome real da tabela, ou retorna o próprio nome se não for alias"""
-        if table_or_alias in self.table_aliases:
-            return self.table_aliases[table_or_alias]
+        if context is not None:
+            return context.aliases.get(table_or_alias, table_or_alias)
         return table_or_alias
     
-    def validate_attributes(self, attributes):
-        """Valida se os atributos existem nas tabelas"""
+    def validate_attributes(self, attributes, context=None):
+        """Valida se os atributos existem nas tabelas (aliases resolvidos pelo contexto).
+
+        Atributos não qualificados são resolvidos pelo índice reverso do catálogo
+        entre as tabelas da consulta (exige o contexto); ausência ou ambiguidade
+        geram erro.
+        """
         errors = []
+        catalog = self.catalog
         
         for attr in attributes:
             if '.' in attr:
                 table_or_alias, field = attr.split('.')
-                table = self.resolve_table_name(table_or_alias)
+                table = self.resolve_table_name(table_or_alias, context)
                 
-                if table in self.metadata:
-                    if field not in self.metadata[table]:
+                if table in catalog:
+                    if not catalog.has_column(table, field):
                         errors.append(f"Atributo '{field}' não existe na tabela '{table}'")
                 else:
                     errors.append(f"Tabela '{table}' não encontrada para validar atributo '{field}'")
+            elif context is not None and context.relations:
+                # ignorar relações inexistentes (já reportadas por validate_tables)
+                if not all(t in catalog for t in context.relations.values()):
+                    continue
+                owners = catalog.resolve_column(attr, context.relations)
+                if not owners:
+                    errors.append(f"Atributo '{attr}' não existe em nenhuma tabela da consulta")
+                elif len(owners) > 1:
+                    errors.append(f"Atributo '{attr}' é ambíguo (presente em: {', '.join(owners)})")
                     
         return errors
     
-    def validate_operators(self, query):
+    def validate_operators(self, query, tokens=None):
         """Valida se os operadores são válidos"""
         errors = []
         
-        operator_pattern = r'[=<>!]+|and|or'
-        operators = re.findall(operator_pattern, query, re.IGNORECASE)
-        
-        for op in operators:
-            op_lower = op.lower()
-            if op_lower not in self.valid_operators and op_lower not in ['and', 'or']:
-                if op not in self.valid_operators:
-                    errors.append(f"Operador '{op}' não é válido")
+        if tokens is None:
+            tokens = tokenize(query)
+
+        for tok in tokens:
+            if tok.kind == OPERATOR and tok.value not in self.valid_operators:
+                errors.append(f"Operador '{tok.value}' não é válido")
                     
         return errors
     
     def validate(self, query):
         """Valida a consulta SQL completa"""
         normalized_query = self.normalize_query(query)
+        tokens = tokenize(normalized_query)
+        context = ValidationContext(normalized_query, tokens)
         
         all_errors = []
         all_warnings = []
         
         # 1. Validar sintaxe básica
-        syntax_errors, syntax_warnings = self.validate_syntax(normalized_query)
+        syntax_errors, syntax_warnings = self.validate_syntax(normalized_query, tokens)
         all_errors.extend(syntax_errors)
         all_warnings.extend(syntax_warnings)
         
-        if syntax_errors:
+        # 2. Construir a AST uma única vez; todas as etapas seguintes a consomem
+        if not syntax_errors:
+            try:
+                stmt = context.statement = parse(normalized_query, tokens)
+            except ParseError as e:
+                all_errors.append(f"Erro de sintaxe: {e}")
+            except RecursionError:
+                all_errors.append("Erro de sintaxe: consulta aninhada demais")
+
+        if all_errors:
             return {
                 'valid': False,
                 'errors': all_errors,
@@ -599,18 +525,18 @@ class SQLValidator:
                 'query': normalized_query
             }
         
-        # 2. Validar tabelas e extrair aliases
-        tables = self.extract_tables_and_aliases(normalized_query)
+        # 3. Validar tabelas e extrair aliases
+        tables = self.extract_tables_and_aliases(stmt, context)
         table_errors = self.validate_tables(tables)
         all_errors.extend(table_errors)
         
-        # 3. Validar atributos (agora com suporte a aliases)
-        attributes = self.extract_attributes(normalized_query)
-        attr_errors = self.validate_attributes(attributes)
+        # 4. Validar atributos (agora com suporte a aliases)
+        attributes = self.extract_attributes(stmt)
+        attr_errors = self.validate_attributes(attributes, context)
         all_errors.extend(attr_errors)
         
-        # 4. Validar operadores
-        op_errors = self.validate_operators(normalized_query)
+        # 5. Validar operadores
+        op_errors = self.validate_operators(normalized_query, tokens)
         all_errors.extend(op_errors)
         
         result = {
@@ -620,15 +546,15 @@ class SQLValidator:
             'query': normalized_query,
             'tables_found': tables,
             'attributes_found': attributes,
-            'aliases': self.table_aliases
+            'aliases': context.aliases
         }
 
         # HU2 – Conversão para Álgebra Relacional (apenas se válido)
         if len(all_errors) == 0:
             try:
                 result['relational_algebra'] = to_relational_algebra(
-                    normalized_query,
-                    aliases=self.table_aliases
+                    stmt,
+                    aliases=context.aliases
                 )
             except Exception:
                 # Em caso de erro inesperado na conversão, não bloquear a validação HU1
@@ -638,12 +564,13 @@ class SQLValidator:
             try:
                 graph_builder = OperatorGraph()
                 result['operator_graph'] = graph_builder.build_from_query(
-                    normalized_query,
-                    aliases=self.table_aliases
+                    stmt,
+                    aliases=context.aliases
                 )
                 # HU4 – Otimização do grafo (heurísticas)
                 try:
-                    result['optimized_graph'] = optimize_operator_graph(result['operator_graph'])
+                    result['optimized_graph'] = optimize_operator_graph(result['operator_graph'], self.cost_model)
+                    result['warnings'].extend(result['optimized_graph'].get('warnings', []))
                 except Exception:
                     result['optimized_graph'] = None
                 # HU5 - Plano de Execução baseado no grafo otimizado (ou no grafo original se otimizado ausente)
@@ -659,137 +586,68 @@ class SQLValidator:
         return result
 
 
-def to_relational_algebra(normalized_query: str, aliases: dict | None = None) -> str:
+def _as_statement(query) -> SelectStmt:
+    """Devolve a AST da consulta (faz o parsing se receber o texto normalizado)"""
+    if isinstance(query, SelectStmt):
+        return query
+    return parse(query.strip())
+
+
+def to_relational_algebra(query, aliases: dict | None = None) -> str:
     """
-    Converte um subconjunto de SQL (SELECT, FROM, WHERE, JOIN ... ON) em Álgebra Relacional.
+    Converte um subconjunto de SQL (SELECT, FROM, WHERE, JOIN ... ON, ORDER BY) em Álgebra Relacional.
+
+    Recebe a AST (SelectStmt) ou a consulta normalizada.
 
     Regras:
     - Projeção: π_{attrs}
     - Seleção:  σ_{pred}
     - Junção:   (A ⋈_{pred} B) encadeada à esquerda
+    - Ordenação: τ_{chaves}, logo abaixo da projeção
     - Produto cartesiano para múltiplas tabelas no FROM separadas por vírgula: ×
     - Mantém parênteses e substitui AND/OR por ∧/∨
     - Usa alias quando existir; caso contrário, nome da tabela
     """
-    if aliases is None:
-        aliases = {}
-
-    q = normalized_query.strip().rstrip(';')
-
-    # 1) SELECT list
-    # Seleção até o próximo marcador (from/where/join) para evitar capturar palavras-chave
-    sel_match = re.search(r'^select\s+(.*?)(?=\s+(?:from|where|join)\b|$)', q, re.IGNORECASE)
-    select_list = sel_match.group(1).strip() if sel_match else '*'
-    # remove aliases "as x"
-    select_items = []
-    if select_list == '*':
+    stmt = _as_statement(query)
+
+    # 1) SELECT list (sem os aliases "as x")
+    if stmt.is_star:
         projection = 'π{*}'
     else:
-        for part in select_list.split(','):
-            # remove "as alias" e espaços
-            cleaned = re.sub(r'\s+as\s+\w+', '', part, flags=re.IGNORECASE).strip()
-            select_items.append(cleaned)
-        projection = f"π{{{', '.join(select_items)}}}"
-
-    # 2) FROM base relations and comma-joins
-    from_match = re.search(r'from\s+(.+?)(?:\s+where|\s+join|$)', q, re.IGNORECASE)
-    from_section = from_match.group(1).strip() if from_match else ''
-    from_tables = [p.strip() for p in from_section.split(',') if p.strip()]
-
-    def rel_name(token: str) -> str:
-        parts = token.split()
-        if len(parts) >= 2:
-            return parts[1]  # alias
-        return parts[0]     # table
-
-    # expressão base: produto cartesiano se houver vírgulas (formato encadeado esquerda)
+        projection = f"π{{{', '.join(item.text for item in stmt.items)}}}"
+
+    # 2) FROM: produto cartesiano se houver vírgulas (formato encadeado esquerda)
+    base_terms = [t.label for t in stmt.from_tables]
     base_expr = ''
-    if from_tables:
-        base_terms = [rel_name(t) for t in from_tables]
-        if len(base_terms) == 1:
-            base_expr = base_terms[0]
-        else:
-            # ((a×b)×c)... sem espaços
-            expr = f"({base_terms[0]}×{base_terms[1]})"
-            for term in base_terms[2:]:
-                expr = f"({expr}×{term})"
-            base_expr = expr
-
-    # 3) JOIN chains (left-deep)
-    # Padrão: JOIN <table> [alias] ON <predicate> (até where/outro join/fim)
-    join_iter = re.finditer(r'\bjoin\s+(\w+)(?:\s+(\w+))?\s+on\s+(.+?)(?=\s+join|\s+where|$)', q, re.IGNORECASE)
+    if len(base_terms) == 1:
+        base_expr = base_terms[0]
+    elif base_terms:
+        # ((a×b)×c)... sem espaços
+        expr = f"({base_terms[0]}×{base_terms[1]})"
+        for term in base_terms[2:]:
+            expr = f"({expr}×{term})"
+        base_expr = expr
+
+    # 3) JOIN chains (left-deep), sem espaços ao redor de ⋈ e dentro das chaves
     current_expr = base_expr
-    for m in join_iter:
-        table = m.group(1)
-        alias = m.group(2)
-        on_pred = m.group(3).strip()
-        right_rel = alias if alias else table
-        # normalizar e reformatar condição do ON (remover espaços ao redor dos operadores)
-        on_pred = re.sub(r'\s+', ' ', on_pred)
-        on_pred = _format_predicate(on_pred)
-        # sem espaços ao redor de ⋈ e dentro das chaves
+    for join in stmt.joins:
+        on_pred = format_predicate(join.condition)
+        right_rel = join.table.label
         current_expr = f"({current_expr}⋈{{{on_pred}}}{right_rel})" if current_expr else f"({right_rel})"
 
-    if current_expr:
-        join_expr = current_expr
-    else:
-        join_expr = base_expr
+    inner = current_expr
 
     # 4) WHERE → seleção
-    # WHERE até o próximo marcador (from/join/group/order/limit) ou fim
-    where_match = re.search(r'\bwhere\s+(.+?)(?=\s+(?:from|join|group|order|limit)\b|$)', q, re.IGNORECASE)
-    selection = None
-    if where_match:
-        where_pred = where_match.group(1).strip()
-        # cortar qualquer coisa após where que não seja parte dele (por segurança)
-        where_pred = re.split(r'\s+group\s+by|\s+order\s+by|\s+limit\s+', where_pred)[0]
-        where_pred = re.sub(r'\s+', ' ', where_pred)
-        where_pred = _format_predicate(where_pred)
-        selection = f"σ{{{where_pred}}}"
-
-    # 5) Montagem final: π (σ (joins/base))
-    inner = join_expr if join_expr else base_expr
-    if not inner:
-        inner = ''
-
-    if selection:
-        inner = f"{selection}({inner})"
-
-    if projection:
-        final_expr = f"{projection}({inner})" if inner else f"{projection}()"
-    else:
-        final_expr = inner
+    if stmt.where is not None:
+        inner = f"σ{{{format_predicate(stmt.where)}}}({inner})"
 
-    return final_expr.strip()
+    # 5) ORDER BY → ordenação
+    if stmt.order_by:
+        inner = f"τ{{{format_sort_keys(stmt.order_by)}}}({inner})"
 
-
-def _format_predicate(pred: str) -> str:
-    """Reformata predicados: AND/OR → ∧/∨, >= → ≥, <= → ≤, remove espaços ao redor de operadores.
-    Mantém um único espaço ao redor de ∧ e ∨.
-    """
-    # Operadores lógicos
-    pred = re.sub(r'\band\b', '∧', pred, flags=re.IGNORECASE)
-    pred = re.sub(r'\bor\b', '∨', pred, flags=re.IGNORECASE)
-    # Normalizar espaços
-    pred = re.sub(r'\s+', ' ', pred).strip()
-    # Substituições de operadores compostos primeiro
-    pred = pred.replace('>=', '≥').replace('<=', '≤')
-    # Remover espaços ao redor de operadores de comparação (=, <, >, ≥, ≤, <>)
-    # padrões com espaço opcional antes/depois do operador
-    def tighten(op_regex: str, symbol: str):
-        nonlocal pred
-        pred = re.sub(rf'\s*{op_regex}\s*', symbol, pred)
-
-    tighten(r'<>', '<>')
-    tighten(r'≥', '≥')
-    tighten(r'≤', '≤')
-    tighten(r'=', '=')
-    tighten(r'>', '>')
-    tighten(r'<', '<')
-    # Espaços ao redor de ∧ e ∨: exatamente um
-    pred = re.sub(r'\s*∧\s*', ' ∧ ', pred)
-    pred = re.sub(r'\s*∨\s*', ' ∨ ', pred)
-    return pred
+    # 6) Montagem final: π (τ (σ (joins/base)))
+    final_expr = f"{projection}({inner})" if inner else f"{projection}()"
+    return final_expr.strip()
 
 
 class OperatorGraph:
@@ -820,59 +678,34 @@ class OperatorGraph:
         }
         self.edges.append(edge)
     
-    def build_from_query(self, normalized_query: str, aliases: dict = None) -> dict:
+    def build_from_query(self, query, aliases: dict = None) -> dict:
         """
-        Constrói o grafo de operadores a partir de uma consulta SQL normalizada.
+        Constrói o grafo de operadores a partir da AST da consulta (ou da consulta normalizada).
         
         Estrutura do grafo (de baixo para cima):
         1. Folhas: Tabelas (SCAN)
-        2. Meio: Operadores de junção (JOIN) e seleção (SELECT/σ)
+        2. Meio: Operadores de junção (JOIN), seleção (SELECT/σ) e ordenação (SORT/τ)
         3. Raiz: Projeção final (PROJECT/π)
         
         Args:
-            normalized_query: Query SQL normalizada (lowercase)
+            query: SelectStmt ou query SQL normalizada (lowercase)
             aliases: Dicionário de aliases de tabelas
             
         Returns:
             dict com nodes e edges do grafo
         """
-        if aliases is None:
-            aliases = {}
-        
-        q = normalized_query.strip().rstrip(';')
-        
-        # 1. Extrair SELECT list (projeção final)
-        sel_match = re.search(r'^select\s+(.*?)(?=\s+(?:from|where|join)\b|$)', q, re.IGNORECASE)
-        select_list = sel_match.group(1).strip() if sel_match else '*'
-        
-        # 2. Extrair FROM (tabelas base)
-        from_match = re.search(r'from\s+(.+?)(?:\s+where|\s+join|$)', q, re.IGNORECASE)
-        from_section = from_match.group(1).strip() if from_match else ''
-        from_tables = [p.strip() for p in from_section.split(',') if p.strip()]
-        
-        # 3. Extrair JOINs
-        join_pattern = r'\bjoin\s+(\w+)(?:\s+(\w+))?\s+on\s+(.+?)(?=\s+join|\s+where|$)'
-        join_matches = list(re.finditer(join_pattern, q, re.IGNORECASE))
-        
-        # 4. Extrair WHERE
-        where_match = re.search(r'\bwhere\s+(.+?)(?=\s+(?:from|join|group|order|limit)\b|$)', q, re.IGNORECASE)
-        where_clause = where_match.group(1).strip() if where_match else None
+        stmt = _as_statement(query)
         
         # ===== CONSTRUÇÃO DO GRAFO (BOTTOM-UP) =====
         
         # PASSO 1: Criar nós para as tabelas (folhas)
         table_nodes = []
         
-        for table_spec in from_tables:
-            parts = table_spec.split()
-            table_name = parts[0]
-            alias = parts[1] if len(parts) > 1 else None
-            
-            display_name = alias if alias else table_name
+        for table in stmt.from_tables:
             node = self._create_node(
                 'SCAN',
-                display_name,
-                {'table': table_name, 'alias': alias}
+                table.label,
+                {'table': table.name, 'alias': table.alias}
             )
             table_nodes.append(node)
         
@@ -897,25 +730,19 @@ class OperatorGraph:
                 current_node = cross_node
         
         # PASSO 3: Adicionar JOINs sequencialmente
-        for match in join_matches:
-            join_table = match.group(1)
-            join_alias = match.group(2) if match.group(2) else None
-            join_condition = match.group(3).strip()
-            
+        for join in stmt.joins:
             # Criar nó da tabela sendo juntada
-            display_name = join_alias if join_alias else join_table
             table_node = self._create_node(
                 'SCAN',
-                display_name,
-                {'table': join_table, 'alias': join_alias}
+                join.table.label,
+                {'table': join.table.name, 'alias': join.table.alias}
             )
             
             # Criar nó de JOIN
-            formatted_condition = _format_predicate(join_condition)
             join_node = self._create_node(
                 'JOIN',
                 f'⋈',
-                {'condition': formatted_condition}
+                {'condition': format_predicate(join.condition)}
             )
             
             # Conectar: resultado anterior e nova tabela → JOIN
@@ -926,22 +753,33 @@ class OperatorGraph:
             current_node = join_node
         
         # PASSO 4: Adicionar WHERE (seleção)
-        if where_clause:
-            formatted_where = _format_predicate(where_clause)
+        if stmt.where is not None:
             select_node = self._create_node(
                 'SELECTION',
                 'σ',
-                {'condition': formatted_where}
+                {'condition': format_predicate(stmt.where)}
             )
             if current_node:
                 self._create_edge(current_node['id'], select_node['id'])
             current_node = select_node
+
+        # PASSO 5: Adicionar ORDER BY (ordenação), abaixo da projeção para
+        # que as chaves possam usar atributos fora do SELECT
+        if stmt.order_by:
+            sort_node = self._create_node(
+                'SORT',
+                'τ',
+                {'keys': format_sort_keys(stmt.order_by)}
+            )
+            if current_node:
+                self._create_edge(current_node['id'], sort_node['id'])
+            current_node = sort_node
         
-        # PASSO 5: Adicionar projeção final (raiz)
+        # PASSO 6: Adicionar projeção final (raiz)
         projection_node = self._create_node(
             'PROJECTION',
             'π',
-            {'attributes': select_list}
+            {'attributes': stmt.select_list}
         )
         if current_node:
             self._create_edge(current_node['id'], projection_node['id'])
@@ -954,6 +792,310 @@ class OperatorGraph:
 
     
 
+class ValidationCache:
+    """Cache LRU, com tempo de vida (TTL), para os resultados de SQLValidator.validate.
+
+    A chave é a consulta normalizada mais a versão dos metadados; quando a versão
+    muda, todas as entradas são descartadas. Os resultados armazenados são
+    compartilhados entre as requisições e não devem ser modificados.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Devolve o resultado em cache (ou None), atualizando a ordem LRU"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, version, result):
+        """Armazena um resultado, descartando o menos usado recentemente se necessário"""
+        if self.maxsize <= 0:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Descarta todas as entradas (os contadores são mantidos)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Contadores de acertos/faltas e ocupação do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Fonte do esquema: arquivo JSON/YAML ou banco SQLite indicado em SCHEMA_SOURCE,
+# ou o dicionário METADATA embutido. A fonte é verificada a cada SCHEMA_CHECK_INTERVAL
+# segundos e o catálogo é recarregado quando muda.
+CATALOG_SOURCE = CatalogSource(
+    path=os.environ.get('SCHEMA_SOURCE') or None,
+    metadata=METADATA,
+    check_interval=float(os.environ.get('SCHEMA_CHECK_INTERVAL', 1.0)),
+)
+
+
+def load_statistics(path: str | None) -> Statistics:
+    """Estatísticas gravadas pelo comando `analyze` (vazias se o arquivo não existir)"""
+    if path and os.path.exists(path):
+        return Statistics.load(path)
+    return Statistics()
+
+
+# Estatísticas das tabelas (número de linhas, distintos, histogramas) usadas pelo otimizador
+STATISTICS_PATH = os.environ.get('STATISTICS_PATH') or None
+STATISTICS = load_statistics(STATISTICS_PATH)
+
+# Validador compartilhado por todas as requisições (não guarda estado por consulta)
+VALIDATOR = SQLValidator(CATALOG_SOURCE.get(), STATISTICS)
+
+# Tamanho e TTL (segundos) configuráveis por variáveis de ambiente; tamanho 0 desativa o cache
+VALIDATION_CACHE = ValidationCache(
+    maxsize=int(os.environ.get('VALIDATION_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('VALIDATION_CACHE_TTL', 300)),
+)
+
+
+def get_catalog() -> Catalog:
+    """Snapshot atual do catálogo (recarregado quando a fonte do esquema muda)"""
+    return CATALOG_SOURCE.get()
+
+
+def get_validator() -> 'SQLValidator':
+    """Validador compartilhado, reconstruído quando o catálogo é recarregado"""
+    global VALIDATOR
+    catalog = get_catalog()
+    validator = VALIDATOR
+    if validator.catalog is not catalog:
+        validator = VALIDATOR = SQLValidator(catalog, STATISTICS)
+    return validator
+
+
+class MetadataPayload:
+    """Resposta de /metadata serializada (e comprimida) uma única vez por versão do esquema"""
+
+    __slots__ = ('version', 'body', 'gzip_body', 'etag', 'gzip_etag', 'last_modified')
+
+    def __init__(self, catalog: Catalog, loaded_at: float):
+        self.version = catalog.version
+        self.body = app.json.dumps(catalog.to_metadata()).encode('utf-8')
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        # cada codificação é uma representação distinta: ETags fortes diferentes
+        self.etag = catalog.version
+        self.gzip_etag = f"{catalog.version}-gzip"
+        # Last-Modified tem resolução de segundos
+        self.last_modified = datetime.fromtimestamp(int(loaded_at), tz=timezone.utc)
+
+
+_metadata_payload = None
+_metadata_payload_lock = threading.Lock()
+
+
+def get_metadata_payload() -> MetadataPayload:
+    """Payload de /metadata da versão atual do catálogo, reconstruído só quando o esquema muda"""
+    global _metadata_payload
+    catalog = get_catalog()
+    payload = _metadata_payload
+    if payload is None or payload.version != catalog.version:
+        with _metadata_payload_lock:
+            payload = _metadata_payload
+            if payload is None or payload.version != catalog.version:
+                payload = _metadata_payload = MetadataPayload(
+                    catalog, CATALOG_SOURCE.loaded_at or time.time())
+    return payload
+
+
+def validate_cached(query: str) -> dict:
+    """Valida a consulta consultando antes o cache de resultados"""
+    validator = get_validator()
+    key = validator.normalize_query(query)
+    version = validator.catalog.version
+    result = VALIDATION_CACHE.get(key, version)
+    if result is None:
+        result = validator.validate(query)
+        VALIDATION_CACHE.put(key, version, result)
+    return result
+
+
+def load_database(path: str | None, catalog: Catalog) -> Database:
+    """Dados para o executor: diretório de arquivos colunares (mapeados em
+    memória), tabelas de um banco SQLite ou nenhuma linha"""
+    if path and os.path.isdir(path):
+        return Database.from_columnar(path, catalog)
+    if path and os.path.exists(path):
+        return Database.from_sqlite(path, catalog)
+    return Database(catalog)
+
+
+# Dados usados por /execute, indicados em DATABASE_PATH: diretório de arquivos
+# colunares (comando `load`), abertos com mmap, ou banco SQLite, carregado em memória
+DATABASE_PATH = os.environ.get('DATABASE_PATH') or None
+DATABASE = load_database(DATABASE_PATH, CATALOG_SOURCE.get())
+
+
+def get_database() -> Database:
+    """Dados em memória, recarregados quando o catálogo muda"""
+    global DATABASE
+    catalog = get_catalog()
+    database = DATABASE
+    if database.catalog is not catalog:
+        database = DATABASE = load_database(DATABASE_PATH, catalog)
+    return database
+
+
+# Modo de execução padrão: 'row' (tupla a tupla) ou 'vectorized' (lotes de colunas NumPy)
+EXECUTION_MODE = os.environ.get('EXECUTION_MODE', 'row')
+
+# Memória (bytes) que os operadores de uma consulta podem materializar antes de
+# gravar em arquivos temporários (padrão: 256 MiB; 0 desativa o limite) e o
+# diretório desses arquivos (padrão: o temporário do sistema)
+EXECUTION_MEMORY_BUDGET = int(os.environ.get('EXECUTION_MEMORY_BUDGET', 256 * 1024 * 1024)) or None
+EXECUTION_SPILL_DIR = os.environ.get('EXECUTION_SPILL_DIR') or None
+
+
+def execute_query(query: str, database: Database | None = None, limit: int | None = None,
+                  mode: str | None = None, memory_budget: int | None = None) -> dict:
+    """Valida, otimiza e executa a consulta, devolvendo as linhas do resultado.
+
+    Cada passo do plano de execução recebe as linhas produzidas e os bytes que
+    o seu operador gravou em disco ('rows', 'spilled_bytes'). Consultas
+    inválidas devolvem apenas os erros da validação ('valid' False).
+    """
+    result = validate_cached(query)
+    if not result['valid']:
+        return {'valid': False, 'errors': result['errors'], 'warnings': result['warnings']}
+    graph = result.get('optimized_graph') or result.get('operator_graph')
+    output = execute_graph(graph, database or get_database(), limit, mode or EXECUTION_MODE,
+                           memory_budget or EXECUTION_MEMORY_BUDGET, EXECUTION_SPILL_DIR)
+    # o resultado da validação é compartilhado pelo cache: os passos são copiados
+    stats = {op['id']: op for op in output['operators']}
+    plan = [{**step, 'rows': stats[step['id']]['rows'], 'spilled_bytes': stats[step['id']]['spilled_bytes']}
+            if step['id'] in stats else dict(step)
+            for step in result.get('execution_plan', [])]
+    return {
+        'valid': True,
+        'errors': [],
+        'warnings': result['warnings'],
+        'query': result['query'],
+        'execution_plan': plan,
+        **output,
+    }
+
+
+# Validação em lote: número de processos (padrão: um por núcleo), tamanho mínimo
+# do lote para usar o pool e tamanho máximo aceito pelo endpoint
+BATCH_WORKERS = int(os.environ.get('VALIDATION_BATCH_WORKERS', 0)) or os.cpu_count() or 1
+BATCH_MIN_PARALLEL = int(os.environ.get('VALIDATION_BATCH_MIN_PARALLEL', 64))
+BATCH_MAX_QUERIES = int(os.environ.get('VALIDATION_BATCH_MAX_QUERIES', 100000))
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+_worker_validator = None
+
+
+def _init_batch_worker():
+    """Inicializador dos processos do pool: um validador por processo"""
+    global _worker_validator
+    _worker_validator = get_validator()
+
+
+def _validate_timed(query):
+    """Valida uma consulta e anexa o tempo gasto (executado nos processos do pool)"""
+    start = time.perf_counter()
+    if not query:
+        result = {'valid': False, 'errors': ['Consulta vazia'], 'warnings': []}
+    else:
+        validator = _worker_validator or get_validator()
+        result = validator.validate(query)
+    result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _get_batch_pool():
+    """Cria (sob demanda) o pool de processos compartilhado pelas requisições"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, initializer=_init_batch_worker)
+        return _batch_pool
+
+
+def _discard_batch_pool():
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is not None:
+            _batch_pool.shutdown(wait=False, cancel_futures=True)
+        _batch_pool = None
+
+
+def _on_schema_reload(catalog):
+    """Invalida o que depende do esquema: cache de resultados e processos do pool"""
+    VALIDATION_CACHE.clear()
+    _discard_batch_pool()
+
+
+CATALOG_SOURCE.on_reload(_on_schema_reload)
+
+
+def validate_batch(queries: list, pool=None) -> list:
+    """Valida uma lista de consultas, na ordem de entrada, usando o pool de processos.
+
+    Lotes pequenos são validados no próprio processo, onde o custo de enviar as
+    consultas aos processos seria maior que o ganho.
+    """
+    if pool is None:
+        if len(queries) < BATCH_MIN_PARALLEL or BATCH_WORKERS <= 1:
+            return [_validate_timed(q) for q in queries]
+        pool = _get_batch_pool()
+    workers = getattr(pool, '_max_workers', BATCH_WORKERS)
+    chunksize = max(1, len(queries) // (workers * 4))
+    try:
+        return list(pool.map(_validate_timed, queries, chunksize=chunksize))
+    except BrokenProcessPool:
+        # Um processo morreu: descartar o pool e validar localmente
+        _discard_batch_pool()
+        return [_validate_timed(q) for q in queries]
+
+
 @app.route('/')
 def index():
     """Página inicial"""
@@ -972,15 +1114,292 @@ def validate_query():
             'warnings': []
         })
     
-    validator = SQLValidator(METADATA)
-    result = validator.validate(query)
+    result = validate_cached(query)
     
     return jsonify(result)
 
+@app.route('/validate/batch', methods=['POST'])
+def validate_batch_query():
+    """Endpoint para validar um lote de consultas SQL (resultados na ordem de entrada)"""
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return jsonify({'errors': ["O campo 'queries' deve ser uma lista de consultas"]}), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({'errors': [f"O lote excede o limite de {BATCH_MAX_QUERIES} consultas"]}), 400
+    
+    start = time.perf_counter()
+    results = validate_batch(queries)
+    
+    return jsonify({
+        'count': len(results),
+        'results': results,
+        'elapsed_ms': (time.perf_counter() - start) * 1000
+    })
+
+@app.route('/execute', methods=['POST'])
+def execute_query_endpoint():
+    """Endpoint para executar uma consulta sobre os dados em memória"""
+    data = request.get_json(silent=True) or {}
+    query = data.get('query', '')
+    limit = data.get('limit')
+    mode = data.get('mode', EXECUTION_MODE)
+
+    if not query:
+        return jsonify({'valid': False, 'errors': ['Consulta vazia'], 'warnings': []}), 400
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 0):
+        return jsonify({'valid': False, 'errors': ["O campo 'limit' deve ser um inteiro não negativo"],
+                        'warnings': []}), 400
+    if mode not in EXECUTION_MODES:
+        return jsonify({'valid': False, 'errors': [f"Modo de execução deve ser um de: {', '.join(EXECUTION_MODES)}"],
+                        'warnings': []}), 400
+
+    try:
+        result = execute_query(query, limit=limit, mode=mode)
+    except (ExecutionError, RuntimeError) as e:
+        return jsonify({'valid': True, 'errors': [f"Erro na execução: {e}"], 'warnings': []}), 422
+    return jsonify(result), (200 if result['valid'] else 400)
+
+@app.route('/validate/cache')
+def validation_cache_stats():
+    """Retorna os contadores do cache de validação"""
+    return jsonify(VALIDATION_CACHE.stats())
+
 @app.route('/metadata')
 def get_metadata():
-    """Retorna os metadados do banco"""
-    return jsonify(METADATA)
+    """Retorna os metadados do banco (com ETag/Last-Modified e resposta 304 na revalidação)"""
+    payload = get_metadata_payload()
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = payload.gzip_etag if use_gzip else payload.etag
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    elif request.if_modified_since:
+        not_modified = payload.last_modified <= request.if_modified_since
+    else:
+        not_modified = False
+
+    if not_modified:
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(payload.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(payload.body, mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = payload.last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+# ==================== LINHA DE COMANDO ====================
+
+# Linhas enviadas a cada tarefa do pool no modo --workers
+CLI_CHUNK_SIZE = 256
+
+
+def _parse_input_line(line_no: int, line: str):
+    """Interpreta uma linha de entrada: consulta pura ou objeto JSON {"query": ..., "id": ...}"""
+    text = line.strip()
+    if not text.startswith('{'):
+        return {'line': line_no}, text
+    try:
+        obj = json.loads(text)
+    except ValueError as e:
+        return {'line': line_no, 'error': f'JSON inválido: {e}'}, None
+    record = {'line': line_no}
+    if 'id' in obj:
+        record['id'] = obj['id']
+    query = obj.get('query', '')
+    if not isinstance(query, str):
+        record['error'] = "O campo 'query' deve ser uma string"
+        return record, None
+    return record, query
+
+
+def _validate_lines(lines: list) -> list:
+    """Valida um bloco de linhas (line_no, texto) e devolve pares (válida, linha JSONL de saída)"""
+    output = []
+    for line_no, line in lines:
+        record, query = _parse_input_line(line_no, line)
+        if query is not None:
+            record.update(_validate_timed(query))
+        output.append((record.get('valid', False), json.dumps(record, ensure_ascii=False)))
+    return output
+
+
+def _read_chunks(stream, size: int):
+    """Lê a entrada sob demanda, em blocos de (line_no, linha), ignorando linhas vazias"""
+    chunk = []
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        chunk.append((line_no, line))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _bounded_map(pool, fn, iterable, window: int):
+    """Como pool.map, mas com no máximo `window` tarefas pendentes (memória limitada)"""
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_bulk_validation(input_stream, output_stream, workers: int = 0) -> dict:
+    """Valida as consultas de `input_stream` (uma por linha ou JSONL) e escreve JSONL em `output_stream`.
+
+    Os resultados são emitidos na ordem de entrada, assim que cada bloco termina.
+    Com workers > 1 a validação é distribuída em um pool de processos, mantendo
+    no máximo algumas tarefas pendentes por processo.
+    """
+    summary = {'total': 0, 'valid': 0, 'invalid': 0}
+    if workers > 1:
+        chunks = _read_chunks(input_stream, CLI_CHUNK_SIZE)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker)
+        results = _bounded_map(pool, _validate_lines, chunks, window=workers * 4)
+    else:
+        pool = None
+        results = map(_validate_lines, _read_chunks(input_stream, 1))
+    try:
+        for lines in results:
+            for valid, line in lines:
+                output_stream.write(line + '\n')
+                summary['total'] += 1
+                summary['valid' if valid else 'invalid'] += 1
+            output_stream.flush()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Processador de Consultas SQL')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('serve', help='Inicia a aplicação Flask (padrão)')
+    validate_cmd = commands.add_parser(
+        'validate', help='Valida consultas de um arquivo ou da entrada padrão (saída em JSONL)')
+    validate_cmd.add_argument('input', nargs='?', default='-',
+                              help="Arquivo com uma consulta por linha ou JSONL ('-' para stdin)")
+    validate_cmd.add_argument('-o', '--output', default='-', help="Arquivo de saída ('-' para stdout)")
+    validate_cmd.add_argument('-w', '--workers', type=int, default=0,
+                              help='Número de processos (0 ou 1 valida no próprio processo)')
+    analyze_cmd = commands.add_parser(
+        'analyze', help='Coleta estatísticas das tabelas de um banco SQLite ou diretório colunar (ANALYZE)')
+    analyze_cmd.add_argument('database', help='Banco SQLite ou diretório de arquivos colunares com os dados')
+    analyze_cmd.add_argument('tables', nargs='*', help='Tabelas a analisar (padrão: todas)')
+    analyze_cmd.add_argument('-o', '--output', default=STATISTICS_PATH or 'statistics.json',
+                             help='Arquivo de estatísticas (atualizado se já existir)')
+    load_cmd = commands.add_parser(
+        'load', help='Carrega arquivos CSV (um por tabela, com cabeçalho) no formato colunar')
+    load_cmd.add_argument('csv', nargs='+', help='Arquivos CSV; o nome do arquivo é o nome da tabela')
+    load_cmd.add_argument('-d', '--directory', default=DATABASE_PATH or 'data',
+                          help='Diretório dos arquivos colunares (criado se não existir)')
+    load_cmd.add_argument('--delimiter', default=',', help='Separador dos campos')
+    generate_cmd = commands.add_parser(
+        'generate', help='Gera dados sintéticos para o esquema (determinísticos pela semente)')
+    generate_cmd.add_argument('-s', '--scale', type=float, default=1.0,
+                              help='Fator de escala (1 = 10 mil clientes, 100 mil pedidos)')
+    generate_cmd.add_argument('--seed', type=int, default=42, help='Semente do gerador')
+    generate_cmd.add_argument('-f', '--format', choices=('columnar', 'sqlite'), default='columnar',
+                              help='Arquivos colunares em um diretório ou banco SQLite')
+    generate_cmd.add_argument('-o', '--output', default=DATABASE_PATH or 'data',
+                              help='Diretório (columnar) ou arquivo (sqlite) de saída')
+    generate_cmd.add_argument('-w', '--workers', type=int, default=0,
+                              help='Número de processos (0 ou 1 gera no próprio processo)')
+    benchmark_cmd = commands.add_parser(
+        'benchmark', help='Mede a latência de cada etapa do processamento sobre um corpus de consultas')
+    benchmark_cmd.add_argument('-n', '--repeat', type=int, default=None,
+                               help='Execuções de cada consulta (padrão: benchmark.DEFAULT_REPEAT)')
+    benchmark_cmd.add_argument('-k', '--filter', action='append', default=[],
+                               help='Mede apenas as formas de consulta cujo nome contém o texto (repetível)')
+    benchmark_cmd.add_argument('-o', '--output', help='Grava o resultado em JSON (linha de base)')
+    benchmark_cmd.add_argument('-c', '--compare', help='Linha de base a comparar; falha se alguma etapa piorar')
+    benchmark_cmd.add_argument('-t', '--threshold', type=float, default=None,
+                               help='Piora relativa da mediana tolerada (padrão: benchmark.DEFAULT_THRESHOLD)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'benchmark':
+        import benchmark
+        queries = [(name, query) for name, query in benchmark.query_corpus()
+                   if not args.filter or any(f in name for f in args.filter)]
+        report = benchmark.run_benchmark(queries, args.repeat or benchmark.DEFAULT_REPEAT)
+        print(benchmark.format_report(report))
+        if args.output:
+            benchmark.save_baseline(report, args.output)
+        if args.compare:
+            threshold = benchmark.DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+            regressions = benchmark.compare(benchmark.load_baseline(args.compare), report, threshold)
+            for r in regressions:
+                print(f"REGRESSÃO {r['query']} {r['stage']}: mediana {r['baseline'] * 1e6:.1f} µs -> "
+                      f"{r['current'] * 1e6:.1f} µs ({r['ratio']:.2f}x)", file=sys.stderr)
+            if regressions:
+                return 1
+            print(f"Nenhuma etapa piorou mais de {threshold:.0%} em relação a {args.compare}", file=sys.stderr)
+        return 0
+
+    if args.command == 'generate':
+        import datagen
+        start = time.perf_counter()
+        rows = datagen.generate(args.output, args.scale, args.seed, args.format, args.workers, METADATA)
+        for table, count in rows.items():
+            print(f"{table}: {count} linhas", file=sys.stderr)
+        print(f"{sum(rows.values())} linhas em {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        return 0
+
+    if args.command == 'load':
+        import column_store
+        catalog = get_catalog()
+        os.makedirs(args.directory, exist_ok=True)
+        for path in args.csv:
+            table = os.path.splitext(os.path.basename(path))[0].lower()
+            if table not in catalog:
+                print(f"{path}: tabela '{table}' não existe no esquema", file=sys.stderr)
+                return 1
+            try:
+                rows = column_store.load_csv(path, column_store.table_path(args.directory, table),
+                                             catalog.columns(table), table, args.delimiter)
+            except (OSError, ValueError) as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                return 1
+            print(f"{table}: {rows} linhas", file=sys.stderr)
+        return 0
+
+    if args.command == 'analyze':
+        statistics = load_statistics(args.output)
+        analyze = analyze_columnar if os.path.isdir(args.database) else analyze_sqlite
+        analyzed = analyze(args.database, args.tables or None)
+        statistics.update(analyzed)
+        statistics.save(args.output)
+        for table, stats in analyzed.items():
+            print(f"{table}: {stats.rows} linhas, {len(stats.columns)} atributos", file=sys.stderr)
+        return 0
+
+    if args.command == 'validate':
+        input_stream = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+        output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        try:
+            summary = run_bulk_validation(input_stream, output_stream, workers=args.workers)
+        finally:
+            if input_stream is not sys.stdin:
+                input_stream.close()
+            if output_stream is not sys.stdout:
+                output_stream.close()
+        print(f"{summary['total']} consultas: {summary['valid']} válidas, "
+              f"{summary['invalid']} inválidas", file=sys.stderr)
+        return 0
+
+    app.run(debug=True, port=5000)
+    return 0
+
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    raise SystemExit(main())
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""Medição de latência das etapas de processamento de uma consulta.
+
+Cada consulta do corpus passa, repetidas vezes, pelas etapas de
+SQLValidator.validate, na mesma ordem e cada uma com a saída da anterior:
+normalize_query, validate_syntax, parse (AST consumida pelas demais),
+to_relational_algebra, OperatorGraph.build_from_query,
+optimize_operator_graph e generate_execution_plan. O tempo de cada chamada é
+medido isoladamente (coletor de lixo desligado, como no timeit) e cada etapa
+é resumida por mínimo, mediana e percentil 99.
+
+O resultado pode ser gravado em JSON como linha de base; compare() aponta as
+etapas cuja mediana piorou mais do que o limite em relação à linha de base
+(diferenças abaixo de NOISE_FLOOR são ignoradas, por serem ruído de medição).
+"""
+import gc
+import json
+import math
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+from app import METADATA, OperatorGraph, SQLValidator, ValidationContext, generate_execution_plan, \
+    to_relational_algebra
+from optimizer import optimize_operator_graph
+from sql_parser import parse
+
+
+STAGES = (
+    'normalize_query', 'validate_syntax', 'parse', 'to_relational_algebra',
+    'build_from_query', 'optimize_operator_graph', 'generate_execution_plan',
+)
+
+BASELINE_FORMAT_VERSION = 1
+
+# Repetições de cada consulta (mais uma de aquecimento, descartada)
+DEFAULT_REPEAT = 100
+
+# Piora relativa da mediana que conta como regressão
+DEFAULT_THRESHOLD = 0.25
+
+# Diferença absoluta (segundos) abaixo da qual uma piora é tratada como ruído
+NOISE_FLOOR = 20e-6
+
+# Tamanhos de cada forma de consulta do corpus
+JOIN_COUNTS = (1, 2, 4, 8, 16, 32, 64)
+SELECT_WIDTHS = (8, 64, 256)
+PREDICATE_DEPTHS = (2, 8, 32)
+
+
+# ==================== CORPUS ====================
+
+def join_query(joins: int) -> str:
+    """Cadeia de `joins` junções: cliente, pedido e, alternados, itens e pedidos (com aliases)"""
+    parts = ["SELECT c.nome, p0.idpedido FROM cliente c JOIN pedido p0 ON c.idcliente = p0.cliente_idcliente"]
+    for i in range(1, joins):
+        if i % 2:
+            parts.append(f"JOIN pedido_has_produto i{i} ON p{i - 1}.idpedido = i{i}.pedido_idpedido")
+        else:
+            parts.append(f"JOIN pedido p{i} ON i{i - 1}.pedido_idpedido = p{i}.idpedido")
+    return ' '.join(parts) + " WHERE p0.valortotalpedido > 100"
+
+
+def wide_select_query(width: int) -> str:
+    """SELECT com `width` atributos (com aliases) de duas tabelas juntadas"""
+    columns = [f"c.{c}" for c in METADATA['cliente']] + [f"p.{c}" for c in METADATA['pedido']]
+    items = ', '.join(f"{columns[i % len(columns)]} AS a{i}" for i in range(width))
+    return (f"SELECT {items} FROM cliente c JOIN pedido p ON c.idcliente = p.cliente_idcliente "
+            f"WHERE p.status_idstatus = 1")
+
+
+def predicate_query(depth: int) -> str:
+    """WHERE com `depth` níveis de AND/OR alternados e aninhados entre parênteses"""
+    predicate = "p.valortotalpedido > 0"
+    for level in range(depth):
+        connective = 'AND' if level % 2 else 'OR'
+        predicate = f"(p.status_idstatus = {level} {connective} {predicate})"
+    return (f"SELECT c.nome FROM cliente c JOIN pedido p ON c.idcliente = p.cliente_idcliente "
+            f"WHERE c.idcliente > 10 AND {predicate}")
+
+
+def query_corpus() -> list:
+    """Pares (nome da forma, consulta) medidos pelo benchmark"""
+    return ([(f"joins_{n}", join_query(n)) for n in JOIN_COUNTS]
+            + [(f"select_{n}", wide_select_query(n)) for n in SELECT_WIDTHS]
+            + [(f"and_or_{n}", predicate_query(n)) for n in PREDICATE_DEPTHS])
+
+
+# ==================== MEDIÇÃO ====================
+
+def measure_query(validator: SQLValidator, query: str, repeat: int = DEFAULT_REPEAT) -> dict:
+    """Tempos (segundos) de cada etapa em `repeat` execuções: etapa -> lista"""
+    samples = {stage: [] for stage in STAGES}
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for run in range(repeat + 1):
+            timings = _run_pipeline(validator, query)
+            if run:
+                for stage, elapsed in timings:
+                    samples[stage].append(elapsed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return samples
+
+
+def _run_pipeline(validator: SQLValidator, query: str) -> list:
+    clock = time.perf_counter
+    timings = []
+
+    def timed(stage, function, *args, **kwargs):
+        start = clock()
+        result = function(*args, **kwargs)
+        timings.append((stage, clock() - start))
+        return result
+
+    normalized = timed('normalize_query', validator.normalize_query, query)
+    errors, _ = timed('validate_syntax', validator.validate_syntax, normalized)
+    if errors:
+        raise ValueError(f"Consulta inválida no benchmark: {errors}")
+    stmt = timed('parse', parse, normalized)
+    # aliases: parte da validação semântica, que não é medida aqui
+    context = ValidationContext(normalized)
+    validator.extract_tables_and_aliases(stmt, context)
+    timed('to_relational_algebra', to_relational_algebra, stmt, aliases=context.aliases)
+    graph = timed('build_from_query', OperatorGraph().build_from_query, stmt, aliases=context.aliases)
+    optimized = timed('optimize_operator_graph', optimize_operator_graph, graph, validator.cost_model)
+    timed('generate_execution_plan', generate_execution_plan, optimized)
+    return timings
+
+
+def summarize(samples: list) -> dict:
+    """Mínimo, mediana e percentil 99 (segundos) de uma lista de tempos"""
+    ordered = sorted(samples)
+    return {
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p99': ordered[min(len(ordered) - 1, math.ceil(0.99 * len(ordered)) - 1)],
+    }
+
+
+def run_benchmark(queries: list | None = None, repeat: int = DEFAULT_REPEAT,
+                  validator: SQLValidator | None = None) -> dict:
+    """Mede o corpus (ou `queries`, pares nome/consulta) e devolve o resultado no formato da linha de base"""
+    validator = validator or SQLValidator(METADATA)
+    results = {}
+    for name, query in queries if queries is not None else query_corpus():
+        samples = measure_query(validator, query, repeat)
+        results[name] = {stage: summarize(values) for stage, values in samples.items()}
+    return {
+        'version': BASELINE_FORMAT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+# ==================== LINHA DE BASE ====================
+
+def save_baseline(report: dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    if report.get('version') != BASELINE_FORMAT_VERSION:
+        raise ValueError(f"Versão da linha de base não suportada: {report.get('version')}")
+    return report
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD,
+            noise_floor: float = NOISE_FLOOR) -> list:
+    """Regressões de `current` em relação a `baseline`, pela mediana de cada etapa.
+
+    Devolve dicionários com forma, etapa, medianas e razão, das etapas que
+    pioraram mais do que `threshold` (fração) e mais do que `noise_floor`
+    segundos. Formas ou etapas ausentes de um dos lados são ignoradas.
+    """
+    regressions = []
+    for name, stages in current['results'].items():
+        before = baseline['results'].get(name, {})
+        for stage, summary in stages.items():
+            if stage not in before:
+                continue
+            old, new = before[stage]['median'], summary['median']
+            if new - old > noise_floor and new > old * (1 + threshold):
+                regressions.append({'query': name, 'stage': stage, 'baseline': old, 'current': new,
+                                    'ratio': new / old if old else math.inf})
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    """Tabela legível: forma, etapa, mínimo, mediana e p99 em microssegundos"""
+    lines = [f"{'consulta':<12} {'etapa':<24} {'mín (µs)':>10} {'mediana (µs)':>13} {'p99 (µs)':>10}"]
+    for name, stages in report['results'].items():
+        for stage, summary in stages.items():
+            lines.append(f"{name:<12} {stage:<24} {summary['min'] * 1e6:>10.1f} "
+                         f"{summary['median'] * 1e6:>13.1f} {summary['p99'] * 1e6:>10.1f}")
+    return '\n'.join(lines)
@@ -0,0 +1,240 @@
+"""Catálogo indexado do esquema do banco de dados.
+
+Construído a partir do dicionário de metadados (tabela -> lista de atributos),
+oferece consulta em tempo constante de atributos por tabela, um índice reverso
+atributo -> tabelas e as chaves primárias/estrangeiras inferidas pela convenção
+de nomes do modelo (`idtabela` e `tabela_idtabela`).
+
+O esquema pode vir do dicionário embutido na aplicação, de um arquivo JSON/YAML
+ou da introspecção de um banco SQLite (ver CatalogSource, que recarrega o
+catálogo quando a fonte muda).
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+# Convenção de chave estrangeira: <tabela>_id<tabela> (ex.: cliente_idcliente)
+_FOREIGN_KEY = re.compile(r'^(\w+?)_id(\w+)$')
+
+
+def metadata_fingerprint(metadata: dict) -> str:
+    """Impressão digital dos metadados: muda sempre que tabelas ou atributos mudam"""
+    payload = json.dumps(metadata, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class Catalog:
+    """Esquema indexado: tabelas, atributos, índice reverso e chaves"""
+
+    def __init__(self, metadata: dict, version: str | None = None):
+        self._columns = {table: tuple(cols) for table, cols in metadata.items()}
+        self._column_sets = {table: frozenset(cols) for table, cols in self._columns.items()}
+
+        tables_by_column = {}
+        for table, cols in self._columns.items():
+            for col in cols:
+                tables_by_column.setdefault(col, set()).add(table)
+        self._tables_by_column = {col: frozenset(tables) for col, tables in tables_by_column.items()}
+
+        self.foreign_keys = {table: self._infer_foreign_keys(cols) for table, cols in self._columns.items()}
+        self.primary_keys = {table: self._infer_primary_key(table) for table in self._columns}
+        self.version = version or metadata_fingerprint(metadata)
+
+    @classmethod
+    def from_metadata(cls, metadata: dict, version: str | None = None) -> 'Catalog':
+        return cls(metadata, version)
+
+    def _infer_foreign_keys(self, cols) -> dict:
+        """Atributos no formato tabela_idtabela que apontam para uma tabela do esquema"""
+        fks = {}
+        for col in cols:
+            m = _FOREIGN_KEY.match(col)
+            if m and m.group(1) == m.group(2) and m.group(1) in self._columns:
+                ref_table = m.group(1)
+                ref_col = f"id{ref_table}"
+                if ref_col in self._column_sets[ref_table]:
+                    fks[col] = (ref_table, ref_col)
+        return fks
+
+    def _infer_primary_key(self, table: str) -> str | None:
+        """idtabela, ou o primeiro atributo id* que não seja chave estrangeira"""
+        if f"id{table}" in self._column_sets[table]:
+            return f"id{table}"
+        for col in self._columns[table]:
+            if col.startswith('id') and col not in self.foreign_keys[table]:
+                return col
+        return None
+
+    # ---------- consulta ----------
+    def __contains__(self, table) -> bool:
+        return table in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def tables(self) -> list:
+        return list(self._columns)
+
+    def columns(self, table: str) -> tuple:
+        """Atributos da tabela, na ordem do esquema"""
+        return self._columns[table]
+
+    def has_column(self, table: str, column: str) -> bool:
+        cols = self._column_sets.get(table)
+        return cols is not None and column in cols
+
+    def tables_with_column(self, column: str) -> frozenset:
+        """Índice reverso: tabelas que possuem o atributo"""
+        return self._tables_by_column.get(column, frozenset())
+
+    def resolve_column(self, column: str, relations: dict) -> list:
+        """Relações da consulta (label -> tabela) que possuem o atributo não qualificado"""
+        owners = self._tables_by_column.get(column)
+        if not owners:
+            return []
+        return [label for label, table in relations.items() if table in owners]
+
+    def primary_key(self, table: str) -> str | None:
+        return self.primary_keys.get(table)
+
+    def to_metadata(self) -> dict:
+        """Representação em dicionário tabela -> lista de atributos"""
+        return {table: list(cols) for table, cols in self._columns.items()}
+
+
+# ==================== CARGA DO ESQUEMA ====================
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+
+def _normalize_metadata(data) -> dict:
+    """Aceita {tabela: [atributos]} ou {"tables": {...}}; nomes em minúsculas, como nas consultas"""
+    if isinstance(data, dict) and isinstance(data.get('tables'), dict):
+        data = data['tables']
+    if not isinstance(data, dict) or not all(isinstance(cols, list) for cols in data.values()):
+        raise ValueError('O esquema deve mapear cada tabela para a lista de seus atributos')
+    return {str(table).lower(): [str(col).lower() for col in cols] for table, cols in data.items()}
+
+
+def introspect_sqlite(path: str) -> dict:
+    """Lê tabelas e atributos de um banco SQLite (somente leitura)"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid")]
+        return {table: [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')] for table in tables}
+    finally:
+        conn.close()
+
+
+def load_metadata(path: str) -> dict:
+    """Carrega o esquema de um arquivo JSON/YAML ou de um banco SQLite (pela extensão)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in SQLITE_EXTENSIONS:
+        return _normalize_metadata(introspect_sqlite(path))
+    with open(path, encoding='utf-8') as f:
+        if ext in YAML_EXTENSIONS:
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError('PyYAML é necessário para carregar esquemas YAML (pip install pyyaml)')
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                # como json.JSONDecodeError: arquivo inválido é ValueError
+                raise ValueError(f"YAML inválido em {path}: {e}") from e
+            return _normalize_metadata(data)
+        return _normalize_metadata(json.load(f))
+
+
+class CatalogSource:
+    """Fonte do catálogo com recarga a quente.
+
+    Mantém em memória um snapshot (Catalog) do esquema. A fonte é verificada no
+    máximo uma vez a cada `check_interval` segundos: para arquivos compara-se
+    mtime e tamanho (sem reler o conteúdo); para o dicionário em memória,
+    a impressão digital. O snapshot só é trocado, de forma atômica, quando a
+    versão do esquema muda, e então os ouvintes registrados em on_reload são
+    chamados (ex.: para invalidar caches). Se a recarga falhar, o snapshot
+    anterior é mantido e o erro fica em `last_error`.
+    """
+
+    def __init__(self, path: str | None = None, metadata: dict | None = None,
+                 check_interval: float = 1.0, clock=time.monotonic):
+        if path is None and metadata is None:
+            raise ValueError('Informe o caminho do esquema ou o dicionário de metadados')
+        self.path = path
+        self.metadata = metadata
+        self.check_interval = check_interval
+        self._clock = clock
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._next_check = 0.0
+        self.last_error = None
+        self.loaded_at = None
+        self._catalog = None
+        self._reload(force=True)
+        self._next_check = clock() + check_interval
+
+    def on_reload(self, callback):
+        """Registra uma função chamada com o novo Catalog sempre que o esquema muda"""
+        self._listeners.append(callback)
+
+    def _current_stamp(self):
+        if self.path is None:
+            return metadata_fingerprint(self.metadata)
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> dict:
+        return load_metadata(self.path) if self.path is not None else self.metadata
+
+    def _reload(self, force=False):
+        stamp = self._current_stamp()
+        if not force and stamp == self._stamp:
+            return
+        metadata = self._load()
+        version = stamp if self.path is None else metadata_fingerprint(metadata)
+        self._stamp = stamp
+        if self._catalog is not None and version == self._catalog.version:
+            return
+        catalog = Catalog.from_metadata(metadata, version)
+        first_load = self._catalog is None
+        self._catalog = catalog
+        self.loaded_at = time.time()
+        if not first_load:
+            for callback in self._listeners:
+                callback(catalog)
+
+    def get(self) -> Catalog:
+        """Devolve o snapshot atual, verificando a fonte se o intervalo já passou"""
+        now = self._clock()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    try:
+                        self._reload()
+                        self.last_error = None
+                    except (OSError, ValueError, RuntimeError, sqlite3.Error) as e:
+                        self.last_error = str(e)
+                    self._next_check = now + self.check_interval
+        return self._catalog
+
+    def refresh(self) -> Catalog:
+        """Força a verificação imediata da fonte"""
+        self._next_check = 0.0
+        return self.get()
+
+    @property
+    def version(self) -> str:
+        return self._catalog.version
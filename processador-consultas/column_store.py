@@ -0,0 +1,372 @@
+"""Formato binário colunar das tabelas em disco, lido com mmap.
+
+Cada tabela é um arquivo `<tabela>.col`:
+
+- assinatura MAGIC, tamanho do cabeçalho (8 bytes, little-endian) e o
+  cabeçalho em JSON: nome da tabela, número de linhas e, por atributo, o tipo e
+  a posição (relativa ao início dos dados) de cada uma das suas seções;
+- os dados, com cada seção alinhada em ALIGNMENT bytes:
+  - números: array int64 ou float64 de largura fixa (nulos gravados como 0);
+  - textos: posições (int64, linhas + 1) de cada valor em um blob UTF-8 e o
+    array de largura fixa dos textos em caixa dobrada, usado nas comparações;
+  - atributos com tipos misturados: a lista de valores em pickle;
+  - máscara de nulos (um byte por linha), quando o atributo tem nulos.
+
+open_table mapeia o arquivo com mmap e devolve uma vectorized.ColumnarTable
+cujos arrays são visões do mapeamento (sem cópia nem conversão): abrir a
+tabela é instantâneo, os SCANs leem fatias dessas visões e as páginas lidas
+ficam no cache do sistema, compartilhado entre os processos que abrem o mesmo
+arquivo. Os textos originais são decodificados do blob apenas para as linhas
+de cada lote que os operadores realmente usam.
+
+load_csv carrega um CSV (com cabeçalho) nesse formato.
+"""
+import csv
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+
+import numpy as np
+
+from vectorized import MIXED, NUMBER, TEXT, Column, ColumnarTable, kind_of
+
+
+MAGIC = b'PQCOL\x00\x01\n'
+
+FORMAT_VERSION = 1
+
+# Alinhamento (bytes) do início de cada seção de dados
+ALIGNMENT = 64
+
+# Extensão dos arquivos de tabela em um diretório de dados
+EXTENSION = '.col'
+
+_LENGTH = struct.Struct('<Q')
+
+
+def table_path(directory: str, table: str) -> str:
+    """Arquivo da tabela em um diretório de dados"""
+    return os.path.join(directory, f"{table}{EXTENSION}")
+
+
+def list_tables(directory: str) -> list:
+    """Tabelas com arquivo em um diretório de dados"""
+    return sorted(name[:-len(EXTENSION)] for name in os.listdir(directory) if name.endswith(EXTENSION))
+
+
+# ==================== ESCRITA ====================
+
+def write_table(path: str, names, columns: dict, table: str | None = None):
+    """Grava as colunas (atributo -> lista de valores, todas do mesmo tamanho) no formato colunar"""
+    with TableWriter(path, names, table) as writer:
+        writer.append(columns)
+
+
+class TableWriter:
+    """Grava uma tabela no formato colunar a partir de blocos de linhas.
+
+    Cada append() recebe um bloco (atributo -> lista de valores); os blocos são
+    guardados em arquivos temporários, um por atributo, junto com o necessário
+    para o cabeçalho (tipo, nulos, tamanho dos textos). No close(), cada seção
+    é escrita relendo os blocos do seu atributo, sem montar a tabela inteira em
+    memória. O arquivo é escrito ao lado e renomeado no fim, para leitores
+    nunca verem um arquivo parcial.
+    """
+
+    def __init__(self, path: str, names, table: str | None = None, spill_dir: str | None = None):
+        self.path = path
+        self.names = list(names)
+        self.table = table
+        self.rows = 0
+        self._spools = {name: _ColumnSpool(spill_dir) for name in self.names}
+
+    def __enter__(self) -> 'TableWriter':
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.close()
+        else:
+            self.abort()
+
+    def append(self, columns: dict):
+        sizes = {len(columns[name]) for name in self.names}
+        if len(sizes) > 1:
+            raise ValueError(f"Atributos com números de linhas diferentes: {sorted(sizes)}")
+        for name in self.names:
+            self._spools[name].append(list(columns[name]))
+        self.rows += sizes.pop() if sizes else 0
+
+    def close(self):
+        """Escreve o arquivo final e apaga os temporários"""
+        sections, entries, position = [], [], 0
+
+        def add(nbytes: int, chunks) -> list:
+            nonlocal position
+            start = position
+            sections.append((start, chunks))
+            position = _aligned(start + nbytes)
+            return [start, nbytes]
+
+        try:
+            for name in self.names:
+                spool = self._spools[name]
+                kind = spool.kind or NUMBER
+                entry = {'name': name, 'kind': kind}
+                if kind == NUMBER:
+                    dtype = np.dtype('<f8' if spool.real else '<i8')
+                    entry['dtype'] = dtype.str
+                    entry['data'] = add(self.rows * dtype.itemsize, spool.numbers(dtype))
+                elif kind == TEXT:
+                    folded = np.dtype(f'<U{max(spool.width, 1)}')
+                    entry['offsets'] = add((self.rows + 1) * 8, spool.offsets())
+                    entry['data'] = add(spool.text_bytes, spool.encoded())
+                    entry['folded'] = add(self.rows * folded.itemsize, spool.folded(folded)) + [folded.str]
+                else:
+                    data = pickle.dumps([v for chunk in spool.chunks() for v in chunk],
+                                        protocol=pickle.HIGHEST_PROTOCOL)
+                    entry['data'] = add(len(data), [data])
+                if spool.nulls:
+                    entry['nulls'] = add(self.rows, spool.null_mask())
+                entries.append(entry)
+
+            header = json.dumps({
+                'version': FORMAT_VERSION,
+                'table': self.table,
+                'rows': self.rows,
+                'columns': entries,
+            }, ensure_ascii=False).encode('utf-8')
+            start = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(MAGIC)
+                f.write(_LENGTH.pack(len(header)))
+                f.write(header)
+                for offset, chunks in sections:
+                    f.seek(start + offset)
+                    for data in chunks:
+                        f.write(data)
+                f.truncate(start + position)
+            os.replace(tmp, self.path)
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Descarta os blocos recebidos (nenhum arquivo é escrito)"""
+        for spool in self._spools.values():
+            spool.close()
+
+
+class _ColumnSpool:
+    """Blocos de valores de um atributo em um arquivo temporário, com o resumo
+    necessário para o cabeçalho"""
+
+    def __init__(self, spill_dir: str | None):
+        self._file = tempfile.TemporaryFile(dir=spill_dir)
+        self.kind = None
+        self.real = False
+        self.nulls = False
+        self.text_bytes = 0
+        self.width = 0
+
+    def append(self, values: list):
+        kind, dtype = kind_of(values)
+        if any(v is None for v in values):
+            self.nulls = True
+        if all(v is None for v in values):
+            kind = None
+        if kind is not None:
+            self.kind = kind if self.kind in (None, kind) else MIXED
+        if kind == NUMBER and dtype is np.float64:
+            self.real = True
+        if kind == TEXT:
+            self.text_bytes += sum(len(v.encode('utf-8')) for v in values if v is not None)
+            self.width = max(self.width, max(len(v.casefold()) for v in values if v is not None))
+        pickle.dump(values, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def chunks(self):
+        self._file.seek(0)
+        while True:
+            try:
+                yield pickle.load(self._file)
+            except EOFError:
+                return
+
+    def numbers(self, dtype):
+        for chunk in self.chunks():
+            yield np.array([0 if v is None else v for v in chunk], dtype=dtype).tobytes()
+
+    def offsets(self):
+        position = 0
+        yield np.zeros(1, dtype='<i8').tobytes()
+        for chunk in self.chunks():
+            ends = np.cumsum([0 if v is None else len(v.encode('utf-8')) for v in chunk], dtype='<i8') + position
+            if len(ends):
+                position = int(ends[-1])
+            yield ends.tobytes()
+
+    def encoded(self):
+        for chunk in self.chunks():
+            yield b''.join(v.encode('utf-8') for v in chunk if v is not None)
+
+    def folded(self, dtype):
+        for chunk in self.chunks():
+            yield np.array([v.casefold() if v is not None else '' for v in chunk], dtype=dtype).tobytes()
+
+    def null_mask(self):
+        for chunk in self.chunks():
+            yield np.fromiter((v is None for v in chunk), dtype=np.uint8, count=len(chunk)).tobytes()
+
+    def close(self):
+        self._file.close()
+
+
+def _aligned(position: int) -> int:
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+# ==================== LEITURA ====================
+
+class MappedTable:
+    """Tabela aberta de um arquivo colunar: nome, atributos (na ordem gravada) e colunas"""
+
+    def __init__(self, table: str | None, names: tuple, columns: ColumnarTable):
+        self.table = table
+        self.names = names
+        self.columns = columns
+
+
+def open_table(path: str) -> MappedTable:
+    """Mapeia o arquivo em memória (somente leitura) e monta as colunas sobre o mapeamento"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' não é um arquivo de tabela colunar")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length).decode('utf-8'))
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Versão do formato colunar não suportada em '{path}': {header.get('version')}")
+        # o mapeamento continua válido depois de fechar o arquivo; as visões NumPy o mantêm vivo
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    start = _aligned(len(MAGIC) + _LENGTH.size + length)
+    rows = header['rows']
+
+    def view(section, dtype, count):
+        offset, nbytes = section[0], section[1]
+        if start + offset + nbytes > len(buffer):
+            raise ValueError(f"Arquivo de tabela colunar truncado: '{path}'")
+        return np.frombuffer(buffer, dtype=dtype, count=count, offset=start + offset)
+
+    columns, names = {}, []
+    for entry in header['columns']:
+        nulls = view(entry['nulls'], np.bool_, rows) if entry.get('nulls') else None
+        if entry['kind'] == NUMBER:
+            column = Column(view(entry['data'], np.dtype(entry['dtype']), rows), nulls, NUMBER)
+        elif entry['kind'] == TEXT:
+            folded = view(entry['folded'], np.dtype(entry['folded'][2]), rows)
+            column = MappedText(view(entry['offsets'], '<i8', rows + 1),
+                                view(entry['data'], np.uint8, entry['data'][1]), nulls, folded)
+        elif entry['kind'] == MIXED:
+            offset, nbytes = entry['data']
+            values = np.empty(rows, dtype=object)
+            values[:] = pickle.loads(buffer[start + offset:start + offset + nbytes])
+            column = Column(values, nulls, MIXED)
+        else:
+            raise ValueError(f"Tipo de atributo desconhecido em '{path}': {entry['kind']}")
+        columns[entry['name']] = column
+        names.append(entry['name'])
+    return MappedTable(header.get('table'), tuple(names), ColumnarTable(columns, rows))
+
+
+class MappedText(Column):
+    """Coluna de texto sobre o arquivo mapeado.
+
+    As comparações usam o array de textos em caixa dobrada (visão do arquivo);
+    os valores originais são decodificados do blob UTF-8 só quando pedidos, e
+    apenas para as linhas da coluna (um SCAN entrega fatias contíguas, que
+    continuam sendo visões do arquivo).
+    """
+
+    __slots__ = ('_offsets', '_blob', '_decoded')
+
+    def __init__(self, offsets, blob, nulls, folded, decoded=None):
+        self._offsets = offsets
+        self._blob = blob
+        self._decoded = decoded
+        self.nulls = nulls
+        self.kind = TEXT
+        self._folded = folded
+
+    @property
+    def values(self):
+        if self._decoded is None:
+            offsets = self._offsets
+            base = int(offsets[0])
+            raw = self._blob[base:int(offsets[-1])].tobytes()
+            bounds = (offsets - base).tolist()
+            values = np.empty(len(self), dtype=object)
+            values[:] = [raw[a:b].decode('utf-8') for a, b in zip(bounds, bounds[1:])]
+            if self.nulls is not None:
+                values[self.nulls] = None
+            self._decoded = values
+        return self._decoded
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def take(self, index) -> Column:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                stop = max(start, stop)
+                return MappedText(self._offsets[start:stop + 1], self._blob,
+                                  None if self.nulls is None else self.nulls[start:stop],
+                                  self._folded[start:stop],
+                                  None if self._decoded is None else self._decoded[start:stop])
+        return super().take(index)
+
+
+# ==================== CARGA DE CSV ====================
+
+def load_csv(csv_path: str, path: str, names, table: str | None = None, delimiter: str = ','):
+    """Carrega um CSV com cabeçalho no formato colunar.
+
+    O cabeçalho é comparado sem diferenciar maiúsculas com os atributos
+    `names`; atributos ausentes do CSV ficam nulos e colunas do CSV que não são
+    atributos são um erro. Campos vazios são nulos. Cada atributo vira número
+    inteiro se todos os seus valores forem inteiros, real se forem números e
+    texto nos demais casos. Devolve o número de linhas carregadas.
+    """
+    names = list(names)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [h.strip().lower() for h in next(reader, [])]
+        unknown = [h for h in header if h not in names]
+        if unknown:
+            raise ValueError(f"Colunas do CSV que não são atributos de '{table or csv_path}': {', '.join(unknown)}")
+        values = [[] for _ in header]
+        for line, record in enumerate(reader, start=2):
+            if not record:
+                continue
+            if len(record) != len(header):
+                raise ValueError(f"{csv_path}:{line}: {len(record)} campos; esperados {len(header)}")
+            for target, field in zip(values, record):
+                target.append(field if field != '' else None)
+    rows = len(values[0]) if values else 0
+    columns = {name: [None] * rows for name in names}
+    for name, raw in zip(header, values):
+        columns[name] = _typed(raw)
+    write_table(path, names, columns, table)
+    return rows
+
+
+def _typed(values: list) -> list:
+    """Valores de um campo do CSV convertidos para inteiros ou reais, quando todos forem"""
+    for convert in (int, float):
+        try:
+            return [None if v is None else convert(v) for v in values]
+        except ValueError:
+            continue
+    return values
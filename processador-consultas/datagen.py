@@ -0,0 +1,369 @@
+"""Gerador de dados sintéticos para o esquema da loja (METADATA).
+
+Os dados são determinísticos: a mesma semente, o mesmo fator de escala e o
+mesmo tamanho de bloco geram exatamente as mesmas linhas, com qualquer número
+de processos. O fator de escala (SF) fixa o tamanho das tabelas a partir de
+SF1 = CLIENTS_PER_SF clientes:
+
+- tabelas de domínio (categoria, tipocliente, tipoendereco, status): fixas;
+- produto: PRODUCTS_PER_SF por SF;
+- cliente, com os seus endereços (1 a 3) e telefones (0 a 3);
+- pedido: ORDERS_PER_CLIENT por cliente, cada um com 1 ou mais itens em
+  pedido_has_produto (preço unitário igual ao preço do produto e valor total
+  igual à soma dos itens).
+
+Todas as chaves estrangeiras apontam para linhas existentes. As distribuições
+são assimétricas como em uma loja real: poucos clientes fazem muitos pedidos,
+poucos produtos aparecem na maioria dos itens, a maioria dos pedidos está
+entregue e as cidades seguem a concentração das capitais.
+
+A geração é feita em blocos independentes (clientes, produtos ou pedidos
+consecutivos), cada um com o seu próprio gerador aleatório derivado da
+semente, distribuídos entre processos; os blocos são gravados na ordem, por
+um único processo, em arquivos colunares (column_store) ou em um banco SQLite.
+"""
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import column_store
+
+
+# Clientes no fator de escala 1
+CLIENTS_PER_SF = 10_000
+
+# Produtos no fator de escala 1
+PRODUCTS_PER_SF = 2_000
+
+# Pedidos por cliente, em média
+ORDERS_PER_CLIENT = 10
+
+# Linhas da tabela principal (clientes, produtos ou pedidos) por bloco gerado
+CHUNK_ROWS = 50_000
+
+# Expoente da assimetria das escolhas de cliente e de produto (1 = uniforme)
+CLIENT_SKEW = 3.0
+PRODUCT_SKEW = 3.0
+
+CATEGORIAS = [
+    'Eletrônicos', 'Informática', 'Celulares', 'Livros', 'Papelaria', 'Brinquedos', 'Games', 'Esporte',
+    'Moda', 'Calçados', 'Beleza', 'Perfumaria', 'Saúde', 'Casa', 'Cozinha', 'Decoração', 'Jardim',
+    'Ferramentas', 'Automotivo', 'Pet Shop', 'Bebês', 'Alimentos', 'Bebidas', 'Música', 'Filmes',
+    'Eletrodomésticos', 'Móveis', 'Cama, Mesa e Banho', 'Relógios', 'Joias', 'Malas', 'Instrumentos',
+    'Camping', 'Ciclismo', 'Fitness', 'Artesanato', 'Escritório', 'Segurança', 'Iluminação', 'Climatização',
+    'Áudio', 'TV e Vídeo', 'Câmeras', 'Drones', 'Impressão', 'Redes', 'Acessórios', 'Óculos', 'Infantil',
+    'Utilidades',
+]
+TIPOS_CLIENTE = ['Pessoa física', 'Pessoa jurídica', 'Revendedor']
+TIPOS_ENDERECO = ['Residencial', 'Comercial', 'Entrega']
+STATUS = ['Aguardando pagamento', 'Pago', 'Em separação', 'Enviado', 'Entregue', 'Cancelado']
+STATUS_WEIGHTS = [0.04, 0.05, 0.05, 0.08, 0.72, 0.06]
+
+NOMES = [
+    'Ana', 'Maria', 'Julia', 'Beatriz', 'Mariana', 'Fernanda', 'Camila', 'Larissa', 'Gabriela', 'Leticia',
+    'Joao', 'Pedro', 'Lucas', 'Gabriel', 'Rafael', 'Bruno', 'Carlos', 'Felipe', 'Gustavo', 'Thiago',
+    'Paulo', 'Rodrigo', 'Marcos', 'Luiz', 'Antonio', 'Francisco', 'Patricia', 'Aline', 'Vanessa', 'Sandra',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+]
+DOMINIOS = ['exemplo.com.br', 'correio.com', 'mail.com', 'empresa.com.br']
+CIDADES = [
+    ('São Paulo', 'SP', 11), ('Rio de Janeiro', 'RJ', 21), ('Belo Horizonte', 'MG', 31), ('Salvador', 'BA', 71),
+    ('Fortaleza', 'CE', 85), ('Brasília', 'DF', 61), ('Curitiba', 'PR', 41), ('Recife', 'PE', 81),
+    ('Porto Alegre', 'RS', 51), ('Manaus', 'AM', 92), ('Belém', 'PA', 91), ('Goiânia', 'GO', 62),
+    ('Campinas', 'SP', 19), ('Florianópolis', 'SC', 48), ('Natal', 'RN', 84), ('Teresina', 'PI', 86),
+]
+BAIRROS = ['Centro', 'Jardim América', 'Vila Nova', 'Boa Vista', 'Santa Cruz', 'São José', 'Aldeota', 'Meireles',
+           'Liberdade', 'Copacabana', 'Savassi', 'Batel', 'Moinhos de Vento', 'Pituba']
+LOGRADOUROS = ['Rua das Flores', 'Avenida Brasil', 'Rua Sete de Setembro', 'Avenida Paulista', 'Rua XV de Novembro',
+               'Rua da Paz', 'Avenida Beira Mar', 'Travessa do Comércio', 'Rua Tiradentes', 'Alameda Santos']
+ADJETIVOS = ['Prático', 'Compacto', 'Premium', 'Clássico', 'Moderno', 'Portátil', 'Ultra', 'Básico', 'Profissional']
+PRODUTOS = ['Kit', 'Conjunto', 'Modelo', 'Item', 'Pacote', 'Versão', 'Edição']
+
+# Proporções (cumulativas) dos tipos de cliente
+TIPO_CLIENTE_WEIGHTS = [0.8, 0.15, 0.05]
+
+_TABLE_CODES = {'produto': 1, 'cliente': 2, 'pedido': 3}
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def table_sizes(scale: float) -> dict:
+    """Linhas das tabelas principais no fator de escala `scale` (as dependentes variam com a semente)"""
+    clients = max(1, round(CLIENTS_PER_SF * scale))
+    return {
+        'categoria': len(CATEGORIAS),
+        'tipocliente': len(TIPOS_CLIENTE),
+        'tipoendereco': len(TIPOS_ENDERECO),
+        'status': len(STATUS),
+        'produto': max(len(CATEGORIAS), round(PRODUCTS_PER_SF * scale)),
+        'cliente': clients,
+        'pedido': clients * ORDERS_PER_CLIENT,
+    }
+
+
+def product_price(ids):
+    """Preço de cada produto, função apenas do identificador (os itens dos pedidos o recalculam)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    cents = (ids * 2654435761) % 99_991
+    return np.round(4.9 + cents / 100.0 * np.where(ids % 10 == 0, 5, 1), 2)
+
+
+# ==================== BLOCOS ====================
+
+def chunk_tasks(scale: float, seed: int, chunk_rows: int = CHUNK_ROWS) -> list:
+    """Blocos a gerar: (tabela principal, semente, primeiro id, último id + 1, tamanhos)"""
+    sizes = table_sizes(scale)
+    tasks = []
+    for table in ('produto', 'cliente', 'pedido'):
+        for start in range(1, sizes[table] + 1, chunk_rows):
+            tasks.append((table, seed, start, min(start + chunk_rows, sizes[table] + 1), sizes))
+    return tasks
+
+
+def generate_chunk(task) -> dict:
+    """Linhas de um bloco: tabela -> (atributo -> lista de valores)"""
+    table, seed, start, stop, sizes = task
+    rng = np.random.default_rng([seed, _TABLE_CODES[table], start])
+    ids = np.arange(start, stop, dtype=np.int64)
+    if table == 'produto':
+        return {'produto': _produtos(rng, ids)}
+    if table == 'cliente':
+        return _clientes(rng, ids)
+    return _pedidos(rng, ids, sizes)
+
+
+def domain_tables() -> dict:
+    """Tabelas de domínio, iguais em qualquer escala"""
+    def numbered(names, id_column):
+        return {id_column: list(range(1, len(names) + 1)), 'descricao': list(names)}
+    return {
+        'categoria': numbered(CATEGORIAS, 'idcategoria'),
+        'tipocliente': numbered(TIPOS_CLIENTE, 'idtipocliente'),
+        'tipoendereco': numbered(TIPOS_ENDERECO, 'idtipoendereco'),
+        'status': numbered(STATUS, 'idstatus'),
+    }
+
+
+def _produtos(rng, ids) -> dict:
+    n = len(ids)
+    adjectives = rng.integers(len(ADJETIVOS), size=n).tolist()
+    kinds = rng.integers(len(PRODUTOS), size=n).tolist()
+    categories = _skewed(rng, len(CATEGORIAS), n, 2.0)
+    return {
+        'idproduto': ids.tolist(),
+        'nome': [f"{PRODUTOS[k]} {ADJETIVOS[a]} {i}" for k, a, i in zip(kinds, adjectives, ids.tolist())],
+        'descricao': [None if d else f"{PRODUTOS[k]} da linha {ADJETIVOS[a].lower()}"
+                      for d, k, a in zip((rng.random(n) < 0.2).tolist(), kinds, adjectives)],
+        'preco': product_price(ids).tolist(),
+        'quantestoque': rng.geometric(0.02, size=n).tolist(),
+        'categoria_idcategoria': (categories + 1).tolist(),
+    }
+
+
+def _clientes(rng, ids) -> dict:
+    n = len(ids)
+    first = rng.integers(len(NOMES), size=n).tolist()
+    last = rng.integers(len(SOBRENOMES), size=n).tolist()
+    domains = rng.integers(len(DOMINIOS), size=n).tolist()
+    id_list = ids.tolist()
+    clientes = {
+        'idcliente': id_list,
+        'nome': [f"{NOMES[f]} {SOBRENOMES[s]}" for f, s in zip(first, last)],
+        'email': [f"{NOMES[f].lower()}.{SOBRENOMES[s].lower()}{i}@{DOMINIOS[d]}"
+                  for f, s, i, d in zip(first, last, id_list, domains)],
+        'nascimento': _dates(rng, '1940-01-01', '2007-12-31', n),
+        'senha': [format(v, '016x') for v in rng.integers(0, 2 ** 63, size=n).tolist()],
+        'tipocliente_idtipocliente': (np.searchsorted(np.cumsum(TIPO_CLIENTE_WEIGHTS), rng.random(n)) + 1).tolist(),
+        'dataregistro': _dates(rng, '2010-01-01', '2024-12-31', n),
+    }
+
+    # endereços: 1 a 3 por cliente, o primeiro é o padrão
+    per_client = 1 + (rng.random(n) < 0.35) + (rng.random(n) < 0.1)
+    owners = np.repeat(ids, per_client)
+    first_address = np.ones(len(owners), dtype=bool)
+    first_address[1:] = owners[1:] != owners[:-1]
+    m = len(owners)
+    cities = _skewed(rng, len(CIDADES), m, 2.0).tolist()
+    complements = rng.random(m)
+    enderecos = {
+        'idendereco': [None] * m,
+        'enderecopadrao': first_address.astype(np.int64).tolist(),
+        'logradouro': [LOGRADOUROS[i] for i in rng.integers(len(LOGRADOUROS), size=m).tolist()],
+        'numero': rng.integers(1, 4000, size=m).astype(str).tolist(),
+        'complemento': [f"Apto {int(c * 1000) % 300 + 1}" if c < 0.3 else None for c in complements.tolist()],
+        'bairro': [BAIRROS[i] for i in _skewed(rng, len(BAIRROS), m, 1.5).tolist()],
+        'cidade': [CIDADES[c][0] for c in cities],
+        'uf': [CIDADES[c][1] for c in cities],
+        'cep': [f"{v // 1000:05d}-{v % 1000:03d}" for v in rng.integers(1_000_000, 99_999_999, size=m).tolist()],
+        'tipoendereco_idtipoendereco': np.where(first_address, 1, rng.integers(1, 4, size=m)).tolist(),
+        'cliente_idcliente': owners.tolist(),
+    }
+
+    # telefones: 0 a 3 por cliente, com o DDD da cidade do endereço padrão
+    phones = rng.choice(4, size=n, p=[0.1, 0.5, 0.3, 0.1])
+    owners = np.repeat(ids, phones)
+    area = np.array([CIDADES[c][2] for c in cities], dtype=np.int64)[first_address]
+    area = np.repeat(area, phones)
+    numbers = rng.integers(0, 10 ** 8, size=len(owners)).tolist()
+    telefones = {
+        'numero': [f"({a}) 9{v // 10000:04d}-{v % 10000:04d}" for a, v in zip(area.tolist(), numbers)],
+        'cliente_idcliente': owners.tolist(),
+    }
+    return {'cliente': clientes, 'endereco': enderecos, 'telefone': telefones}
+
+
+def _pedidos(rng, ids, sizes: dict) -> dict:
+    n = len(ids)
+    clients = _permuted(_skewed(rng, sizes['cliente'], n, CLIENT_SKEW), sizes['cliente'])
+    status = np.searchsorted(np.cumsum(STATUS_WEIGHTS), rng.random(n) * sum(STATUS_WEIGHTS)) + 1
+
+    # itens: 1 ou mais por pedido (geométrica), produtos populares mais frequentes
+    per_order = np.minimum(rng.geometric(0.4, size=n), 20)
+    orders = np.repeat(ids, per_order)
+    m = len(orders)
+    products = _permuted(_skewed(rng, sizes['produto'], m, PRODUCT_SKEW), sizes['produto']) + 1
+    quantities = np.minimum(rng.geometric(0.55, size=m), 50)
+    prices = product_price(products)
+    totals = np.zeros(n)
+    np.add.at(totals, orders - ids[0], quantities * prices)
+
+    pedidos = {
+        'idpedido': ids.tolist(),
+        'status_idstatus': status.tolist(),
+        'datapedido': _dates(rng, '2015-01-01', '2024-12-31', n),
+        'valortotalpedido': np.round(totals, 2).tolist(),
+        'cliente_idcliente': (clients + 1).tolist(),
+    }
+    itens = {
+        'idpedidoproduto': [None] * m,
+        'pedido_idpedido': orders.tolist(),
+        'produto_idproduto': products.tolist(),
+        'quantidade': quantities.tolist(),
+        'precounitario': prices.tolist(),
+    }
+    return {'pedido': pedidos, 'pedido_has_produto': itens}
+
+
+def _skewed(rng, size: int, count: int, skew: float):
+    """`count` posições em [0, size), concentradas nas primeiras (u ** skew)"""
+    return np.minimum((rng.random(count) ** skew * size).astype(np.int64), size - 1)
+
+
+def _permuted(positions, size: int):
+    """Espalha as posições em [0, size) por uma permutação fixa, para que os
+    valores mais frequentes não sejam sempre os primeiros identificadores"""
+    step = 7_919
+    while np.gcd(step, size) != 1:
+        step += 1
+    return (positions * step + size // 3) % size
+
+
+def _dates(rng, first: str, last: str, count: int) -> list:
+    """Datas ISO (AAAA-MM-DD) uniformes entre `first` e `last`"""
+    low = (np.datetime64(first, 'D') - _EPOCH).astype(np.int64)
+    high = (np.datetime64(last, 'D') - _EPOCH).astype(np.int64)
+    days = rng.integers(low, high + 1, size=count)
+    return (_EPOCH + days).astype(str).tolist()
+
+
+# ==================== GRAVAÇÃO ====================
+
+def generate(output: str, scale: float = 1.0, seed: int = 42, fmt: str = 'columnar', workers: int = 0,
+             metadata: dict | None = None, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Gera todas as tabelas e as grava em `output`; devolve tabela -> linhas gravadas.
+
+    `fmt` 'columnar' grava um arquivo por tabela no diretório `output`
+    (column_store, criado se não existir); 'sqlite' cria as tabelas no banco
+    `output`. `workers` > 1 gera os blocos em processos paralelos. `metadata`
+    (tabela -> atributos, padrão app.METADATA) dá a ordem dos atributos; tabelas
+    fora dele não são gravadas.
+    """
+    if metadata is None:
+        from app import METADATA as metadata
+    sink = _ColumnarSink(output, metadata) if fmt == 'columnar' else _SqliteSink(output, metadata)
+    counters = {'endereco': 'idendereco', 'pedido_has_produto': 'idpedidoproduto'}
+    next_id = dict.fromkeys(counters, 1)
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        tasks = chunk_tasks(scale, seed, chunk_rows)
+        chunks = pool.map(generate_chunk, tasks) if pool is not None else map(generate_chunk, tasks)
+        for tables in [domain_tables(), *chunks]:
+            for table, columns in tables.items():
+                if table in counters:
+                    count = len(columns[counters[table]])
+                    columns[counters[table]] = list(range(next_id[table], next_id[table] + count))
+                    next_id[table] += count
+                sink.append(table, columns)
+        sink.close()
+    except BaseException:
+        sink.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return sink.rows
+
+
+class _ColumnarSink:
+    """Grava cada tabela em um arquivo colunar do diretório"""
+
+    def __init__(self, directory: str, metadata: dict):
+        self.directory = directory
+        self.metadata = metadata
+        self.writers = {}
+        self.rows = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, table: str, columns: dict):
+        if table not in self.metadata:
+            return
+        writer = self.writers.get(table)
+        if writer is None:
+            path = column_store.table_path(self.directory, table)
+            writer = self.writers[table] = column_store.TableWriter(path, self.metadata[table], table)
+        writer.append(columns)
+        self.rows[table] = writer.rows
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+    def abort(self):
+        for writer in self.writers.values():
+            writer.abort()
+
+
+class _SqliteSink:
+    """Grava as tabelas em um banco SQLite (recriadas se já existirem), em uma única transação"""
+
+    def __init__(self, path: str, metadata: dict):
+        self.conn = sqlite3.connect(path)
+        self.metadata = metadata
+        self.rows = {}
+
+    def append(self, table: str, columns: dict):
+        names = self.metadata.get(table)
+        if names is None:
+            return
+        if table not in self.rows:
+            self.conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            quoted = ', '.join(f'"{c}"' for c in names)
+            self.conn.execute(f'CREATE TABLE "{table}" ({quoted})')
+            self.rows[table] = 0
+        marks = ', '.join('?' for _ in names)
+        rows = list(zip(*(columns[c] for c in names)))
+        self.conn.executemany(f'INSERT INTO "{table}" VALUES ({marks})', rows)
+        self.rows[table] += len(rows)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def abort(self):
+        self.conn.rollback()
+        self.conn.close()
@@ -0,0 +1,873 @@
+"""Execução do grafo de operadores otimizado sobre tabelas em memória.
+
+Cada nó do grafo vira um operador no modelo de iteradores (Volcano): open()
+prepara o operador e as suas entradas, next() devolve a próxima tupla (ou None
+quando acabam) e close() libera os recursos. A raiz puxa as tuplas uma a uma,
+de modo que só a entrada interna das junções (e a entrada das ordenações) é
+materializada. Essas tuplas contam no orçamento de memória da consulta
+(spill.MemoryBudget); quando ele acaba, o operador continua em disco (grace
+hash join, laços aninhados em blocos, ordenação externa) e os bytes gravados
+são reportados por operador.
+
+As tuplas são tuplas Python na ordem de `columns` do operador, uma sequência
+de pares (label, atributo). Como o validador normaliza a consulta para
+minúsculas (inclusive os literais), comparações entre textos ignoram
+maiúsculas e minúsculas; comparações com nulos ou entre tipos diferentes
+são falsas, como em SQL.
+"""
+import itertools
+import operator
+import sqlite3
+import time
+
+from catalog import Catalog
+from optimizer import PlanGraph, join_keys
+from spill import (
+    MemoryBudget, Spiller, block_nested_loop, external_sort, grace_hash_join, order_key, partition, row_bytes,
+    sort_key,
+)
+from sql_parser import (
+    Comparison, ColumnRef, ParseError, conjoin, parse_predicate, parse_sort_keys, split_attributes,
+)
+
+
+class ExecutionError(ValueError):
+    """Erro ao montar ou executar um plano"""
+
+
+class Database:
+    """Tabelas em memória: tabela -> lista de tuplas na ordem dos atributos do catálogo.
+
+    Tabelas abertas de arquivos colunares (column_store) ficam apenas em
+    colunas mapeadas em memória; as tuplas do modo tupla a tupla são montadas a
+    partir delas na primeira vez que são pedidas.
+    """
+
+    def __init__(self, catalog: Catalog, tables: dict | None = None):
+        self.catalog = catalog
+        self.tables = {}
+        self._columnar = {}
+        for table, rows in (tables or {}).items():
+            self.insert(table, rows)
+
+    def __contains__(self, table) -> bool:
+        return table in self.tables or table in self._columnar
+
+    def columns(self, table: str) -> tuple:
+        if table not in self.catalog:
+            raise ExecutionError(f"Tabela '{table}' não existe no esquema")
+        return self.catalog.columns(table)
+
+    def rows(self, table: str) -> list:
+        """Linhas da tabela (lista vazia se nada foi carregado)"""
+        columns = self.columns(table)
+        rows = self.tables.get(table)
+        if rows is None:
+            mapped = self._columnar.get(table)
+            if mapped is None:
+                return []
+            rows = self.tables[table] = list(zip(*(mapped.columns[c].to_list() for c in columns)))
+        return rows
+
+    def insert(self, table: str, rows):
+        """Acrescenta linhas dadas como tuplas (na ordem do esquema) ou dicionários atributo -> valor"""
+        columns = self.columns(table)
+        target = self.tables[table] = self.rows(table)
+        self._columnar.pop(table, None)
+        for row in rows:
+            if isinstance(row, dict):
+                row = tuple(row.get(col) for col in columns)
+            elif len(row) != len(columns):
+                raise ExecutionError(f"Linha de '{table}' com {len(row)} valores; esperados {len(columns)}")
+            target.append(tuple(row))
+
+    def columnar(self, table: str):
+        """Tabela em colunas NumPy (vectorized.ColumnarTable), convertida uma vez e reaproveitada"""
+        cached = self._columnar.get(table)
+        if cached is None:
+            from vectorized import ColumnarTable
+            cached = self._columnar[table] = ColumnarTable.from_rows(self.columns(table), self.rows(table))
+        return cached
+
+    @classmethod
+    def from_sqlite(cls, path: str, catalog: Catalog) -> 'Database':
+        """Carrega em memória as tabelas do esquema presentes em um banco SQLite"""
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            present = {row[0].lower(): row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            db = cls(catalog)
+            for table in catalog:
+                if table in present:
+                    columns = ', '.join(f'"{c}"' for c in catalog.columns(table))
+                    db.insert(table, conn.execute(f'SELECT {columns} FROM "{present[table]}"'))
+            return db
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_columnar(cls, directory: str, catalog: Catalog) -> 'Database':
+        """Abre (mmap) os arquivos colunares das tabelas do esquema presentes em um diretório"""
+        import column_store
+        db = cls(catalog)
+        present = {name.lower(): name for name in column_store.list_tables(directory)}
+        for table in catalog:
+            if table in present:
+                path = column_store.table_path(directory, present[table])
+                try:
+                    mapped = column_store.open_table(path)
+                except (OSError, ValueError) as e:
+                    raise ExecutionError(f"Arquivo da tabela '{table}' inválido: {e}")
+                missing = [c for c in catalog.columns(table) if c not in mapped.columns.columns]
+                if missing:
+                    raise ExecutionError(f"Arquivo da tabela '{table}' sem os atributos: {', '.join(missing)}")
+                db._columnar[table] = mapped.columns
+        return db
+
+
+# ==================== PREDICADOS ====================
+
+_COMPARE = {
+    '=': operator.eq, '<>': operator.ne, '<': operator.lt,
+    '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+}
+
+
+def fold_case(value):
+    """Textos em caixa dobrada (comparações sem diferenciar maiúsculas); outros valores intactos"""
+    return value.casefold() if isinstance(value, str) else value
+
+
+def column_index(columns: tuple, ref: ColumnRef, labels: dict) -> int:
+    """Posição de um atributo nas tuplas de um operador.
+
+    `labels` traduz nome de tabela ou alias para o label do SCAN; atributos não
+    qualificados precisam ser únicos entre as colunas.
+    """
+    if ref.table is not None:
+        label = labels.get(ref.table, ref.table)
+        matches = [i for i, (lbl, col) in enumerate(columns) if lbl == label and col == ref.column]
+    else:
+        matches = [i for i, (_, col) in enumerate(columns) if col == ref.column]
+    if len(matches) != 1:
+        problem = 'não encontrado' if not matches else 'ambíguo'
+        raise ExecutionError(f"Atributo '{ref.qualified}' {problem} na entrada do operador")
+    return matches[0]
+
+
+def compile_predicate(pred, columns: tuple, labels: dict):
+    """Transforma a AST de um predicado em uma função tupla -> bool"""
+    if isinstance(pred, Comparison):
+        compare = _COMPARE[pred.op]
+        left, right = (_operand(o, columns, labels) for o in (pred.left, pred.right))
+
+        def test(row):
+            a, b = left(row), right(row)
+            if a is None or b is None or isinstance(a, str) != isinstance(b, str):
+                return False
+            return compare(a, b)
+        return test
+
+    tests = [compile_predicate(p, columns, labels) for p in pred.operands]
+    if pred.op == 'and':
+        return lambda row: all(t(row) for t in tests)
+    return lambda row: any(t(row) for t in tests)
+
+
+def key_function(indexes: list):
+    """Função tupla -> chave de junção (valores em caixa dobrada nas posições `indexes`)"""
+    return lambda row: tuple(fold_case(row[i]) for i in indexes)
+
+
+def _operand(operand, columns: tuple, labels: dict):
+    if isinstance(operand, ColumnRef):
+        index = column_index(columns, operand, labels)
+        return lambda row: fold_case(row[index])
+    value = fold_case(operand.value)
+    return lambda row: value
+
+
+# ==================== OPERADORES ====================
+
+class Operator:
+    """Iterador de tuplas: open(), next() até devolver None, close().
+
+    `rows` conta as tuplas produzidas desde o último open(); `spilled_bytes`,
+    os bytes gravados em arquivos temporários; `node_id` e `node_type`
+    identificam o nó do grafo que o operador executa.
+    """
+
+    node_id = None
+    node_type = None
+    columns = ()
+    spilled_bytes = 0
+
+    def __init__(self):
+        self.rows = 0
+
+    def open(self):
+        self.rows = 0
+
+    def next(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def children(self) -> list:
+        return []
+
+    def __iter__(self):
+        self.open()
+        try:
+            while (row := self.next()) is not None:
+                yield row
+        finally:
+            self.close()
+
+
+class Scan(Operator):
+    """Leitura sequencial de uma tabela em memória"""
+
+    def __init__(self, label: str, columns: tuple, rows: list):
+        super().__init__()
+        self.label = label
+        self.columns = tuple((label, col) for col in columns)
+        self.source = rows
+        self._pos = 0
+
+    def open(self):
+        super().open()
+        self._pos = 0
+
+    def next(self):
+        if self._pos >= len(self.source):
+            return None
+        row = self.source[self._pos]
+        self._pos += 1
+        self.rows += 1
+        return row
+
+
+class Empty(Operator):
+    """Relação vazia (predicado contraditório): não lê nenhuma tabela"""
+
+    def __init__(self, columns: tuple):
+        super().__init__()
+        self.columns = columns
+
+    def next(self):
+        return None
+
+
+class _Unary(Operator):
+    def __init__(self, child: Operator):
+        super().__init__()
+        self.child = child
+
+    def open(self):
+        super().open()
+        self.child.open()
+
+    def close(self):
+        self.child.close()
+
+    def children(self) -> list:
+        return [self.child]
+
+
+class Selection(_Unary):
+    """Filtra as tuplas da entrada por um predicado"""
+
+    def __init__(self, child: Operator, test):
+        super().__init__(child)
+        self.columns = child.columns
+        self.test = test
+
+    def next(self):
+        while (row := self.child.next()) is not None:
+            if self.test(row):
+                self.rows += 1
+                return row
+        return None
+
+
+class Projection(_Unary):
+    """Mantém os atributos nas posições `indexes` da entrada"""
+
+    def __init__(self, child: Operator, indexes: list):
+        super().__init__(child)
+        self.indexes = indexes
+        self.columns = tuple(child.columns[i] for i in indexes)
+
+    def next(self):
+        row = self.child.next()
+        if row is None:
+            return None
+        self.rows += 1
+        return tuple(row[i] for i in self.indexes)
+
+
+class NestedLoopJoin(Operator):
+    """Junção por laços aninhados: a entrada direita é materializada no open().
+
+    Sem predicado, é o produto cartesiano. Se a entrada direita não couber no
+    orçamento de memória, ela vai para um arquivo temporário, relido uma vez
+    por bloco de tuplas da esquerda (laços aninhados em blocos).
+    """
+
+    def __init__(self, left: Operator, right: Operator, test=None, budget: MemoryBudget | None = None):
+        super().__init__()
+        self.left = left
+        self.right = right
+        self.test = test
+        self.budget = budget or MemoryBudget()
+        self.columns = left.columns + right.columns
+        self._spiller = Spiller(self.budget)
+        self._reserved = 0
+        self._pairs = None
+        self._inner = []
+        self._outer = None
+        self._pos = 0
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spiller.bytes
+
+    def open(self):
+        super().open()
+        self._spiller = Spiller(self.budget)
+        self._pairs = None
+        self._outer = None
+        self._pos = 0
+        if not self.budget.limited:
+            self._inner = list(self.right)
+            self.left.open()
+            return
+        self._inner = []
+        rows = iter(self.right)
+        for row in rows:
+            size = row_bytes(row)
+            if not self.budget.reserve(size):
+                self._spill(itertools.chain([row], rows))
+                return
+            self._reserved += size
+            self._inner.append(row)
+        self.left.open()
+
+    def _spill(self, remaining):
+        """Passa a laços aninhados em blocos: a entrada direita inteira vai para disco"""
+        held, self._inner = self._inner, []
+        self.budget.release(self._reserved)
+        self._reserved = 0
+        inner = self._spiller.write_all(itertools.chain(held, remaining))
+        self._pairs = block_nested_loop(self.left, inner, self.budget)
+
+    def next(self):
+        if self._pairs is not None:
+            for outer, inner in self._pairs:
+                row = outer + inner
+                if self.test is None or self.test(row):
+                    self.rows += 1
+                    return row
+            return None
+        while True:
+            if self._outer is None or self._pos >= len(self._inner):
+                self._outer = self.left.next()
+                self._pos = 0
+                if self._outer is None:
+                    return None
+                if not self._inner:
+                    # entrada interna vazia: nenhuma combinação possível
+                    self._outer = None
+                    return None
+            row = self._outer + self._inner[self._pos]
+            self._pos += 1
+            if self.test is None or self.test(row):
+                self.rows += 1
+                return row
+
+    def close(self):
+        if self._pairs is not None:
+            self._pairs.close()
+            self._pairs = None
+        self.left.close()
+        self._inner = []
+        self._outer = None
+        self.budget.release(self._reserved)
+        self._reserved = 0
+        self._spiller.close()
+
+    def children(self) -> list:
+        return [self.left, self.right]
+
+
+class HashJoin(Operator):
+    """Junção por hash sobre igualdades entre as entradas (chaves de um ou mais atributos).
+
+    No open() a entrada `build` ('left' ou 'right') é lida inteira para uma
+    tabela de hash; a outra entrada é percorrida em fluxo, uma tupla por vez,
+    buscando as tuplas com a mesma chave. Chaves com nulo nunca casam. A saída
+    mantém a ordem dos atributos esquerda + direita; `test` avalia os termos
+    residuais da condição sobre a tupla combinada.
+
+    Se a tabela de hash não couber no orçamento de memória, a junção vira um
+    grace hash join: o que já foi lido e o resto da entrada de construção são
+    particionados pelo hash da chave em arquivos temporários, a outra entrada
+    também, e cada par de partições é juntado em memória.
+    """
+
+    def __init__(self, left: Operator, right: Operator, left_keys: list, right_keys: list,
+                 build: str = 'right', test=None, budget: MemoryBudget | None = None):
+        super().__init__()
+        self.left = left
+        self.right = right
+        self.left_keys = left_keys
+        self.right_keys = right_keys
+        self.build = build
+        self.test = test
+        self.budget = budget or MemoryBudget()
+        self.columns = left.columns + right.columns
+        self._spiller = Spiller(self.budget)
+        self._reserved = 0
+        self._pairs = None
+        self._table = {}
+        self._probe_row = None
+        self._matches = ()
+        self._pos = 0
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spiller.bytes
+
+    def _sides(self):
+        if self.build == 'left':
+            return self.left, self.left_keys, self.right, self.right_keys
+        return self.right, self.right_keys, self.left, self.left_keys
+
+    def open(self):
+        super().open()
+        build, build_keys, probe, _ = self._sides()
+        self._spiller = Spiller(self.budget)
+        self._pairs = None
+        self._table = {}
+        self._probe_row, self._matches, self._pos = None, (), 0
+        limited = self.budget.limited
+        rows = iter(build)
+        for row in rows:
+            key = tuple(fold_case(row[i]) for i in build_keys)
+            if None in key:
+                continue
+            if limited:
+                size = row_bytes(row)
+                if not self.budget.reserve(size):
+                    self._spill(itertools.chain([row], rows))
+                    return
+                self._reserved += size
+            self._table.setdefault(key, []).append(row)
+        probe.open()
+
+    def _spill(self, remaining):
+        """Passa a grace hash join: particiona as duas entradas em arquivos temporários"""
+        build, build_keys, probe, probe_keys = self._sides()
+        build_key, probe_key = key_function(build_keys), key_function(probe_keys)
+        held = [row for rows in self._table.values() for row in rows]
+        self._table = {}
+        self.budget.release(self._reserved)
+        self._reserved = 0
+        build_files = partition(itertools.chain(held, remaining), build_key, 1, self._spiller)
+        del held
+        probe_files = partition(probe, probe_key, 1, self._spiller)
+        self._pairs = grace_hash_join(build_files, probe_files, build_key, probe_key, self._spiller)
+
+    def next(self):
+        if self._pairs is not None:
+            for match, probe_row in self._pairs:
+                row = match + probe_row if self.build == 'left' else probe_row + match
+                if self.test is None or self.test(row):
+                    self.rows += 1
+                    return row
+            return None
+        _, _, probe, probe_keys = self._sides()
+        while True:
+            if self._pos >= len(self._matches):
+                self._probe_row = probe.next()
+                if self._probe_row is None:
+                    return None
+                key = tuple(fold_case(self._probe_row[i]) for i in probe_keys)
+                self._matches = self._table.get(key, ())
+                self._pos = 0
+                continue
+            match = self._matches[self._pos]
+            self._pos += 1
+            row = match + self._probe_row if self.build == 'left' else self._probe_row + match
+            if self.test is None or self.test(row):
+                self.rows += 1
+                return row
+
+    def close(self):
+        if self._pairs is not None:
+            self._pairs.close()
+            self._pairs = None
+        self._sides()[2].close()
+        self._table = {}
+        self._matches = ()
+        self.budget.release(self._reserved)
+        self._reserved = 0
+        self._spiller.close()
+
+    def children(self) -> list:
+        return [self.left, self.right]
+
+
+class MergeJoin(Operator):
+    """Junção por intercalação de entradas já ordenadas pela chave.
+
+    As duas entradas chegam em ordem crescente dos atributos nas posições
+    `left_key` e `right_key` (na ordem de spill.order_key) e são percorridas
+    juntas, uma única vez: só o grupo de tuplas da direita com a chave atual
+    fica em memória. Chaves nulas nunca casam; `test` avalia as demais
+    igualdades e os termos residuais sobre a tupla combinada. Uma entrada fora
+    de ordem (estatísticas desatualizadas) é um erro de execução.
+    """
+
+    def __init__(self, left: Operator, right: Operator, left_key: int, right_key: int, test=None):
+        super().__init__()
+        self.left = left
+        self.right = right
+        self.left_key = left_key
+        self.right_key = right_key
+        self.test = test
+        self.columns = left.columns + right.columns
+        self._pairs = None
+
+    def open(self):
+        super().open()
+        self._pairs = merge_pairs(self.left, self.right, self.left_key, self.right_key)
+
+    def next(self):
+        for left, right in self._pairs:
+            row = left + right
+            if self.test is None or self.test(row):
+                self.rows += 1
+                return row
+        return None
+
+    def close(self):
+        if self._pairs is not None:
+            self._pairs.close()
+            self._pairs = None
+        self.left.close()
+        self.right.close()
+
+    def children(self) -> list:
+        return [self.left, self.right]
+
+
+def merge_pairs(left_rows, right_rows, left_key: int, right_key: int):
+    """Gera os pares (esquerda, direita) com chaves iguais de duas sequências ordenadas"""
+    left = _ordered_keys(left_rows, left_key)
+    right = _ordered_keys(right_rows, right_key)
+    lkey, lrow = next(left, (None, None))
+    rkey, rrow = next(right, (None, None))
+    while lrow is not None and rrow is not None:
+        if lkey < rkey:
+            lkey, lrow = next(left, (None, None))
+        elif rkey < lkey:
+            rkey, rrow = next(right, (None, None))
+        else:
+            key, group = lkey, []
+            while rrow is not None and rkey == key:
+                group.append(rrow)
+                rkey, rrow = next(right, (None, None))
+            while lrow is not None and lkey == key:
+                for match in group:
+                    yield lrow, match
+                lkey, lrow = next(left, (None, None))
+
+
+def _ordered_keys(rows, index: int):
+    """Pares (chave, tupla) das tuplas com chave não nula, conferindo que estão em ordem"""
+    previous = None
+    for row in rows:
+        value = row[index]
+        if value is None:
+            continue
+        key = order_key(value)
+        if previous is not None and key < previous:
+            raise ExecutionError('Entrada do merge join fora de ordem pela chave de junção '
+                                 '(estatísticas de ordem desatualizadas?)')
+        previous = key
+        yield key, row
+
+
+class Sort(_Unary):
+    """Ordena a entrada pelas chaves, pares (posição, descendente).
+
+    A entrada é lida no primeiro next(); se não couber no orçamento de memória,
+    a ordenação é externa (runs ordenados em disco, intercalados no fim). Com
+    `presorted` (o otimizador sabe que a entrada já chega na ordem pedida), as
+    tuplas passam direto, apenas conferindo a ordem.
+    """
+
+    def __init__(self, child: Operator, keys: list, budget: MemoryBudget | None = None,
+                 presorted: bool = False):
+        super().__init__(child)
+        self.columns = child.columns
+        self.keys = keys
+        self.budget = budget or MemoryBudget()
+        self.presorted = presorted
+        self._spiller = Spiller(self.budget)
+        self._sorted = None
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spiller.bytes
+
+    def open(self):
+        # a entrada é aberta pela própria leitura em external_sort
+        Operator.open(self)
+        self._spiller = Spiller(self.budget)
+        if self.presorted:
+            self._sorted = check_order(self.child, sort_key(self.keys))
+        else:
+            self._sorted = external_sort(self.child, sort_key(self.keys), self._spiller)
+
+    def next(self):
+        row = next(self._sorted, None)
+        if row is not None:
+            self.rows += 1
+        return row
+
+    def close(self):
+        if self._sorted is not None:
+            self._sorted.close()
+            self._sorted = None
+        self.child.close()
+        self._spiller.close()
+
+
+def check_order(rows, key):
+    """Repassa as tuplas, conferindo que já estão na ordem de `key`"""
+    previous = None
+    for row in rows:
+        current = key(row)
+        if previous is not None and current < previous:
+            raise ExecutionError('Entrada da ordenação fora da ordem esperada '
+                                 '(estatísticas de ordem desatualizadas?)')
+        previous = current
+        yield row
+
+
+# ==================== MONTAGEM DO PLANO ====================
+
+class PlanBuilder:
+    """Monta a árvore de operadores a partir do grafo (dicionário) otimizado.
+
+    Os métodos scan, empty, selection, projection, sort, join, hash_join e
+    merge_join criam os operadores físicos; o executor vetorizado (vectorized.VectorizedPlanBuilder)
+    os sobrescreve e reaproveita o resto da montagem. JOINs com igualdades entre
+    as entradas usam hash join, construído sobre o lado indicado pelo otimizador
+    em 'build' (a direita, em grafos não otimizados), ou merge join quando o
+    otimizador escolheu 'merge' (entradas ordenadas por 'merge_keys'). Todos os operadores que
+    materializam tuplas dividem o mesmo orçamento de memória (`budget`).
+    """
+
+    def __init__(self, graph: dict, database: Database, budget: MemoryBudget | None = None):
+        self.plan = PlanGraph.from_dict(graph)
+        self.database = database
+        self.budget = budget or MemoryBudget()
+        # nome da tabela ou alias -> label do SCAN (predicados podem usar qualquer um dos dois)
+        self.labels = {}
+        for scan in self.plan.of_type('SCAN'):
+            self.labels.setdefault(scan['details'].get('table'), scan['label'])
+            self.labels[scan['label']] = scan['label']
+
+    def build(self) -> Operator:
+        if self.plan.root is None:
+            raise ExecutionError('Grafo sem raiz')
+        return self._build(self.plan.root)
+
+    def _build(self, nid) -> Operator:
+        node = self.plan.nodes[nid]
+        kind, details = node['type'], node['details']
+        children = [self._build(child) for child in self.plan.inputs(nid)]
+
+        if kind == 'SCAN':
+            op = self.scan(node['label'], details.get('table'))
+        elif kind == 'EMPTY':
+            relations = details.get('relations', {})
+            op = self.empty(tuple((label, col) for label, table in relations.items()
+                                  for col in self.database.columns(table)))
+        elif kind == 'SELECTION':
+            op = self.selection(self._single(node, children), self._predicate(details.get('condition')))
+        elif kind == 'PROJECTION':
+            child = self._single(node, children)
+            op = self.projection(child, [i for i, _ in self.projection_items(details.get('attributes', ''), child)])
+        elif kind == 'SORT':
+            child = self._single(node, children)
+            op = self.sort(child, self._sort_keys(details.get('keys', ''), child), details.get('presorted', False))
+        elif kind in ('JOIN', 'CROSS_PRODUCT'):
+            if len(children) != 2:
+                raise ExecutionError(f"{kind} {nid} com {len(children)} entradas")
+            left, right = children
+            cond = details.get('condition') if kind == 'JOIN' else None
+            keys, residual = join_keys(self.plan, nid) if cond else ([], [])
+            if keys and details.get('algorithm') == 'merge':
+                op = self._merge_join(left, right, keys, residual, details.get('merge_keys', ()))
+            elif keys:
+                left_keys = [column_index(left.columns, ref, self.labels) for ref, _ in keys]
+                right_keys = [column_index(right.columns, ref, self.labels) for _, ref in keys]
+                op = self.hash_join(left, right, left_keys, right_keys,
+                                    details.get('build', 'right'), conjoin(residual))
+            else:
+                op = self.join(left, right, self._predicate(cond) if cond else None)
+        else:
+            raise ExecutionError(f"Operador '{kind}' não suportado")
+        op.node_id, op.node_type = nid, kind
+        return op
+
+    def _merge_join(self, left: Operator, right: Operator, keys: list, residual: list, merge_keys) -> Operator:
+        """Merge join pela chave em 'merge_keys'; as demais igualdades viram termos residuais"""
+        if len(merge_keys) != 2:
+            raise ExecutionError(f"Chaves do merge join inválidas: {merge_keys}")
+        left_key, right_key = (column_index(op.columns, ColumnRef(*key.split('.', 1)), self.labels)
+                               for op, key in zip((left, right), merge_keys))
+        others = [Comparison(a, '=', b) for a, b in keys
+                  if (column_index(left.columns, a, self.labels),
+                      column_index(right.columns, b, self.labels)) != (left_key, right_key)]
+        return self.merge_join(left, right, left_key, right_key, conjoin(others + residual))
+
+    def _single(self, node, children) -> Operator:
+        if len(children) != 1:
+            raise ExecutionError(f"{node['type']} {node['id']} com {len(children)} entradas")
+        return children[0]
+
+    def _sort_keys(self, text, child: Operator) -> list:
+        try:
+            keys = parse_sort_keys(text)
+        except ParseError as e:
+            raise ExecutionError(f"Chaves de ordenação inválidas '{text}': {e}")
+        return [(column_index(child.columns, key.column, self.labels), key.descending) for key in keys]
+
+    def _predicate(self, text):
+        try:
+            return parse_predicate(text)
+        except ParseError as e:
+            raise ExecutionError(f"Condição inválida '{text}': {e}")
+
+    # ---------- operadores físicos ----------
+    def scan(self, label: str, table: str) -> Operator:
+        return Scan(label, self.database.columns(table), self.database.rows(table))
+
+    def empty(self, columns: tuple) -> Operator:
+        return Empty(columns)
+
+    def selection(self, child: Operator, pred) -> Operator:
+        return Selection(child, compile_predicate(pred, child.columns, self.labels))
+
+    def projection(self, child: Operator, indexes: list) -> Operator:
+        return Projection(child, indexes)
+
+    def sort(self, child: Operator, keys: list, presorted: bool = False) -> Operator:
+        return Sort(child, keys, self.budget, presorted)
+
+    def join(self, left: Operator, right: Operator, pred) -> Operator:
+        test = compile_predicate(pred, left.columns + right.columns, self.labels) if pred else None
+        return NestedLoopJoin(left, right, test, self.budget)
+
+    def hash_join(self, left: Operator, right: Operator, left_keys: list, right_keys: list,
+                  build: str, residual) -> Operator:
+        test = compile_predicate(residual, left.columns + right.columns, self.labels) if residual else None
+        return HashJoin(left, right, left_keys, right_keys, build, test, self.budget)
+
+    def merge_join(self, left: Operator, right: Operator, left_key: int, right_key: int, residual) -> Operator:
+        test = compile_predicate(residual, left.columns + right.columns, self.labels) if residual else None
+        return MergeJoin(left, right, left_key, right_key, test)
+
+    def fetch(self, root: Operator, limit: int | None) -> list:
+        """Puxa as linhas da raiz (no máximo `limit`)"""
+        rows = []
+        root.open()
+        try:
+            while limit is None or len(rows) < limit:
+                row = root.next()
+                if row is None:
+                    break
+                rows.append(list(row))
+        finally:
+            root.close()
+        return rows
+
+    def projection_items(self, attributes: str, child: Operator) -> list:
+        """Pares (posição na entrada, nome na saída) da lista de atributos de uma projeção"""
+        items = split_attributes(attributes)
+        if items is None:
+            raise ExecutionError(f"Lista de atributos não suportada: '{attributes}'")
+        result = []
+        for table, column, alias in items:
+            if column == '*':
+                label = self.labels.get(table, table)
+                result.extend((i, f"{lbl}.{col}") for i, (lbl, col) in enumerate(child.columns)
+                              if table is None or lbl == label)
+                continue
+            ref = ColumnRef(table, column)
+            result.append((column_index(child.columns, ref, self.labels), alias or ref.qualified))
+        return result
+
+
+# Modos de execução: tupla a tupla (iteradores) ou vetorizado (lotes de colunas NumPy)
+EXECUTION_MODES = ('row', 'vectorized')
+
+
+def _builder_class(mode: str):
+    if mode == 'row':
+        return PlanBuilder
+    if mode == 'vectorized':
+        try:
+            from vectorized import VectorizedPlanBuilder
+        except ImportError:
+            raise RuntimeError('NumPy é necessário para a execução vetorizada (pip install numpy)')
+        return VectorizedPlanBuilder
+    raise ExecutionError(f"Modo de execução desconhecido: '{mode}'")
+
+
+def execute_graph(graph: dict, database: Database, limit: int | None = None, mode: str = 'row',
+                  memory_budget: int | None = None, spill_dir: str | None = None) -> dict:
+    """Executa o grafo (otimizado) e devolve atributos, linhas e contagens por operador.
+
+    Com `limit`, a execução para assim que a raiz produz esse número de linhas.
+    `memory_budget` (bytes, None sem limite) é o quanto os operadores podem
+    materializar antes de gravar em arquivos temporários em `spill_dir`; os
+    bytes gravados aparecem em 'spilled_bytes', por operador e no total.
+    """
+    budget = MemoryBudget(memory_budget, spill_dir)
+    builder = _builder_class(mode)(graph, database, budget)
+    root = builder.build()
+    root_node = builder.plan.nodes[builder.plan.root]
+    if root_node['type'] == 'PROJECTION':
+        names = [name for _, name in builder.projection_items(root_node['details'].get('attributes', ''),
+                                                              root.child)]
+    else:
+        names = [f"{label}.{col}" for label, col in root.columns]
+
+    start = time.perf_counter()
+    rows = builder.fetch(root, limit)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    operators, stack = [], [root]
+    while stack:
+        op = stack.pop()
+        operators.append({'id': op.node_id, 'type': op.node_type, 'rows': op.rows,
+                          'spilled_bytes': op.spilled_bytes})
+        stack.extend(op.children())
+    operators.sort(key=lambda o: o['id'])
+    return {
+        'columns': names,
+        'rows': rows,
+        'row_count': len(rows),
+        'operators': operators,
+        'spilled_bytes': sum(op['spilled_bytes'] for op in operators),
+        'peak_memory_bytes': budget.peak if budget.limited else None,
+        'elapsed_ms': elapsed,
+    }
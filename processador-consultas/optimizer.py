@@ -0,0 +1,1338 @@
+"""Otimização do grafo de operadores (HU4).
+
+O grafo trafega entre as etapas como dicionário ({'nodes', 'edges', 'root'},
+arestas no sentido filho -> pai). Para otimizar, ele é carregado em um PlanGraph,
+que mantém a adjacência indexada (entradas e saídas de cada nó), os nós
+agrupados por tipo, os SCANs por label/tabela e um alocador de ids monotônico,
+de forma que cada reescrita custe O(1) e não uma varredura das listas.
+
+Etapas, na ordem em que são aplicadas:
+1. Push-down de seleções: cada termo de uma conjunção desce até o operador mais baixo que o cobre
+   (igualdades entre as entradas de um produto cartesiano o transformam em JOIN)
+2. Inferência transitiva: filtros constantes propagados pelas igualdades das junções
+3. Simplificação dos predicados (constantes, termos redundantes e contradições, que
+   reduzem o grafo a um nó EMPTY)
+4. Ordenação das junções por custo (programação dinâmica à la Selinger)
+5. Push-down de projeções, guiado pela análise dos atributos necessários a cada operador
+6. Escolha do algoritmo de junção (merge join quando a ordem das entradas já existe
+   ou sai barata, hash join com construção sobre a entrada menor nos demais casos),
+   acompanhando as ordens interessantes para que um ORDER BY reaproveite a ordem
+   produzida abaixo dele
+"""
+import math
+import operator
+from dataclasses import replace
+
+from sql_parser import (
+    Comparison, ColumnRef, ParseError, parse_predicate, parse_sort_keys, format_predicate, conjuncts, conjoin,
+    split_attributes,
+)
+
+
+JOIN_TYPES = ('JOIN', 'CROSS_PRODUCT')
+
+
+class PlanGraph:
+    """Grafo de operadores com adjacência indexada.
+
+    As arestas vão do operador que produz as tuplas (entrada) para o que as
+    consome (saída). A ordem das entradas de um nó é significativa (lado
+    esquerdo e direito de uma junção) e é a ordem em que as arestas são
+    exportadas. Conjuntos são representados por dicionários com valor None,
+    o que preserva a ordem de inserção e mantém o resultado determinístico.
+    """
+
+    def __init__(self, root=None):
+        self.root = root
+        self.nodes = {}
+        self._inputs = {}
+        self._outputs = {}
+        self._by_type = {}
+        self._scans_by_label = {}
+        self._scans_by_table = {}
+        self._next_id = 0
+
+    @classmethod
+    def from_dict(cls, graph: dict) -> 'PlanGraph':
+        """Carrega o grafo em dicionário (cópia defensiva dos nós)"""
+        plan = cls(graph.get('root'))
+        for node in graph.get('nodes', []):
+            plan._add(dict(node))
+        for edge in graph.get('edges', []):
+            plan.add_edge(edge['from'], edge['to'])
+        return plan
+
+    def to_dict(self) -> dict:
+        return {
+            'nodes': list(self.nodes.values()),
+            'edges': [{'from': fr, 'to': to} for to in self.nodes for fr in self._inputs[to]],
+            'root': self.root,
+        }
+
+    # ---------- nós ----------
+    def _add(self, node: dict) -> dict:
+        nid = node['id']
+        self.nodes[nid] = node
+        self._inputs[nid] = {}
+        self._outputs[nid] = {}
+        self._by_type.setdefault(node['type'], {})[nid] = None
+        if node['type'] == 'SCAN':
+            self._scans_by_label.setdefault(node['label'], nid)
+            table = (node.get('details') or {}).get('table')
+            self._scans_by_table.setdefault(table, nid)
+        self._next_id = max(self._next_id, nid + 1)
+        return node
+
+    def add_node(self, node_type: str, label: str, details: dict | None = None) -> dict:
+        """Cria um nó com o próximo id livre"""
+        return self._add({'id': self._next_id, 'type': node_type, 'label': label, 'details': details or {}})
+
+    def remove_node(self, nid):
+        """Remove o nó e todas as suas arestas"""
+        for fr in list(self._inputs[nid]):
+            self.remove_edge(fr, nid)
+        for to in list(self._outputs[nid]):
+            self.remove_edge(nid, to)
+        node = self.nodes.pop(nid)
+        del self._inputs[nid], self._outputs[nid]
+        del self._by_type[node['type']][nid]
+        if node['type'] == 'SCAN':
+            for index, key in ((self._scans_by_label, node['label']),
+                               (self._scans_by_table, node['details'].get('table'))):
+                if index.get(key) == nid:
+                    del index[key]
+
+    def retype(self, nid, node_type: str, label: str, details: dict):
+        """Troca o tipo do operador mantendo o id e as arestas (ex.: CROSS_PRODUCT -> JOIN)"""
+        node = self.nodes[nid]
+        del self._by_type[node['type']][nid]
+        node.update(type=node_type, label=label, details=details)
+        self._by_type.setdefault(node_type, {})[nid] = None
+
+    def of_type(self, *types) -> list:
+        """Nós dos tipos informados, na ordem de criação"""
+        if len(types) == 1:
+            return [self.nodes[nid] for nid in self._by_type.get(types[0], ())]
+        return [n for n in self.nodes.values() if n['type'] in types]
+
+    def scan(self, name: str) -> dict | None:
+        """SCAN pelo label (alias) ou, na falta dele, pelo nome real da tabela"""
+        nid = self._scans_by_label.get(name)
+        if nid is None:
+            nid = self._scans_by_table.get(name)
+        return self.nodes[nid] if nid is not None else None
+
+    # ---------- arestas ----------
+    def add_edge(self, fr, to):
+        self._outputs[fr][to] = None
+        self._inputs[to][fr] = None
+
+    def remove_edge(self, fr, to):
+        if to in self._outputs[fr]:
+            del self._outputs[fr][to]
+            del self._inputs[to][fr]
+
+    def has_edge(self, fr, to) -> bool:
+        return to in self._outputs[fr]
+
+    def inputs(self, nid) -> list:
+        """Operadores que alimentam o nó (na ordem: esquerda, direita)"""
+        return list(self._inputs[nid])
+
+    def outputs(self, nid) -> list:
+        """Operadores que consomem o resultado do nó"""
+        return list(self._outputs[nid])
+
+    def replace_input(self, nid, old, new):
+        """Troca a entrada `old` de `nid` por `new`, na mesma posição"""
+        self._inputs[nid] = {(new if i == old else i): None for i in self._inputs[nid]}
+        del self._outputs[old][nid]
+        self._outputs[new][nid] = None
+
+    def insert_above(self, nid, new):
+        """Coloca o nó `new` entre `nid` e todos os operadores que o consomem"""
+        for out in self.outputs(nid):
+            self.replace_input(out, nid, new)
+        self.add_edge(nid, new)
+        if self.root == nid:
+            self.root = new
+
+    def bypass(self, nid):
+        """Retira um nó de entrada única do caminho, ligando sua entrada às suas saídas"""
+        source = next(iter(self._inputs[nid]))
+        for out in self.outputs(nid):
+            self.replace_input(out, nid, source)
+        self.remove_edge(source, nid)
+        if self.root == nid:
+            self.root = source
+
+    def labels_below(self, nid) -> set:
+        """Labels dos SCANs que alimentam (direta ou indiretamente) o nó"""
+        labels, stack, seen = set(), [nid], set()
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            if self.nodes[current]['type'] == 'SCAN':
+                labels.add(self.nodes[current]['label'])
+            stack.extend(self._inputs[current])
+        return labels
+
+
+# ==================== MODELO DE CUSTO ====================
+
+# Cardinalidade assumida para tabelas sem estatísticas
+DEFAULT_TABLE_ROWS = 1000
+
+# Seletividades padrão de Selinger para predicados sem estatísticas
+EQUALITY_SELECTIVITY = 0.1
+RANGE_SELECTIVITY = 1 / 3
+
+
+# Operador equivalente com os operandos trocados (1 < a  <=>  a > 1)
+_FLIPPED = {'<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+
+def _constant_comparison(pred, qualified_only=True):
+    """Normaliza `atributo op literal` (ou `literal op atributo`); None para outros predicados"""
+    if not isinstance(pred, Comparison):
+        return None
+    left, op, right = pred.left, pred.op, pred.right
+    if isinstance(right, ColumnRef) and not isinstance(left, ColumnRef):
+        left, op, right = right, _FLIPPED.get(op, op), left
+    if isinstance(left, ColumnRef) and (left.table or not qualified_only) and not isinstance(right, ColumnRef):
+        return left, op, right
+    return None
+
+
+class CostModel:
+    """Estimativas de cardinalidade usadas pela ordenação de junções.
+
+    Com estatísticas (table_stats.Statistics), usa o número de linhas de cada
+    tabela, 1/ndv para igualdades, os histogramas equi-depth para intervalos e
+    1/max(ndv) para igualdades entre atributos, descontando a fração de nulos.
+    Sem elas, toda tabela tem DEFAULT_TABLE_ROWS linhas e os predicados usam as
+    seletividades padrão de Selinger; em igualdades entre atributos, quando um
+    dos lados é a chave primária da sua tabela (inferida pelo catálogo), a
+    seletividade é 1/|tabela|.
+    """
+
+    def __init__(self, catalog=None, statistics=None):
+        self.catalog = catalog
+        self.statistics = statistics
+
+    def table_rows(self, table: str) -> float:
+        stats = self.statistics.table(table) if self.statistics is not None else None
+        if stats is None:
+            return float(DEFAULT_TABLE_ROWS)
+        return float(max(stats.rows, 1))
+
+    def clustered(self, table: str, column: str) -> bool:
+        """Se o atributo está armazenado em ordem crescente (carga ordenada), pelas estatísticas"""
+        stats = self.statistics.column(table, column) if self.statistics is not None else None
+        return stats is not None and stats.clustered
+
+    def column_stats(self, ref: ColumnRef, relations: dict):
+        """Estatísticas do atributo referenciado (label resolvido para a tabela), se houver"""
+        if self.statistics is None:
+            return None
+        return self.statistics.column(relations.get(ref.table, ref.table), ref.column)
+
+    def selectivity(self, pred, relations: dict) -> float:
+        """Fração das tuplas que satisfaz o predicado (relations: label -> tabela)"""
+        if not isinstance(pred, Comparison):
+            sels = [self.selectivity(p, relations) for p in pred.operands]
+            result = 1.0
+            if pred.op == 'and':
+                for s in sels:
+                    result *= s
+                return result
+            for s in sels:
+                result *= 1.0 - s
+            return 1.0 - result
+        left, right, op = pred.left, pred.right, pred.op
+        if isinstance(left, ColumnRef) and isinstance(right, ColumnRef):
+            if op == '=':
+                return self._column_equality_selectivity(left, right, relations)
+            return RANGE_SELECTIVITY if op != '<>' else 1.0 - EQUALITY_SELECTIVITY
+        if isinstance(right, ColumnRef):
+            left, right, op = right, left, _FLIPPED.get(op, op)
+        if isinstance(left, ColumnRef):
+            stats = self.column_stats(left, relations)
+            if stats is not None:
+                return self._literal_selectivity(stats, op, right.value)
+        if op == '=':
+            return EQUALITY_SELECTIVITY
+        if op == '<>':
+            return 1.0 - EQUALITY_SELECTIVITY
+        return RANGE_SELECTIVITY
+
+    def _literal_selectivity(self, stats, op: str, value) -> float:
+        present = 1.0 - stats.null_frac
+        ndv = max(stats.ndv, 1)
+        if op == '=':
+            return present / ndv
+        if op == '<>':
+            return present * (1.0 - 1.0 / ndv)
+        if op in ('<', '>='):
+            below = stats.fraction_below(value)
+        else:
+            below = stats.fraction_below(value, inclusive=True)
+        if below is None:
+            return RANGE_SELECTIVITY
+        return present * (below if op in ('<', '<=') else 1.0 - below)
+
+    def _column_equality_selectivity(self, left: ColumnRef, right: ColumnRef, relations: dict) -> float:
+        left_stats, right_stats = self.column_stats(left, relations), self.column_stats(right, relations)
+        if left_stats is not None and right_stats is not None:
+            present = (1.0 - left_stats.null_frac) * (1.0 - right_stats.null_frac)
+            return present / max(left_stats.ndv, right_stats.ndv, 1)
+        sel = EQUALITY_SELECTIVITY
+        for ref in (left, right):
+            table = relations.get(ref.table, ref.table)
+            if self.catalog is not None and table in self.catalog and self.catalog.primary_key(table) == ref.column:
+                sel = min(sel, 1.0 / self.table_rows(table))
+        return sel
+
+    def node_rows(self, plan: PlanGraph, nid, relations: dict) -> float:
+        """Cardinalidade estimada do resultado de um nó do grafo"""
+        node = plan.nodes[nid]
+        details = node.get('details') or {}
+        if node['type'] == 'SCAN':
+            return self.table_rows(details.get('table'))
+        rows = 1.0
+        for i in plan.inputs(nid):
+            rows *= self.node_rows(plan, i, relations)
+        cond = details.get('condition')
+        if cond and node['type'] in ('SELECTION', 'JOIN'):
+            try:
+                rows *= self.selectivity(parse_predicate(cond), relations)
+            except ParseError:
+                pass
+        return rows
+
+
+# ==================== SIMPLIFICAÇÃO DE PREDICADOS ====================
+
+_COMPARE = {
+    '=': operator.eq, '<>': operator.ne, '<': operator.lt,
+    '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+}
+
+
+def _comparable(a, b) -> bool:
+    """Números só se comparam com números e strings com strings"""
+    return isinstance(a, str) == isinstance(b, str)
+
+
+def _fold_constant(pred):
+    """Valor de uma comparação entre dois literais (None se não for o caso ou se os tipos diferirem)"""
+    if not isinstance(pred, Comparison) or isinstance(pred.left, ColumnRef) or isinstance(pred.right, ColumnRef):
+        return None
+    left, right = pred.left.value, pred.right.value
+    if not _comparable(left, right) or pred.op not in _COMPARE:
+        return None
+    return _COMPARE[pred.op](left, right)
+
+
+class _ColumnRange:
+    """Restrições de um atributo comparado com literais: igualdade, limites e diferenças"""
+
+    def __init__(self, column: ColumnRef):
+        self.column = column
+        self.eq = None
+        self.low = None
+        self.high = None
+        self.ne = {}
+        self.kept = []
+
+    def add(self, pred, op: str, literal) -> bool:
+        """Acrescenta `atributo op literal`; False se a restrição contradiz as anteriores"""
+        value = literal.value
+        known = next((b[0] for b in (self.eq, self.low, self.high) if b is not None), next(iter(self.ne), None))
+        if (known is not None and not _comparable(known, value)) or op not in _COMPARE:
+            # tipos misturados: o termo é mantido como está
+            self.kept.append(pred)
+            return True
+        if op == '=':
+            if self.eq is not None and self.eq[0] != value:
+                return False
+            self.eq = (value, literal)
+        elif op == '<>':
+            self.ne[value] = literal
+        elif op in ('>', '>='):
+            inclusive = op == '>='
+            if self.low is None or value > self.low[0] or (value == self.low[0] and not inclusive):
+                self.low = (value, inclusive, literal)
+        else:
+            inclusive = op == '<='
+            if self.high is None or value < self.high[0] or (value == self.high[0] and not inclusive):
+                self.high = (value, inclusive, literal)
+        return True
+
+    def _allows(self, value) -> bool:
+        if self.low is not None and (value < self.low[0] or (value == self.low[0] and not self.low[1])):
+            return False
+        if self.high is not None and (value > self.high[0] or (value == self.high[0] and not self.high[1])):
+            return False
+        return True
+
+    def predicates(self) -> list | None:
+        """Termos equivalentes mais simples (None se o intervalo é vazio)"""
+        col = self.column
+        if self.eq is None and self.low is not None and self.high is not None:
+            if self.low[0] > self.high[0]:
+                return None
+            if self.low[0] == self.high[0]:
+                if not (self.low[1] and self.high[1]):
+                    return None
+                self.eq = (self.low[0], self.low[2])
+        if self.eq is not None:
+            value, literal = self.eq
+            if not self._allows(value) or value in self.ne:
+                return None
+            return [Comparison(col, '=', literal)] + self.kept
+        preds = []
+        if self.low is not None:
+            preds.append(Comparison(col, '>=' if self.low[1] else '>', self.low[2]))
+        if self.high is not None:
+            preds.append(Comparison(col, '<=' if self.high[1] else '<', self.high[2]))
+        preds.extend(Comparison(col, '<>', literal) for value, literal in self.ne.items() if self._allows(value))
+        return preds + self.kept
+
+
+def simplify_conjuncts(terms: list) -> list | None:
+    """Simplifica uma conjunção de predicados.
+
+    - comparações entre literais são avaliadas (verdadeiras somem, falsas contradizem)
+    - termos repetidos são descartados
+    - comparações de um mesmo atributo com literais são reduzidas às mais restritivas
+      (a > 5 ∧ a > 10 → a > 10; a ≥ 3 ∧ a ≤ 3 → a = 3)
+
+    Devolve None quando a conjunção é contraditória (x = 1 ∧ x = 2, a > 10 ∧ a < 5).
+    """
+    items, seen, ranges = [], set(), {}
+    for pred in terms:
+        folded = _fold_constant(pred)
+        if folded is True:
+            continue
+        if folded is False:
+            return None
+        text = format_predicate(replace(pred, parens=0))
+        if text in seen:
+            continue
+        seen.add(text)
+        comparison = _constant_comparison(pred, qualified_only=False)
+        if comparison is None:
+            items.append(pred)
+            continue
+        column, op, literal = comparison
+        if column.qualified not in ranges:
+            ranges[column.qualified] = _ColumnRange(column)
+            items.append(ranges[column.qualified])
+        if not ranges[column.qualified].add(pred, op, literal):
+            return None
+
+    simplified = []
+    for item in items:
+        if isinstance(item, _ColumnRange):
+            preds = item.predicates()
+            if preds is None:
+                return None
+            simplified.extend(preds)
+        else:
+            simplified.append(item)
+    return simplified
+
+
+def _selection_chain(plan: PlanGraph, scan_id) -> list:
+    """Seleções empilhadas logo acima de um SCAN (da mais baixa para a mais alta)"""
+    chain, current = [], scan_id
+    while True:
+        outs = plan.outputs(current)
+        if len(outs) != 1 or plan.nodes[outs[0]]['type'] != 'SELECTION' or len(plan.inputs(outs[0])) != 1:
+            return chain
+        current = outs[0]
+        chain.append(current)
+
+
+def _simplify_predicates(plan: PlanGraph) -> str | None:
+    """Simplifica as condições das seleções e junções do grafo.
+
+    Cada condição é simplificada isoladamente e, em seguida, as seleções
+    empilhadas sobre um mesmo SCAN são simplificadas em conjunto (onde filtros
+    inferidos encontram os da consulta). Devolve o predicado contraditório
+    quando a consulta com certeza não retorna linhas.
+    """
+    for node in plan.of_type('SELECTION', 'JOIN'):
+        cond = node['details'].get('condition')
+        if not cond:
+            continue
+        try:
+            simplified = simplify_conjuncts(conjuncts(parse_predicate(cond)))
+        except ParseError:
+            continue
+        if simplified is None:
+            return cond
+        if simplified:
+            node['details']['condition'] = format_predicate(conjoin(simplified))
+        elif node['type'] == 'SELECTION':
+            # condição sempre verdadeira
+            plan.bypass(node['id'])
+            plan.remove_node(node['id'])
+        else:
+            left, right = plan.inputs(node['id'])
+            plan.retype(node['id'], 'CROSS_PRODUCT', '×', {
+                'left': plan.nodes[left]['label'], 'right': plan.nodes[right]['label']})
+
+    for scan in plan.of_type('SCAN'):
+        chain = _selection_chain(plan, scan['id'])
+        if len(chain) < 2:
+            continue
+        conditions = [plan.nodes[nid]['details']['condition'] for nid in chain]
+        try:
+            terms = [t for cond in conditions for t in conjuncts(parse_predicate(cond))]
+        except ParseError:
+            continue
+        simplified = simplify_conjuncts(terms)
+        if simplified is None:
+            return format_predicate(conjoin(terms))
+        inferred = {plan.nodes[nid]['details']['condition'] for nid in chain
+                    if plan.nodes[nid]['details'].get('inferred')}
+        # um termo por seleção: sobras da cadeia são removidas e termos a mais ganham novas seleções
+        top = chain[-1]
+        for i, pred in enumerate(simplified):
+            text = format_predicate(pred)
+            details = {'condition': text, **({'inferred': True} if text in inferred else {})}
+            if i < len(chain):
+                plan.nodes[chain[i]]['details'] = details
+            else:
+                node = plan.add_node('SELECTION', 'σ', details)
+                plan.insert_above(top, node['id'])
+                top = node['id']
+        for nid in chain[len(simplified):]:
+            plan.bypass(nid)
+            plan.remove_node(nid)
+    return None
+
+
+def _make_empty(plan: PlanGraph, reason: str):
+    """Substitui o grafo por EMPTY -> projeção raiz: nenhuma tabela precisa ser lida"""
+    root = plan.root
+    relations = {s['label']: s['details'].get('table') for s in plan.of_type('SCAN')}
+    for nid in list(plan.nodes):
+        if nid != root:
+            plan.remove_node(nid)
+    empty = plan.add_node('EMPTY', '∅', {'reason': reason, 'relations': relations})
+    if root in plan.nodes:
+        plan.add_edge(empty['id'], root)
+    else:
+        plan.root = empty['id']
+
+
+# ==================== ORDENAÇÃO DE JUNÇÕES ====================
+
+# Acima deste número de relações a enumeração exaustiva dá lugar à gulosa
+DP_MAX_RELATIONS = 10
+
+
+class _JoinProblem:
+    """Relações de uma região de junções e os predicados que as ligam (por máscara de bits)"""
+
+    def __init__(self, rows: list, preds: list, masks: list, selectivities: list):
+        self.n = len(rows)
+        self.rows = rows
+        self.preds = preds
+        self.masks = masks
+        self.selectivities = selectivities
+        self._card = {}
+
+    def cardinality(self, subset: int) -> float:
+        """Linhas estimadas do resultado da junção das relações em `subset`"""
+        card = self._card.get(subset)
+        if card is None:
+            card = 1.0
+            for i in range(self.n):
+                if subset >> i & 1:
+                    card *= self.rows[i]
+            for mask, sel in zip(self.masks, self.selectivities):
+                if mask & subset == mask and mask & (mask - 1):
+                    card *= sel
+            self._card[subset] = card
+        return card
+
+    def connected(self, left: int, right: int) -> bool:
+        both = left | right
+        return any(m & left and m & right and m & both == m for m in self.masks)
+
+    def tree_cost(self, tree) -> float:
+        """Custo C_out: soma das cardinalidades dos resultados intermediários"""
+        if isinstance(tree, int):
+            return 0.0
+        return self.tree_cost(tree[0]) + self.tree_cost(tree[1]) + self.cardinality(_tree_mask(tree))
+
+    def best_tree_dp(self):
+        """Melhor árvore (esquerda-profunda ou arbustiva) por programação dinâmica sobre subconjuntos"""
+        full = (1 << self.n) - 1
+        allow_cross = not self._graph_connected()
+        best = {1 << i: (0.0, i) for i in range(self.n)}
+        for subset in range(1, full + 1):
+            if subset & (subset - 1) == 0:
+                continue
+            low = subset & -subset
+            candidate = None
+            left = (subset - 1) & subset
+            while left:
+                right = subset ^ left
+                # cada divisão é visitada uma vez: o lado esquerdo contém a menor relação
+                if left & low and left in best and right in best and (allow_cross or self.connected(left, right)):
+                    cost = best[left][0] + best[right][0]
+                    if candidate is None or cost < candidate[0]:
+                        candidate = (cost, _orient(self, best[left][1], best[right][1]))
+                left = (left - 1) & subset
+            if candidate is not None:
+                best[subset] = (candidate[0] + self.cardinality(subset), candidate[1])
+        return best[full][1]
+
+    def best_tree_greedy(self):
+        """Heurística gulosa (GOO): junta repetidamente o par cujo resultado é o menor"""
+        trees = {1 << i: i for i in range(self.n)}
+        owner = [1 << i for i in range(self.n)]
+        members = [[i for i in range(self.n) if mask >> i & 1] for mask in self.masks]
+        while len(trees) > 1:
+            pairs = {}
+            for relations, sel in zip(members, self.selectivities):
+                parts = {owner[i] for i in relations}
+                if len(parts) == 2:
+                    pair = tuple(sorted(parts))
+                    pairs[pair] = pairs.get(pair, 1.0) * sel
+            if pairs:
+                left, right = min(pairs, key=lambda p: (
+                    self.cardinality(p[0]) * self.cardinality(p[1]) * pairs[p], p))
+            else:
+                # sem predicados ligando os componentes: produto cartesiano dos dois menores
+                left, right = sorted(trees, key=lambda m: (self.cardinality(m), m))[:2]
+            merged = left | right
+            trees[merged] = _orient(self, trees.pop(left), trees.pop(right))
+            for i in range(self.n):
+                if merged >> i & 1:
+                    owner[i] = merged
+        return next(iter(trees.values()))
+
+    def _graph_connected(self) -> bool:
+        reached, changed = 1, True
+        while changed:
+            changed = False
+            for mask in self.masks:
+                if mask & reached and mask | reached != reached:
+                    reached |= mask
+                    changed = True
+        return reached == (1 << self.n) - 1
+
+
+def _tree_mask(tree) -> int:
+    if isinstance(tree, int):
+        return 1 << tree
+    return _tree_mask(tree[0]) | _tree_mask(tree[1])
+
+
+def _orient(problem: _JoinProblem, a, b) -> tuple:
+    """Lado esquerdo: a subárvore com mais relações (ou, no empate, mais linhas)"""
+    key = lambda t: (bin(_tree_mask(t)).count('1'), problem.cardinality(_tree_mask(t)))
+    return (a, b) if key(a) >= key(b) else (b, a)
+
+
+def _join_region(plan: PlanGraph, top) -> tuple:
+    """Nós de junção abaixo de `top` e as relações (entradas que não são junções) da esquerda para a direita"""
+    joins, units = [], []
+
+    def visit(nid):
+        if plan.nodes[nid]['type'] in JOIN_TYPES:
+            joins.append(nid)
+            for i in plan.inputs(nid):
+                visit(i)
+        else:
+            units.append(nid)
+
+    visit(top)
+    return joins, units
+
+
+def _existing_tree(plan: PlanGraph, nid, unit_index: dict):
+    if nid in unit_index:
+        return unit_index[nid]
+    left, right = plan.inputs(nid)
+    return (_existing_tree(plan, left, unit_index), _existing_tree(plan, right, unit_index))
+
+
+def _reorder_joins(plan: PlanGraph, cost_model: CostModel):
+    """Substitui cada região de junções pela árvore de menor custo estimado"""
+    relations = {n['label']: n['details'].get('table') for n in plan.of_type('SCAN')}
+    tops = [j['id'] for j in plan.of_type(*JOIN_TYPES)
+            if not any(plan.nodes[o]['type'] in JOIN_TYPES for o in plan.outputs(j['id']))]
+    for top in tops:
+        joins, units = _join_region(plan, top)
+        if len(units) < 3 or any(len(plan.inputs(j)) != 2 for j in joins):
+            continue
+
+        unit_of_label = {}
+        for index, unit in enumerate(units):
+            for label in plan.labels_below(unit):
+                unit_of_label[label] = index
+
+        preds, masks = [], []
+        try:
+            for j in joins:
+                cond = plan.nodes[j]['details'].get('condition')
+                for pred in conjuncts(parse_predicate(cond)) if cond else []:
+                    mask = 0
+                    for col in pred.columns():
+                        if col.table not in unit_of_label:
+                            raise ParseError('referência fora da região de junções')
+                        mask |= 1 << unit_of_label[col.table]
+                    if not mask:
+                        raise ParseError('predicado sem referência a atributos')
+                    preds.append(pred)
+                    masks.append(mask)
+        except ParseError:
+            continue
+
+        rows = [cost_model.node_rows(plan, unit, relations) for unit in units]
+        sels = [cost_model.selectivity(p, relations) for p in preds]
+        # predicados de uma única relação reduzem a sua cardinalidade de base
+        for mask, sel in zip(masks, sels):
+            if not mask & (mask - 1):
+                rows[mask.bit_length() - 1] *= sel
+        problem = _JoinProblem(rows, preds, masks, sels)
+
+        best = problem.best_tree_dp() if problem.n <= DP_MAX_RELATIONS else problem.best_tree_greedy()
+        current = _existing_tree(plan, top, {u: i for i, u in enumerate(units)})
+        if problem.tree_cost(best) >= problem.tree_cost(current) * (1 - 1e-9):
+            continue
+        _replace_join_region(plan, top, joins, units, problem, best)
+
+
+def _replace_join_region(plan: PlanGraph, top, joins: list, units: list, problem: _JoinProblem, tree):
+    """Constrói a nova árvore de junções e a liga no lugar da antiga"""
+    placed = [False] * len(problem.preds)
+
+    def build(subtree):
+        if isinstance(subtree, int):
+            return units[subtree]
+        left, right = build(subtree[0]), build(subtree[1])
+        subset = _tree_mask(subtree)
+        local = []
+        for k, mask in enumerate(problem.masks):
+            if not placed[k] and mask & subset == mask:
+                placed[k] = True
+                local.append(problem.preds[k])
+        if local:
+            node = plan.add_node('JOIN', '⋈', {'condition': format_predicate(conjoin(local))})
+        else:
+            node = plan.add_node('CROSS_PRODUCT', '×', {
+                'left': plan.nodes[left]['label'], 'right': plan.nodes[right]['label']})
+        plan.add_edge(left, node['id'])
+        plan.add_edge(right, node['id'])
+        return node['id']
+
+    new_top = build(tree)
+    for out in plan.outputs(top):
+        plan.replace_input(out, top, new_top)
+    if plan.root == top:
+        plan.root = new_top
+    for j in joins:
+        plan.remove_node(j)
+
+
+# ==================== INFERÊNCIA TRANSITIVA ====================
+
+class _ColumnClasses:
+    """Classes de equivalência de atributos (union-find sobre 'label.coluna')"""
+
+    def __init__(self):
+        self._parent = {}
+
+    def find(self, column: str) -> str:
+        parent = self._parent.setdefault(column, column)
+        if parent != column:
+            parent = self._parent[column] = self.find(parent)
+        return parent
+
+    def union(self, a: str, b: str):
+        self._parent[self.find(a)] = self.find(b)
+
+    def members(self, column: str) -> list:
+        root = self.find(column)
+        return [c for c in self._parent if self.find(c) == root]
+
+
+def _infer_transitive_predicates(plan: PlanGraph):
+    """Propaga filtros constantes pelas igualdades das junções.
+
+    As igualdades a.x = b.y das condições de JOIN formam classes de equivalência
+    de atributos; cada comparação de um atributo com um literal (em seleções ou
+    nas próprias junções) é repetida para os demais atributos da classe, como
+    seleção logo acima do SCAN da respectiva tabela. Ex.: c.id = p.cid ∧ c.id = 42
+    implica p.cid = 42.
+    """
+    classes = _ColumnClasses()
+    constants = []
+    for node in plan.of_type('JOIN', 'SELECTION'):
+        cond = node['details'].get('condition')
+        if not cond:
+            continue
+        try:
+            terms = conjuncts(parse_predicate(cond))
+        except ParseError:
+            continue
+        for pred in terms:
+            if node['type'] == 'JOIN' and _is_equi_join(pred) and pred.left.table and pred.right.table:
+                classes.union(pred.left.qualified, pred.right.qualified)
+            else:
+                comparison = _constant_comparison(pred)
+                if comparison is not None:
+                    constants.append(comparison)
+
+    existing = {n['details'].get('condition') for n in plan.of_type('SELECTION')}
+    for column, op, literal in constants:
+        for member in classes.members(column.qualified):
+            table, name = member.split('.', 1)
+            scan = plan.scan(table)
+            if member == column.qualified or scan is None:
+                continue
+            text = format_predicate(Comparison(ColumnRef(table, name), op, literal))
+            if text in existing:
+                continue
+            existing.add(text)
+            node = plan.add_node('SELECTION', 'σ', {'condition': text, 'inferred': True})
+            plan.insert_above(scan['id'], node['id'])
+
+
+# ==================== PUSH-DOWN ====================
+
+def _predicate_labels(plan: PlanGraph, pred) -> set | None:
+    """Labels dos SCANs referenciados pelo predicado (None se algum não puder ser resolvido)"""
+    scans = plan.of_type('SCAN')
+    labels = set()
+    for col in pred.columns():
+        if col.table is None:
+            # atributo não qualificado só é resolvido quando a consulta tem uma única tabela
+            if len(scans) != 1:
+                return None
+            labels.add(scans[0]['label'])
+            continue
+        # o predicado pode usar o alias ou o nome real da tabela
+        scan = plan.scan(col.table)
+        if scan is None:
+            return None
+        labels.add(scan['label'])
+    return labels
+
+
+def _is_equi_join(pred) -> bool:
+    """Igualdade entre atributos de tabelas diferentes (a.x = b.y)"""
+    return (isinstance(pred, Comparison) and pred.op == '='
+            and isinstance(pred.left, ColumnRef) and isinstance(pred.right, ColumnRef)
+            and pred.left.table != pred.right.table)
+
+
+def _lowest_cover(plan: PlanGraph, start, labels: set, labels_of) -> int:
+    """Operador mais baixo, a partir de `start`, cuja saída contém todas as tabelas do predicado"""
+    current = start
+    while True:
+        for child in plan.inputs(current):
+            if labels <= labels_of(child):
+                current = child
+                break
+        else:
+            return current
+
+
+def _push_down_selections(plan: PlanGraph):
+    """Decompõe cada seleção em conjunções e desce cada termo até o operador mais baixo que o cobre.
+
+    Termos de uma única tabela ficam logo acima do SCAN; termos que cobrem as
+    duas entradas de um JOIN passam a fazer parte da condição da junção; os
+    demais (ex.: acima de um produto cartesiano) ficam como seleção logo acima
+    do operador que reúne as tabelas.
+    """
+    memo = {}
+
+    def labels_of(nid):
+        if nid not in memo:
+            memo[nid] = plan.labels_below(nid)
+        return memo[nid]
+
+    for sel in plan.of_type('SELECTION'):
+        sel_id = sel['id']
+        cond = sel['details'].get('condition') if sel['details'] else None
+        if not cond or len(plan.inputs(sel_id)) != 1:
+            continue
+        try:
+            terms = conjuncts(parse_predicate(cond))
+        except ParseError:
+            continue
+
+        # Retirar a seleção do caminho; cada termo é recolocado a partir de onde ela estava
+        anchor = plan.inputs(sel_id)[0]
+        plan.bypass(sel_id)
+
+        # Igualdades entre atributos são colocadas antes, para que produtos cartesianos
+        # virem junções e os demais termos de duas tabelas se juntem a elas. Os outros
+        # termos são processados do último para o primeiro: o primeiro fica mais perto dos dados.
+        order = sorted(range(len(terms) - 1, -1, -1), key=lambda i: not _is_equi_join(terms[i]))
+        for index in order:
+            pred = terms[index]
+            text = format_predicate(pred)
+            labels = _predicate_labels(plan, pred)
+            target = anchor
+            if labels and labels <= labels_of(anchor):
+                target = _lowest_cover(plan, anchor, labels, labels_of)
+
+            node = plan.nodes[target]
+            if node['type'] == 'CROSS_PRODUCT' and _is_equi_join(pred) and len(labels) > 1:
+                # σ{a.x=b.y}(A × B) ≡ A ⋈{a.x=b.y} B
+                plan.retype(target, 'JOIN', '⋈', {'condition': text})
+                continue
+            if node['type'] == 'JOIN' and len(labels or ()) > 1:
+                join_cond = node['details'].get('condition')
+                node['details']['condition'] = format_predicate(
+                    conjoin(conjuncts(parse_predicate(join_cond)) + [pred]) if join_cond else pred)
+                continue
+            if index == 0:
+                sel['details']['condition'] = text
+                term_id = sel_id
+            else:
+                term_id = plan.add_node('SELECTION', 'σ', {'condition': text})['id']
+            plan.insert_above(target, term_id)
+
+        if not plan.inputs(sel_id) and not plan.outputs(sel_id):
+            plan.remove_node(sel_id)
+
+
+class _ColumnResolver:
+    """Resolve referências a atributos para (label do SCAN, atributo) usando o catálogo"""
+
+    def __init__(self, plan: PlanGraph, catalog):
+        self.plan = plan
+        self.catalog = catalog
+        self.scans = plan.of_type('SCAN')
+        self.tables = {s['label']: s['details'].get('table') for s in self.scans}
+
+    def table_columns(self, label: str):
+        """Atributos da tabela do SCAN, na ordem do esquema (None se desconhecidos)"""
+        table = self.tables.get(label)
+        if self.catalog is None or table not in self.catalog:
+            return None
+        return self.catalog.columns(table)
+
+    def label(self, name: str | None, column: str) -> str | None:
+        if name is not None:
+            scan = self.plan.scan(name)
+            return scan['label'] if scan is not None else None
+        if len(self.scans) == 1:
+            return self.scans[0]['label']
+        if self.catalog is None:
+            return None
+        owners = self.catalog.resolve_column(column, self.tables)
+        return owners[0] if len(owners) == 1 else None
+
+    def predicate_columns(self, cond: str) -> set | None:
+        """Atributos (label, atributo) usados por uma condição"""
+        try:
+            pred = parse_predicate(cond)
+        except ParseError:
+            return None
+        return self._resolve(pred.columns())
+
+    def sort_columns(self, keys: str) -> set | None:
+        """Atributos (label, atributo) usados pelas chaves de uma ordenação"""
+        try:
+            parsed = parse_sort_keys(keys)
+        except ParseError:
+            return None
+        return self._resolve(key.column for key in parsed)
+
+    def _resolve(self, refs) -> set | None:
+        result = set()
+        for col in refs:
+            label = self.label(col.table, col.column)
+            if label is None:
+                return None
+            result.add((label, col.column))
+        return result
+
+    def select_columns(self, attributes: str) -> set | None:
+        """Atributos pedidos pela projeção raiz, com * e label.* expandidos pelo catálogo"""
+        items = split_attributes(attributes)
+        if items is None:
+            return None
+        result = set()
+        for name, column, _ in items:
+            if column == '*':
+                labels = [s['label'] for s in self.scans] if name is None else [self.label(name, column)]
+                for label in labels:
+                    columns = self.table_columns(label) if label else None
+                    if columns is None:
+                        return None
+                    result.update((label, c) for c in columns)
+                continue
+            label = self.label(name, column)
+            if label is None:
+                return None
+            result.add((label, column))
+        return result
+
+    def format(self, columns: set) -> str:
+        """Lista label.atributo agrupada pela ordem dos SCANs e pela ordem do esquema"""
+        order = {s['label']: i for i, s in enumerate(self.scans)}
+
+        def key(item):
+            label, column = item
+            table_columns = self.table_columns(label) or ()
+            position = table_columns.index(column) if column in table_columns else len(table_columns)
+            return order.get(label, len(order)), position, column
+
+        return ','.join(f"{label}.{column}" for label, column in sorted(columns, key=key))
+
+
+def _required_columns(plan: PlanGraph, resolver: _ColumnResolver):
+    """Análise de cima para baixo: atributos que cada operador precisa entregar ao seu consumidor.
+
+    A raiz pede os atributos do SELECT; uma seleção pede o que lhe pedem mais os
+    atributos da sua condição (uma ordenação, os das suas chaves); uma junção, o mesmo, repartido entre as entradas
+    pelo label de cada atributo. Devolve (nó -> atributos, nós abaixo de alguma
+    junção), ou None se algum atributo não puder ser resolvido (a análise é
+    então abandonada).
+    """
+    root = plan.nodes.get(plan.root)
+    if root is None or root['type'] != 'PROJECTION':
+        return None
+    needed = resolver.select_columns(root['details'].get('attributes', ''))
+    if needed is None:
+        return None
+
+    required, below_join = {}, set()
+    stack = [(child, needed, False) for child in plan.inputs(root['id'])]
+    while stack:
+        nid, columns, under_join = stack.pop()
+        required[nid] = columns
+        if under_join:
+            below_join.add(nid)
+        node = plan.nodes[nid]
+        used = set()
+        if node['type'] in ('SELECTION', 'JOIN') and node['details'].get('condition'):
+            used = resolver.predicate_columns(node['details']['condition'])
+        elif node['type'] == 'SORT':
+            used = resolver.sort_columns(node['details'].get('keys', ''))
+        if used is None:
+            return None
+        columns = columns | used
+        inputs = plan.inputs(nid)
+        if len(inputs) == 1:
+            stack.append((inputs[0], columns, under_join))
+        else:
+            for child in inputs:
+                labels = plan.labels_below(child)
+                stack.append((child, {c for c in columns if c[0] in labels}, True))
+    return required, below_join
+
+
+def _push_down_projections(plan: PlanGraph, catalog=None):
+    """Insere projeções estreitas onde elas reduzem a largura das tuplas.
+
+    Com o resultado de _required_columns, cada operador que entrega mais
+    atributos do que o seu consumidor precisa ganha uma projeção logo acima:
+    os SCANs (que entregam todos os atributos da tabela), as seleções cujos
+    atributos da condição não são usados depois e as junções cujos atributos
+    de junção deixam de ser necessários. Só vale para operadores que alimentam
+    uma junção: numa cadeia sem junções a projeção da raiz já basta.
+    """
+    resolver = _ColumnResolver(plan, catalog)
+    analysis = _required_columns(plan, resolver)
+    if analysis is None:
+        return
+    required, below_join = analysis
+
+    emitted = {}
+    # de baixo para cima: o que cada operador entrega depois das projeções inseridas abaixo dele
+    for nid in _bottom_up(plan, plan.root):
+        node = plan.nodes[nid]
+        if nid not in below_join:
+            continue
+        if node['type'] == 'SCAN':
+            columns = resolver.table_columns(node['label'])
+            output = {(node['label'], c) for c in columns} if columns is not None else None
+        else:
+            output = set()
+            for child in plan.inputs(nid):
+                output |= emitted.get(child) or set()
+        needed = required[nid]
+        if needed and (output is None or needed < output):
+            proj = plan.add_node('PROJECTION', 'π', {'attributes': resolver.format(needed)})
+            plan.insert_above(nid, proj['id'])
+            emitted[proj['id']] = output = needed
+        emitted[nid] = output
+
+
+def _bottom_up(plan: PlanGraph, root) -> list:
+    """Nós abaixo de `root` em pós-ordem (entradas antes dos consumidores)"""
+    order, stack, seen = [], [(root, False)], set()
+    while stack:
+        nid, expanded = stack.pop()
+        if expanded:
+            order.append(nid)
+            continue
+        if nid in seen:
+            continue
+        seen.add(nid)
+        stack.append((nid, True))
+        stack.extend((child, False) for child in reversed(plan.inputs(nid)))
+    return order
+
+
+# ==================== ALGORITMOS DE JUNÇÃO ====================
+
+def join_keys(plan: PlanGraph, nid) -> tuple:
+    """Decompõe a condição de um JOIN em chaves de igualdade e termos residuais.
+
+    Devolve (chaves, residuais): cada chave é um par (atributo da entrada
+    esquerda, atributo da entrada direita) de um termo a.x = b.y; os demais
+    termos (desigualdades, disjunções, atributos não qualificados) ficam em
+    residuais, a serem avaliados sobre as tuplas já combinadas.
+    """
+    cond = plan.nodes[nid]['details'].get('condition')
+    if not cond:
+        return [], []
+    try:
+        terms = conjuncts(parse_predicate(cond))
+    except ParseError:
+        return [], []
+    inputs = plan.inputs(nid)
+    if len(inputs) != 2:
+        return [], terms
+    left_labels, right_labels = (plan.labels_below(i) for i in inputs)
+
+    def label(ref):
+        scan = plan.scan(ref.table) if ref.table else None
+        return scan['label'] if scan is not None else None
+
+    keys, residual = [], []
+    for term in terms:
+        if _is_equi_join(term):
+            a, b = label(term.left), label(term.right)
+            if a in left_labels and b in right_labels:
+                keys.append((term.left, term.right))
+                continue
+            if a in right_labels and b in left_labels:
+                keys.append((term.right, term.left))
+                continue
+        residual.append(term)
+    return keys, residual
+
+
+def _estimated_rows(plan: PlanGraph, cost_model: CostModel) -> dict:
+    """Cardinalidade estimada de cada nó, calculada uma única vez de baixo para cima"""
+    relations = {n['label']: n['details'].get('table') for n in plan.of_type('SCAN')}
+    rows = {}
+    for nid in _bottom_up(plan, plan.root):
+        node = plan.nodes[nid]
+        if node['type'] == 'SCAN':
+            rows[nid] = cost_model.table_rows(node['details'].get('table'))
+            continue
+        estimate = 1.0
+        for child in plan.inputs(nid):
+            estimate *= rows[child]
+        cond = node['details'].get('condition')
+        if cond and node['type'] in ('SELECTION', 'JOIN'):
+            try:
+                estimate *= cost_model.selectivity(parse_predicate(cond), relations)
+            except ParseError:
+                pass
+        rows[nid] = estimate
+    return rows
+
+
+def _choose_join_algorithms(plan: PlanGraph, cost_model: CostModel):
+    """Escolhe o algoritmo físico de cada JOIN, de baixo para cima, acompanhando
+    a ordem das tuplas que cada operador entrega.
+
+    Junções sem termo a.x = b.y entre as entradas usam laços aninhados. Nas
+    demais, o merge join custa a leitura das entradas mais a ordenação das que
+    ainda não estão ordenadas pela chave; o hash join, a leitura das entradas
+    mais, se um ORDER BY acima pedir a ordem da chave (ordem interessante), a
+    ordenação do resultado. Vence o menor custo (no empate, o merge join, que
+    usa memória constante): entradas já ordenadas (carga ordenada, conforme as
+    estatísticas, ou outro merge join abaixo) levam ao merge join, e uma entrada
+    desordenada ganha um SORT quando isso poupa a ordenação do ORDER BY. O hash
+    join é construído sobre a entrada de menor cardinalidade estimada ('build':
+    'left' ou 'right'; no empate, a direita). Um ORDER BY cuja entrada já chega
+    ordenada é marcado com 'presorted'.
+    """
+    if not plan.of_type('JOIN', 'SORT'):
+        return
+    estimates = _estimated_rows(plan, cost_model)
+    resolver = _ColumnResolver(plan, cost_model.catalog)
+    wanted = _interesting_orders(plan, resolver)
+    orders = {}
+    for nid in _bottom_up(plan, plan.root):
+        node = plan.nodes[nid]
+        if node['type'] == 'JOIN':
+            _choose_join(plan, node, estimates, orders, wanted.get(nid), resolver)
+        elif node['type'] == 'SORT':
+            key = _sort_order_key(node, resolver, single=True)
+            if key is not None and key in orders[plan.inputs(nid)[0]]:
+                node['details']['presorted'] = True
+        orders[nid] = _output_order(plan, node, orders, resolver, cost_model)
+
+
+def _choose_join(plan: PlanGraph, join: dict, estimates: dict, orders: dict, wanted, resolver: _ColumnResolver):
+    keys, _ = join_keys(plan, join['id'])
+    if not keys:
+        join['details']['algorithm'] = 'nested_loop'
+        return
+    left, right = plan.inputs(join['id'])
+    pairs = [((resolver.label(a.table, a.column), a.column), (resolver.label(b.table, b.column), b.column))
+             for a, b in keys]
+    # a chave com mais entradas já ordenadas
+    pair = max(pairs, key=lambda p: (p[0] in orders[left]) + (p[1] in orders[right]))
+    unsorted = [(child, column) for child, column in zip((left, right), pair) if column not in orders[child]]
+    merge_cost = hash_cost = estimates[left] + estimates[right]
+    merge_cost += sum(_sort_cost(estimates[child]) for child, _ in unsorted)
+    if wanted is not None and wanted in pair:
+        hash_cost += _sort_cost(estimates[join['id']])
+
+    if merge_cost <= hash_cost:
+        for child, (label, column) in unsorted:
+            sort = plan.add_node('SORT', 'τ', {'keys': f"{label}.{column}"})
+            plan.insert_above(child, sort['id'])
+            orders[sort['id']] = frozenset([(label, column)])
+        join['details'].update({
+            'algorithm': 'merge',
+            'merge_keys': [f"{label}.{column}" for label, column in pair],
+        })
+        return
+    build = 'left' if estimates[left] < estimates[right] else 'right'
+    join['details'].update({
+        'algorithm': 'hash',
+        'build': build,
+        'build_relations': sorted(plan.labels_below(left if build == 'left' else right)),
+    })
+
+
+def _sort_cost(rows: float) -> float:
+    """Custo estimado de ordenar `rows` tuplas (n log n)"""
+    return rows * math.log2(max(rows, 2.0))
+
+
+def _sort_order_key(sort: dict, resolver: _ColumnResolver, single: bool = False):
+    """Atributo (label, atributo) da primeira chave de um SORT, se for crescente.
+
+    Com `single`, só quando é a única chave (a ordem que um ORDER BY exige por inteiro).
+    """
+    try:
+        keys = parse_sort_keys(sort['details'].get('keys', ''))
+    except ParseError:
+        return None
+    if not keys or keys[0].descending or (single and len(keys) > 1):
+        return None
+    label = resolver.label(keys[0].column.table, keys[0].column.column)
+    return (label, keys[0].column.column) if label is not None else None
+
+
+def _interesting_orders(plan: PlanGraph, resolver: _ColumnResolver) -> dict:
+    """Ordem pedida a cada JOIN por um ORDER BY acima dele (JOIN -> atributo).
+
+    Só conta o ORDER BY de uma única chave crescente separado do JOIN apenas
+    por seleções e projeções, que preservam a ordem das tuplas.
+    """
+    wanted = {}
+    for sort in plan.of_type('SORT'):
+        key = _sort_order_key(sort, resolver, single=True)
+        if key is None:
+            continue
+        nid = sort['id']
+        while len(plan.inputs(nid)) == 1:
+            nid = plan.inputs(nid)[0]
+            kind = plan.nodes[nid]['type']
+            if kind == 'JOIN':
+                wanted[nid] = key
+            if kind not in ('SELECTION', 'PROJECTION'):
+                break
+    return wanted
+
+
+def _output_order(plan: PlanGraph, node: dict, orders: dict, resolver: _ColumnResolver,
+                  cost_model: CostModel) -> frozenset:
+    """Atributos pelos quais as tuplas entregues pelo nó estão em ordem crescente.
+
+    SCANs seguem a ordem de carga registrada nas estatísticas; seleções e
+    projeções preservam a ordem da entrada; um SORT ordena pela primeira chave
+    e um merge join, pela chave de junção (dos dois lados). Hash joins e laços
+    aninhados não garantem ordem (ao gravar em disco, a saída é embaralhada).
+    """
+    kind, inputs = node['type'], plan.inputs(node['id'])
+    if kind == 'SCAN':
+        table = node['details'].get('table')
+        columns = resolver.table_columns(node['label']) or ()
+        return frozenset((node['label'], c) for c in columns if cost_model.clustered(table, c))
+    if kind == 'SELECTION':
+        return orders[inputs[0]]
+    if kind == 'PROJECTION':
+        kept = resolver.select_columns(node['details'].get('attributes', ''))
+        return orders[inputs[0]] & kept if kept else frozenset()
+    if kind == 'SORT':
+        key = _sort_order_key(node, resolver)
+        return frozenset([key]) if key is not None else frozenset()
+    if kind == 'JOIN' and node['details'].get('algorithm') == 'merge':
+        return frozenset(tuple(key.split('.', 1)) for key in node['details']['merge_keys'])
+    return frozenset()
+
+
+def _cartesian_product_warnings(plan: PlanGraph) -> list:
+    """Avisos para os produtos cartesianos que restaram após as reescritas"""
+    warnings = []
+    for cross in plan.of_type('CROSS_PRODUCT'):
+        left, right = (', '.join(sorted(plan.labels_below(i))) for i in plan.inputs(cross['id']))
+        warnings.append(f"Produto cartesiano entre {left} e {right}: "
+                        f"nenhum predicado de junção liga as duas entradas")
+    return warnings
+
+
+def optimize_operator_graph(graph: dict, cost_model: CostModel | None = None) -> dict:
+    """Aplica heurísticas de otimização (HU4) sobre um grafo de operadores.
+
+    Heurísticas aplicadas:
+    - Push-down de seleções: o WHERE é decomposto em conjunções e cada termo desce até o
+      SCAN da sua tabela ou vira condição da junção que reúne as suas tabelas
+    - Produto cartesiano seguido de igualdade entre as suas entradas vira JOIN
+    - Filtros constantes são repetidos para os atributos iguais a eles pelas junções
+    - Predicados são simplificados; se forem contraditórios, o grafo vira EMPTY -> π
+    - Ordenação das junções pelo menor custo estimado (cost_model), sem criar
+      produtos cartesianos quando as relações estão ligadas por predicados
+    - Push-down de projeções: inserir projeções onde os atributos necessários acima são menos
+      do que os entregues (acima dos SCANs, das seleções e das junções)
+    - Algoritmo de cada junção: merge join quando as entradas já chegam ordenadas pela
+      chave (ou ordená-las poupa a ordenação de um ORDER BY); hash join, construído
+      sobre a entrada menor, nas demais igualdades; laços aninhados nos demais casos
+    - ORDER BY cuja entrada já chega ordenada é marcado como 'presorted'
+
+    Os produtos cartesianos que restarem são listados em 'warnings'.
+    """
+    plan = PlanGraph.from_dict(graph)
+    _push_down_selections(plan)
+    _infer_transitive_predicates(plan)
+    contradiction = _simplify_predicates(plan)
+    if contradiction is not None:
+        _make_empty(plan, contradiction)
+        optimized = plan.to_dict()
+        optimized['warnings'] = [f"A consulta nunca retorna linhas: o predicado {contradiction} é contraditório"]
+        return optimized
+    cost_model = cost_model or CostModel()
+    _reorder_joins(plan, cost_model)
+    _push_down_projections(plan, cost_model.catalog)
+    _choose_join_algorithms(plan, cost_model)
+    optimized = plan.to_dict()
+    optimized['warnings'] = _cartesian_product_warnings(plan)
+    return optimized
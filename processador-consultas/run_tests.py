@@ -2,6 +2,14 @@ import unittest
 from test_h1u import ColoredTextTestRunner, TestSQLValidator, TestMetadata
 from test_h2u import TestRelationalAlgebra
 from test_h3u import TestOperatorGraph
+from test_optimizer import (
+    TestPlanGraph, TestJoinOrdering, TestSelectionPushdown, TestCrossProductRewrite,
+    TestTransitiveInference, TestPredicateSimplification, TestRequiredColumns,
+)
+from test_executor import TestExecutor, TestVectorizedExecutor, TestHashJoin, TestOrderBy, TestMemoryBudget, TestMergeJoin, TestColumnStore, TestDataGenerator
+from test_parser import TestLexer, TestParser
+from test_catalog import TestCatalog, TestCatalogSource, TestTableStatistics
+from test_api import TestValidationCache, TestSharedValidator, TestBatchValidation, TestBulkValidationCLI, TestBenchmark, TestMetadataEndpoint
 
 def main():
     loader = unittest.TestLoader()
@@ -17,6 +25,42 @@ def main():
     # HU3
     suite.addTests(loader.loadTestsFromTestCase(TestOperatorGraph))
 
+    # HU4 – Otimizador
+    suite.addTests(loader.loadTestsFromTestCase(TestPlanGraph))
+    suite.addTests(loader.loadTestsFromTestCase(TestJoinOrdering))
+    suite.addTests(loader.loadTestsFromTestCase(TestSelectionPushdown))
+    suite.addTests(loader.loadTestsFromTestCase(TestCrossProductRewrite))
+    suite.addTests(loader.loadTestsFromTestCase(TestTransitiveInference))
+    suite.addTests(loader.loadTestsFromTestCase(TestPredicateSimplification))
+    suite.addTests(loader.loadTestsFromTestCase(TestRequiredColumns))
+
+    # Executor
+    suite.addTests(loader.loadTestsFromTestCase(TestExecutor))
+    suite.addTests(loader.loadTestsFromTestCase(TestVectorizedExecutor))
+    suite.addTests(loader.loadTestsFromTestCase(TestHashJoin))
+    suite.addTests(loader.loadTestsFromTestCase(TestOrderBy))
+    suite.addTests(loader.loadTestsFromTestCase(TestMemoryBudget))
+    suite.addTests(loader.loadTestsFromTestCase(TestMergeJoin))
+    suite.addTests(loader.loadTestsFromTestCase(TestColumnStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestDataGenerator))
+
+    # Lexer / parser
+    suite.addTests(loader.loadTestsFromTestCase(TestLexer))
+    suite.addTests(loader.loadTestsFromTestCase(TestParser))
+
+    # Catálogo
+    suite.addTests(loader.loadTestsFromTestCase(TestCatalog))
+    suite.addTests(loader.loadTestsFromTestCase(TestCatalogSource))
+    suite.addTests(loader.loadTestsFromTestCase(TestTableStatistics))
+
+    # API
+    suite.addTests(loader.loadTestsFromTestCase(TestValidationCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestSharedValidator))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatchValidation))
+    suite.addTests(loader.loadTestsFromTestCase(TestBulkValidationCLI))
+    suite.addTests(loader.loadTestsFromTestCase(TestBenchmark))
+    suite.addTests(loader.loadTestsFromTestCase(TestMetadataEndpoint))
+
     runner = ColoredTextTestRunner(verbosity=0)
     result = runner.run(suite)
     return result.wasSuccessful()
@@ -0,0 +1,315 @@
+"""Orçamento de memória por consulta e algoritmos que gravam em disco quando ele acaba.
+
+Os operadores que materializam tuplas (a tabela de hash de um hash join, a
+entrada interna de uma junção por laços aninhados e a entrada de uma
+ordenação) reservam no MemoryBudget da consulta o tamanho estimado de cada
+tupla guardada. Quando uma reserva é negada, o operador passa a trabalhar em
+disco:
+
+- hash join → grace hash join: as duas entradas são particionadas pelo hash da
+  chave em arquivos temporários e cada par de partições é juntado em memória
+  (partições que ainda não cabem são particionadas de novo, com outra semente);
+- laços aninhados → laços aninhados em blocos: a entrada interna vai para um
+  arquivo, relido uma vez por bloco de tuplas externas que cabe no orçamento;
+- ordenação → ordenação externa: trechos ordenados (runs) gravados em disco e
+  intercalados com heapq.merge, em mais de uma passada se forem muitos.
+
+As tuplas são gravadas com pickle em blocos de SPILL_BLOCK_ROWS; cada operador
+tem um Spiller que cria os arquivos, conta os bytes gravados (reportados por
+passo do plano) e os apaga no close().
+"""
+import heapq
+import pickle
+import sys
+import tempfile
+
+
+# Tuplas serializadas de uma vez em cada bloco dos arquivos temporários
+SPILL_BLOCK_ROWS = 1024
+
+# Partições criadas a cada nível do grace hash join
+PARTITION_FANOUT = 16
+
+# Níveis de reparticionamento; no último a partição é carregada mesmo acima do
+# orçamento (chaves repetidas demais não se dividem por hash)
+MAX_PARTITION_LEVEL = 3
+
+# Runs intercalados por passada da ordenação externa
+MERGE_FANIN = 64
+
+# Tuplas que um run da ordenação externa ou um bloco dos laços aninhados tem
+# mesmo sem orçamento livre (outro operador pode estar ocupando tudo); sem esse
+# mínimo, cada run teria uma tupla e cada tupla externa releria o arquivo
+MIN_BLOCK_ROWS = SPILL_BLOCK_ROWS
+
+
+def row_bytes(row) -> int:
+    """Tamanho estimado de uma tupla e dos seus valores"""
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+
+class MemoryBudget:
+    """Memória que os operadores de uma consulta podem ocupar com tuplas materializadas.
+
+    `limit` em bytes (None: sem limite). `used` é o total reservado no momento e
+    `peak` o maior valor atingido; `spill_dir` é o diretório dos arquivos
+    temporários (None: o padrão do sistema).
+    """
+
+    def __init__(self, limit: int | None = None, spill_dir: str | None = None):
+        self.limit = limit
+        self.spill_dir = spill_dir
+        self.used = 0
+        self.peak = 0
+
+    @property
+    def limited(self) -> bool:
+        return self.limit is not None
+
+    def reserve(self, nbytes: int, force: bool = False) -> bool:
+        """Reserva `nbytes`; devolve False (sem reservar) se o limite seria ultrapassado"""
+        if not force and self.limit is not None and self.used + nbytes > self.limit:
+            return False
+        self.used += nbytes
+        if self.used > self.peak:
+            self.peak = self.used
+        return True
+
+    def release(self, nbytes: int):
+        self.used = max(0, self.used - nbytes)
+
+
+class SpillFile:
+    """Arquivo temporário de tuplas, gravadas com pickle em blocos e relidas na mesma ordem"""
+
+    def __init__(self, spiller: 'Spiller'):
+        self._spiller = spiller
+        self._file = tempfile.TemporaryFile(dir=spiller.budget.spill_dir)
+        self._buffer = []
+        self.rows = 0
+
+    def write(self, row):
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= SPILL_BLOCK_ROWS:
+            self._flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def _flush(self):
+        if self._buffer:
+            data = pickle.dumps(self._buffer, protocol=pickle.HIGHEST_PROTOCOL)
+            self._file.write(data)
+            self._spiller.bytes += len(data)
+            self._buffer = []
+
+    def __iter__(self):
+        """Relê as tuplas do início (cada leitura tem o seu próprio cursor)"""
+        self._flush()
+        position = 0
+        while True:
+            self._file.seek(position)
+            try:
+                block = pickle.load(self._file)
+            except EOFError:
+                return
+            position = self._file.tell()
+            yield from block
+
+    def close(self):
+        self._file.close()
+
+
+class Spiller:
+    """Arquivos temporários de um operador e o total de bytes gravados neles"""
+
+    def __init__(self, budget: MemoryBudget):
+        self.budget = budget
+        self.files = []
+        self.bytes = 0
+
+    def new_file(self) -> SpillFile:
+        spill = SpillFile(self)
+        self.files.append(spill)
+        return spill
+
+    def write_all(self, rows) -> SpillFile:
+        spill = self.new_file()
+        spill.extend(rows)
+        return spill
+
+    def discard(self, spill: SpillFile):
+        spill.close()
+        self.files.remove(spill)
+
+    def close(self):
+        """Apaga os arquivos (os bytes gravados continuam contados)"""
+        for spill in self.files:
+            spill.close()
+        self.files = []
+
+
+# ==================== GRACE HASH JOIN ====================
+
+def partition(rows, key, level: int, spiller: Spiller) -> list:
+    """Distribui as tuplas em PARTITION_FANOUT arquivos pelo hash da chave.
+
+    A semente muda a cada nível, para que uma partição grande demais se divida
+    ao ser particionada de novo. Tuplas com chave nula nunca casam e são descartadas.
+    """
+    files = [spiller.new_file() for _ in range(PARTITION_FANOUT)]
+    for row in rows:
+        k = key(row)
+        if None not in k:
+            files[hash((level, k)) % PARTITION_FANOUT].write(row)
+    return files
+
+
+def grace_hash_join(build_files: list, probe_files: list, build_key, probe_key,
+                    spiller: Spiller, level: int = 1):
+    """Junta as partições correspondentes e gera pares (tupla de construção, tupla de sondagem).
+
+    Cada partição de construção é carregada em uma tabela de hash dentro do
+    orçamento; se não couber, as duas partições são particionadas de novo
+    (até MAX_PARTITION_LEVEL).
+    """
+    budget = spiller.budget
+    for build, probe in zip(build_files, probe_files):
+        if build.rows and probe.rows:
+            table, reserved = _load_partition(build, build_key, budget, force=level >= MAX_PARTITION_LEVEL)
+            if table is None:
+                sub_build = partition(build, build_key, level + 1, spiller)
+                sub_probe = partition(probe, probe_key, level + 1, spiller)
+                spiller.discard(build)
+                spiller.discard(probe)
+                yield from grace_hash_join(sub_build, sub_probe, build_key, probe_key, spiller, level + 1)
+                continue
+            try:
+                for row in probe:
+                    for match in table.get(probe_key(row), ()):
+                        yield match, row
+            finally:
+                budget.release(reserved)
+        spiller.discard(build)
+        spiller.discard(probe)
+
+
+def _load_partition(rows, key, budget: MemoryBudget, force: bool) -> tuple:
+    """Tabela de hash de uma partição e os bytes reservados (None, 0 se não couber)"""
+    table, reserved = {}, 0
+    for row in rows:
+        size = row_bytes(row)
+        if not budget.reserve(size, force):
+            budget.release(reserved)
+            return None, 0
+        reserved += size
+        table.setdefault(key(row), []).append(row)
+    return table, reserved
+
+
+# ==================== LAÇOS ANINHADOS EM BLOCOS ====================
+
+def block_nested_loop(outer, inner: SpillFile, budget: MemoryBudget):
+    """Gera pares (tupla externa, tupla interna) relendo o arquivo interno uma vez
+    por bloco de tuplas externas que cabe no orçamento"""
+    outer = iter(outer)
+    pending = next(outer, None)
+    while pending is not None:
+        block, reserved, row = [], 0, pending
+        while row is not None:
+            size = row_bytes(row)
+            if not budget.reserve(size, force=len(block) < MIN_BLOCK_ROWS):
+                break
+            block.append(row)
+            reserved += size
+            row = next(outer, None)
+        pending = row
+        try:
+            for inner_row in inner:
+                for outer_row in block:
+                    yield outer_row, inner_row
+        finally:
+            budget.release(reserved)
+
+
+# ==================== ORDENAÇÃO EXTERNA ====================
+
+class _Descending:
+    """Inverte a ordem de um componente da chave (ORDER BY ... DESC)"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def order_key(value) -> tuple:
+    """Posição de um valor na ordem crescente usada por ORDER BY e pelo merge join.
+
+    Nulos vêm depois dos demais valores, números antes de textos e textos são
+    comparados sem diferenciar maiúsculas, como nas comparações do executor.
+    """
+    if value is None:
+        return (True, False, 0)
+    if isinstance(value, str):
+        return (False, True, value.casefold())
+    return (False, False, value)
+
+
+def sort_key(keys: list):
+    """Função tupla -> chave de ordenação para pares (posição, descendente), na
+    ordem de order_key (invertida nas chaves DESC, com os nulos primeiro)"""
+    if not any(descending for _, descending in keys):
+        indexes = [i for i, _ in keys]
+        return lambda row: tuple(order_key(row[i]) for i in indexes)
+    return lambda row: tuple(_Descending(order_key(row[i])) if descending else order_key(row[i])
+                             for i, descending in keys)
+
+
+def external_sort(rows, key, spiller: Spiller):
+    """Gera as tuplas ordenadas por `key` (ordenação estável).
+
+    As tuplas ficam em memória enquanto cabem no orçamento; quando uma reserva
+    é negada, o trecho acumulado é ordenado e gravado como um run. No fim, os
+    runs e o trecho em memória são intercalados.
+    """
+    budget = spiller.budget
+    runs, buffer, reserved = [], [], 0
+    try:
+        for row in rows:
+            if budget.limited:
+                size = row_bytes(row)
+                if not budget.reserve(size, force=len(buffer) < MIN_BLOCK_ROWS):
+                    if buffer:
+                        buffer.sort(key=key)
+                        runs.append(spiller.write_all(buffer))
+                        buffer = []
+                        budget.release(reserved)
+                        reserved = 0
+                    budget.reserve(size, force=True)
+                reserved += size
+            buffer.append(row)
+        buffer.sort(key=key)
+        if not runs:
+            yield from buffer
+            return
+        while len(runs) >= MERGE_FANIN:
+            # passadas intermediárias: intercalar grupos de runs em runs maiores
+            merged = []
+            for start in range(0, len(runs), MERGE_FANIN):
+                group = runs[start:start + MERGE_FANIN]
+                merged.append(spiller.write_all(heapq.merge(*group, key=key)))
+                for run in group:
+                    spiller.discard(run)
+            runs = merged
+        yield from heapq.merge(*runs, buffer, key=key)
+    finally:
+        budget.release(reserved)
@@ -0,0 +1,569 @@
+"""Análise léxica e sintática do subconjunto de SQL suportado pelo processador de consultas.
+
+O lexer percorre a consulta uma única vez e produz uma lista de tokens
+(palavras-chave, identificadores, nomes qualificados, literais, operadores e
+pontuação). Todas as verificações de sintaxe do validador trabalham sobre essa
+lista, de modo que o custo da validação cresce linearmente com o tamanho da
+consulta.
+
+O parser descendente recursivo constrói, a partir dos mesmos tokens, uma AST
+(SelectStmt, TableRef, Join e nós de predicado) consumida pelo validador, pela
+conversão para álgebra relacional e pela construção do grafo de operadores.
+"""
+import re
+from dataclasses import dataclass, field, replace
+from typing import NamedTuple
+
+
+# Tipos de token
+KEYWORD = 'KEYWORD'
+IDENT = 'IDENT'
+QUALIFIED = 'QUALIFIED'
+NUMBER = 'NUMBER'
+STRING = 'STRING'
+OPERATOR = 'OPERATOR'
+LPAREN = 'LPAREN'
+RPAREN = 'RPAREN'
+COMMA = 'COMMA'
+STAR = 'STAR'
+SEMICOLON = 'SEMICOLON'
+OTHER = 'OTHER'
+
+KEYWORDS = frozenset(['select', 'from', 'where', 'inner', 'join', 'on', 'and', 'or', 'as', 'order', 'by', 'asc', 'desc'])
+LOGICAL_OPERATORS = frozenset(['and', 'or'])
+COMPARISON_OPERATORS = frozenset(['=', '>', '<', '<=', '>=', '<>'])
+
+# Operandos aceitos em cada lado de uma comparação
+OPERAND_KINDS = frozenset([IDENT, QUALIFIED, NUMBER, STRING])
+
+# Profundidade máxima de parênteses aninhados em um predicado (o parser e as
+# etapas seguintes percorrem a AST recursivamente)
+MAX_NESTING = 100
+
+# Símbolos usados na representação em álgebra relacional, aceitos na entrada
+# para que predicados já formatados (ex.: nós do grafo) possam ser re-lidos.
+_SYMBOL_ALIASES = {'∧': 'and', '∨': 'or', '≥': '>=', '≤': '<='}
+
+# Tokens depois dos quais um '-' não pode ser o sinal de um literal numérico
+_SIGN_BREAKERS = frozenset([IDENT, QUALIFIED, NUMBER, STRING, RPAREN, STAR])
+
+# Uma única expressão com grupos nomeados: cada posição da consulta é
+# consumida exatamente uma vez.
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+  | (?P<qualified>[^\W\d]\w*\.(?:[^\W\d]\w*|\*))
+  | (?P<number>-?\d+(?:\.\d+)?)
+  | (?P<word>[^\W\d]\w*)
+  | (?P<op>[=<>!]+|[∧∨≥≤])
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<comma>,)
+  | (?P<star>\*)
+  | (?P<semicolon>;)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+class Token(NamedTuple):
+    """Token produzido pelo lexer (kind, valor normalizado e posição na consulta)"""
+    kind: str
+    value: str
+    pos: int
+
+
+def tokenize(query: str) -> list:
+    """Converte a consulta em uma lista de tokens em uma única passada linear.
+
+    Palavras-chave e identificadores são devolvidos em minúsculas; os símbolos
+    ∧/∨/≥/≤ da álgebra relacional são traduzidos para AND/OR/>=/<=.
+    """
+    tokens = []
+    append = tokens.append
+    for m in _TOKEN_RE.finditer(query):
+        group = m.lastgroup
+        if group == 'ws':
+            continue
+        value = m.group()
+        pos = m.start()
+        if group == 'word':
+            value = value.lower()
+            append(Token(KEYWORD if value in KEYWORDS else IDENT, value, pos))
+        elif group == 'qualified':
+            append(Token(QUALIFIED, value.lower(), pos))
+        elif group == 'op':
+            value = _SYMBOL_ALIASES.get(value, value)
+            append(Token(KEYWORD if value in LOGICAL_OPERATORS else OPERATOR, value, pos))
+        elif group == 'string':
+            append(Token(STRING, value, pos))
+        elif group == 'number':
+            if value[0] == '-' and tokens and tokens[-1].kind in _SIGN_BREAKERS:
+                # '-' depois de um operando não é sinal do número
+                append(Token(OTHER, '-', pos))
+                value, pos = value[1:], pos + 1
+            append(Token(NUMBER, value, pos))
+        elif group == 'lparen':
+            append(Token(LPAREN, value, pos))
+        elif group == 'rparen':
+            append(Token(RPAREN, value, pos))
+        elif group == 'comma':
+            append(Token(COMMA, value, pos))
+        elif group == 'star':
+            append(Token(STAR, value, pos))
+        elif group == 'semicolon':
+            append(Token(SEMICOLON, value, pos))
+        else:
+            append(Token(OTHER, value, pos))
+    return tokens
+
+
+def is_keyword(token, *words) -> bool:
+    """Indica se o token é uma das palavras-chave informadas"""
+    return token.kind == KEYWORD and token.value in words
+
+
+# ==================== AST ====================
+
+class ParseError(ValueError):
+    """Erro de sintaxe encontrado pelo parser"""
+
+    def __init__(self, message, pos=None):
+        super().__init__(message)
+        self.pos = pos
+
+
+@dataclass
+class ColumnRef:
+    """Referência a um atributo, qualificado (alias.coluna) ou não"""
+    table: str | None
+    column: str
+
+    @property
+    def qualified(self) -> str:
+        return f"{self.table}.{self.column}" if self.table else self.column
+
+
+@dataclass
+class Literal:
+    """Literal numérico ou string (mantém o texto original, com aspas)"""
+    kind: str
+    text: str
+
+    @property
+    def value(self):
+        """Valor Python do literal (número ou string sem aspas, com '' lido como ')"""
+        if self.kind == NUMBER:
+            return float(self.text) if '.' in self.text else int(self.text)
+        quote = self.text[0]
+        return self.text[1:-1].replace(quote * 2, quote)
+
+
+class Predicate:
+    """Classe base dos nós de predicado (comparações e conectivos lógicos)"""
+    parens = 0
+
+    def columns(self):
+        """Gera as referências a atributos usadas no predicado"""
+        raise NotImplementedError
+
+
+@dataclass
+class Comparison(Predicate):
+    """Comparação simples: operando operador operando"""
+    left: ColumnRef | Literal
+    op: str
+    right: ColumnRef | Literal
+    parens: int = 0
+
+    def columns(self):
+        if isinstance(self.left, ColumnRef):
+            yield self.left
+        if isinstance(self.right, ColumnRef):
+            yield self.right
+
+
+@dataclass
+class BoolOp(Predicate):
+    """Conjunção ('and') ou disjunção ('or') de predicados"""
+    op: str
+    operands: list = field(default_factory=list)
+    parens: int = 0
+
+    def columns(self):
+        for operand in self.operands:
+            yield from operand.columns()
+
+
+@dataclass
+class TableRef:
+    """Tabela referenciada no FROM ou em um JOIN"""
+    name: str
+    alias: str | None = None
+
+    @property
+    def label(self) -> str:
+        return self.alias or self.name
+
+
+@dataclass
+class Join:
+    """JOIN <tabela> [alias] ON <predicado>"""
+    table: TableRef
+    condition: Predicate
+
+
+@dataclass
+class SelectItem:
+    """Item da lista do SELECT (texto sem o alias e, se for o caso, o atributo)"""
+    text: str
+    alias: str | None = None
+    column: ColumnRef | None = None
+
+
+@dataclass
+class SortKey:
+    """Chave do ORDER BY: atributo e sentido (ASC por omissão)"""
+    column: ColumnRef
+    descending: bool = False
+
+    @property
+    def text(self) -> str:
+        return f"{self.column.qualified} desc" if self.descending else self.column.qualified
+
+
+@dataclass
+class SelectStmt:
+    """Consulta SELECT ... FROM ... [JOIN ... ON ...] [WHERE ...] [ORDER BY ...]"""
+    items: list = field(default_factory=list)
+    from_tables: list = field(default_factory=list)
+    joins: list = field(default_factory=list)
+    where: Predicate | None = None
+    order_by: list = field(default_factory=list)
+
+    @property
+    def is_star(self) -> bool:
+        return len(self.items) == 1 and self.items[0].text == '*'
+
+    @property
+    def tables(self) -> list:
+        """Todas as tabelas da consulta (FROM e JOINs), na ordem em que aparecem"""
+        return self.from_tables + [j.table for j in self.joins]
+
+    @property
+    def aliases(self) -> dict:
+        """Mapa alias -> nome da tabela"""
+        return {t.alias: t.name for t in self.tables if t.alias}
+
+    @property
+    def select_list(self) -> str:
+        """Lista do SELECT como texto (com os aliases de coluna)"""
+        return ', '.join(f"{i.text} as {i.alias}" if i.alias else i.text for i in self.items)
+
+
+# ==================== PARSER ====================
+
+class Parser:
+    """Parser descendente recursivo sobre a lista de tokens do lexer.
+
+    Gramática suportada:
+        consulta   := SELECT itens clausula* [;]
+        itens      := item (, item)*
+        item       := * | tabela.* | atributo [AS alias]
+        clausula   := FROM tabela (, tabela)* join* | WHERE predicado | ORDER BY chaves
+        join       := [INNER] JOIN tabela ON predicado
+        chaves     := atributo [ASC | DESC] (, atributo [ASC | DESC])*
+        tabela     := nome [AS] [alias]
+        predicado  := termo (OR termo)*
+        termo      := fator (AND fator)*
+        fator      := ( predicado ) | operando operador operando
+    A cláusula WHERE pode aparecer antes do FROM; ORDER BY é sempre a última.
+    Predicados aceitam no máximo MAX_NESTING níveis de parênteses aninhados.
+    """
+
+    def __init__(self, tokens, source=''):
+        self.tokens = tokens
+        self.source = source
+        self.pos = 0
+        self.depth = 0
+
+    # ---------- utilitários ----------
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _advance(self):
+        tok = self._peek()
+        self.pos += 1
+        return tok
+
+    def _at_keyword(self, *words):
+        tok = self._peek()
+        return tok is not None and is_keyword(tok, *words)
+
+    def _expect_keyword(self, word):
+        tok = self._peek()
+        if tok is None or not is_keyword(tok, word):
+            self._error(f"esperado {word.upper()}")
+        return self._advance()
+
+    def _error(self, message):
+        tok = self._peek()
+        if tok is None:
+            raise ParseError(f"{message} no fim da consulta")
+        raise ParseError(f"{message} próximo de '{tok.value}'", tok.pos)
+
+    # ---------- consulta ----------
+    def parse(self) -> SelectStmt:
+        stmt = SelectStmt()
+        self._expect_keyword('select')
+        stmt.items = self._select_items()
+
+        seen_from = seen_where = False
+        while True:
+            tok = self._peek()
+            if tok is None or tok.kind == SEMICOLON:
+                break
+            if is_keyword(tok, 'order'):
+                self._advance()
+                self._expect_keyword('by')
+                stmt.order_by = self._sort_keys()
+                break
+            if is_keyword(tok, 'from') and not seen_from:
+                self._advance()
+                seen_from = True
+                stmt.from_tables.append(self._table_ref())
+                while self._peek() is not None and self._peek().kind == COMMA:
+                    self._advance()
+                    stmt.from_tables.append(self._table_ref())
+                while self._at_keyword('inner', 'join'):
+                    if self._advance().value == 'inner':
+                        self._expect_keyword('join')
+                    table = self._table_ref()
+                    self._expect_keyword('on')
+                    stmt.joins.append(Join(table, self._predicate()))
+            elif is_keyword(tok, 'where') and not seen_where:
+                self._advance()
+                seen_where = True
+                stmt.where = self._predicate()
+            else:
+                self._error("cláusula inesperada")
+
+        while self._peek() is not None and self._peek().kind == SEMICOLON:
+            self._advance()
+        if self._peek() is not None:
+            self._error("conteúdo após o fim da consulta")
+        if not seen_from:
+            raise ParseError("consulta sem cláusula FROM")
+        return stmt
+
+    def _select_items(self):
+        items = []
+        while True:
+            items.append(self._select_item())
+            tok = self._peek()
+            if tok is None or tok.kind != COMMA:
+                return items
+            self._advance()
+
+    def _select_item(self):
+        """Um item do SELECT: atributo ([label.]coluna), * ou label.*, com alias opcional"""
+        tok = self._peek()
+        if tok is None or tok.kind not in (IDENT, QUALIFIED, STAR):
+            self._error("item do SELECT deve ser um atributo, * ou tabela.*")
+        item = self._advance()
+
+        column = None
+        if item.kind == QUALIFIED and not item.value.endswith('.*'):
+            table, col = item.value.split('.', 1)
+            column = ColumnRef(table, col)
+        elif item.kind == IDENT:
+            column = ColumnRef(None, item.value)
+
+        alias = None
+        if self._at_keyword('as'):
+            self._advance()
+            tok = self._peek()
+            if tok is None or tok.kind != IDENT:
+                self._error("alias esperado após AS")
+            alias = self._advance().value
+
+        tok = self._peek()
+        if not (tok is None or tok.kind in (COMMA, SEMICOLON)
+                or is_keyword(tok, 'from', 'where', 'inner', 'join', 'order')):
+            self._error("item do SELECT deve ser um atributo, * ou tabela.*")
+        return SelectItem(item.value, alias, column)
+
+    def _sort_keys(self):
+        keys = []
+        while True:
+            tok = self._peek()
+            if tok is None or tok.kind not in (IDENT, QUALIFIED) or tok.value.endswith('.*'):
+                self._error("atributo esperado no ORDER BY")
+            column = self._operand()
+            descending = False
+            if self._at_keyword('asc', 'desc'):
+                descending = self._advance().value == 'desc'
+            keys.append(SortKey(column, descending))
+            tok = self._peek()
+            if tok is None or tok.kind != COMMA:
+                return keys
+            self._advance()
+
+    def _table_ref(self):
+        tok = self._peek()
+        if tok is None or tok.kind != IDENT:
+            self._error("nome de tabela esperado")
+        name = self._advance().value
+        alias = None
+        if self._at_keyword('as'):
+            self._advance()
+            tok = self._peek()
+            if tok is None or tok.kind != IDENT:
+                self._error("alias esperado após AS")
+        tok = self._peek()
+        if tok is not None and tok.kind == IDENT:
+            alias = self._advance().value
+        return TableRef(name, alias)
+
+    # ---------- predicados ----------
+    def _predicate(self):
+        operands = [self._conjunction()]
+        while self._at_keyword('or'):
+            self._advance()
+            operands.append(self._conjunction())
+        return operands[0] if len(operands) == 1 else BoolOp('or', operands)
+
+    def _conjunction(self):
+        operands = [self._factor()]
+        while self._at_keyword('and'):
+            self._advance()
+            operands.append(self._factor())
+        return operands[0] if len(operands) == 1 else BoolOp('and', operands)
+
+    def _factor(self):
+        tok = self._peek()
+        if tok is not None and tok.kind == LPAREN:
+            if self.depth == MAX_NESTING:
+                self._error("parênteses aninhados demais")
+            self._advance()
+            self.depth += 1
+            inner = self._predicate()
+            self.depth -= 1
+            tok = self._peek()
+            if tok is None or tok.kind != RPAREN:
+                self._error("')' esperado")
+            self._advance()
+            inner.parens += 1
+            return inner
+        left = self._operand()
+        tok = self._peek()
+        if tok is None or tok.kind != OPERATOR:
+            self._error("operador de comparação esperado")
+        op = self._advance().value
+        right = self._operand()
+        return Comparison(left, op, right)
+
+    def _operand(self):
+        tok = self._peek()
+        if tok is None:
+            self._error("operando esperado")
+        if tok.kind == QUALIFIED:
+            self._advance()
+            table, col = tok.value.split('.', 1)
+            return ColumnRef(table, col)
+        if tok.kind == IDENT:
+            self._advance()
+            return ColumnRef(None, tok.value)
+        if tok.kind in (NUMBER, STRING):
+            self._advance()
+            return Literal(tok.kind, tok.value)
+        self._error("operando esperado")
+
+
+def parse(query: str, tokens=None) -> SelectStmt:
+    """Constrói a AST de uma consulta (normalizada). Aceita tokens já produzidos pelo lexer."""
+    if tokens is None:
+        tokens = tokenize(query)
+    return Parser(tokens, query).parse()
+
+
+def parse_predicate(text: str) -> Predicate:
+    """Constrói a AST de um predicado isolado (aceita também a notação ∧/∨/≥/≤)"""
+    parser = Parser(tokenize(text), text)
+    pred = parser._predicate()
+    if parser._peek() is not None:
+        parser._error("conteúdo após o fim do predicado")
+    return pred
+
+
+def parse_sort_keys(text: str) -> list:
+    """Constrói a lista de SortKey de um ORDER BY isolado (ex.: detalhes de um nó SORT)"""
+    parser = Parser(tokenize(text), text)
+    keys = parser._sort_keys()
+    if parser._peek() is not None:
+        parser._error("conteúdo após o fim das chaves de ordenação")
+    return keys
+
+
+def format_sort_keys(keys: list) -> str:
+    """Chaves de ordenação como texto ('a.x desc, b.y')"""
+    return ', '.join(key.text for key in keys)
+
+
+# Símbolos usados na álgebra relacional
+_RA_SYMBOLS = {'>=': '≥', '<=': '≤', 'and': '∧', 'or': '∨'}
+
+
+def _format_operand(operand) -> str:
+    return operand.qualified if isinstance(operand, ColumnRef) else operand.text
+
+
+def format_predicate(pred: Predicate) -> str:
+    """Formata um predicado na notação da álgebra relacional.
+
+    AND/OR → ∧/∨, >= → ≥, <= → ≤, sem espaços ao redor dos operadores de comparação
+    e com um único espaço ao redor de ∧ e ∨. Parênteses originais são mantidos.
+    """
+    if isinstance(pred, Comparison):
+        text = f"{_format_operand(pred.left)}{_RA_SYMBOLS.get(pred.op, pred.op)}{_format_operand(pred.right)}"
+    else:
+        text = f" {_RA_SYMBOLS[pred.op]} ".join(format_predicate(p) for p in pred.operands)
+    return '(' * pred.parens + text + ')' * pred.parens
+
+
+# Item de uma lista de atributos: [label.]atributo ou [label.]*, com alias opcional
+_ATTRIBUTE_ITEM = re.compile(r"^(?:(\w+)\.)?(\w+|\*)(?:\s+as\s+(\w+))?$")
+
+
+def split_attributes(text: str) -> list | None:
+    """Decompõe a lista de atributos de uma projeção em tuplas (label, atributo, alias).
+
+    `label` e `alias` são None quando ausentes; atributo '*' indica todos os
+    atributos (do label, se houver). Devolve None se algum item não for uma
+    referência simples a atributo.
+    """
+    items = []
+    for item in text.split(','):
+        m = _ATTRIBUTE_ITEM.match(item.strip())
+        if not m:
+            return None
+        items.append(m.groups())
+    return items
+
+
+def conjuncts(pred: Predicate | None) -> list:
+    """Decompõe um predicado em seus termos ligados por AND (achatando conjunções aninhadas)"""
+    if pred is None:
+        return []
+    if isinstance(pred, BoolOp) and pred.op == 'and':
+        return [c for operand in pred.operands for c in conjuncts(operand)]
+    return [pred]
+
+
+def conjoin(preds: list) -> Predicate | None:
+    """Junta predicados com AND; disjunções recebem parênteses para manter a precedência"""
+    if not preds:
+        return None
+    if len(preds) == 1:
+        return preds[0]
+    return BoolOp('and', [replace(p, parens=1) if isinstance(p, BoolOp) and p.op == 'or' and not p.parens else p
+                          for p in preds])
@@ -213,6 +213,22 @@ function getNodeColor(type) {
                 background: '#EF5350',
                 border: '#C62828'
             }
+        },
+        'SORT': {
+            background: '#009688',
+            border: '#00796B',
+            highlight: {
+                background: '#26A69A',
+                border: '#004D40'
+            }
+        },
+        'EMPTY': {
+            background: '#BDBDBD',
+            border: '#9E9E9E',
+            highlight: {
+                background: '#E0E0E0',
+                border: '#757575'
+            }
         }
     };
     
@@ -232,7 +248,9 @@ function getNodeShape(type) {
         'PROJECTION': 'ellipse',
         'SELECTION': 'diamond',
         'JOIN': 'ellipse',
-        'CROSS_PRODUCT': 'ellipse'
+        'CROSS_PRODUCT': 'ellipse',
+        'SORT': 'ellipse',
+        'EMPTY': 'box'
     };
     
     return shapeMap[type] || 'box';
@@ -250,6 +268,10 @@ function formatNodeLabel(node) {
             return `⋈\n${truncateText(node.details.condition, 30)}`;
         case 'CROSS_PRODUCT':
             return '×';
+        case 'SORT':
+            return `τ\n${truncateText(node.details.keys, 30)}`;
+        case 'EMPTY':
+            return '∅';
         default:
             return node.label;
     }
@@ -271,6 +293,10 @@ function getNodeTooltip(node) {
             return `<b>JUNÇÃO (⋈)</b><br>Condição: ${node.details.condition}`;
         case 'CROSS_PRODUCT':
             return `<b>PRODUTO CARTESIANO (×)</b><br>${node.details.left} × ${node.details.right}`;
+        case 'SORT':
+            return `<b>ORDENAÇÃO (τ)</b><br>Chaves: ${node.details.keys}`;
+        case 'EMPTY':
+            return `<b>RESULTADO VAZIO (∅)</b><br>Predicado contraditório: ${node.details.reason}`;
         default:
             return node.label;
     }
@@ -328,7 +354,9 @@ function getNodeTypeName(type) {
         'PROJECTION': 'π Projeção',
         'SELECTION': 'σ Seleção',
         'JOIN': '⋈ Junção',
-        'CROSS_PRODUCT': '× Produto Cartesiano'
+        'CROSS_PRODUCT': '× Produto Cartesiano',
+        'SORT': 'τ Ordenação',
+        'EMPTY': '∅ Resultado Vazio'
     };
     return names[type] || type;
 }
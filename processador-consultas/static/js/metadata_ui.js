@@ -1,7 +1,49 @@
+// ==================== CACHE DOS METADADOS ====================
+const METADATA_CACHE_KEY = 'metadataCache';
+
+function readCachedMetadata() {
+    try {
+        return JSON.parse(localStorage.getItem(METADATA_CACHE_KEY));
+    } catch (error) {
+        return null;
+    }
+}
+
+function writeCachedMetadata(etag, metadata) {
+    try {
+        localStorage.setItem(METADATA_CACHE_KEY, JSON.stringify({ etag, metadata }));
+    } catch (error) {
+        // Armazenamento cheio ou indisponível: segue sem cache
+    }
+}
+
+// Revalida o esquema com If-None-Match; em 304 reutiliza a cópia local
+async function fetchMetadata() {
+    const cached = readCachedMetadata();
+    const headers = {};
+    if (cached && cached.etag) {
+        headers['If-None-Match'] = cached.etag;
+    }
+
+    const response = await fetch('/metadata', { headers, cache: 'no-store' });
+    if (response.status === 304 && cached) {
+        return cached.metadata;
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+    }
+
+    const metadata = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        writeCachedMetadata(etag, metadata);
+    }
+    return metadata;
+}
+
 window.loadMetadata = async function() {
     try {
-        const response = await fetch('/metadata');
-        const metadata = await response.json();
+        const metadata = await fetchMetadata();
         window.metadata = metadata;
 
         const tablesGrid = document.getElementById('tablesGrid');
@@ -0,0 +1,222 @@
+"""Estatísticas das tabelas usadas pelo modelo de custo do otimizador.
+
+Por tabela guarda-se o número de linhas e, por atributo, o número de valores
+distintos, a fração de nulos, o mínimo, o máximo, um histograma equi-depth
+(limites de faixas com o mesmo número de linhas) e se os valores estão
+armazenados em ordem crescente (carga ordenada ou índice clusterizado), o que
+permite ao otimizador usar merge join sem ordenar a entrada. As estatísticas são coletadas
+por um comando no estilo ANALYZE sobre os dados carregados (um banco SQLite,
+arquivos colunares ou colunas em memória) e persistidas em JSON, ao lado do esquema.
+"""
+import bisect
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field, asdict
+
+from spill import order_key
+
+
+# Número de faixas dos histogramas equi-depth
+HISTOGRAM_BUCKETS = 32
+
+STATISTICS_FORMAT_VERSION = 1
+
+
+@dataclass
+class ColumnStats:
+    """Estatísticas de um atributo"""
+    ndv: int = 0
+    null_frac: float = 0.0
+    min: object = None
+    max: object = None
+    histogram: list = field(default_factory=list)
+    clustered: bool = False
+
+    def fraction_below(self, value, inclusive=False) -> float | None:
+        """Fração das linhas não nulas com valor < `value` (ou <=), pelo histograma.
+
+        Devolve None quando não há histograma ou o valor não é comparável aos limites.
+        """
+        bounds = self.histogram
+        if len(bounds) < 2:
+            return None
+        try:
+            if value < bounds[0]:
+                return 0.0
+            if value > bounds[-1]:
+                return 1.0
+            pos = (bisect.bisect_right if inclusive else bisect.bisect_left)(bounds, value)
+        except TypeError:
+            return None
+        buckets = len(bounds) - 1
+        if pos == 0:
+            return 0.0
+        if pos > buckets:
+            return 1.0
+        low, high = bounds[pos - 1], bounds[pos]
+        # interpolação linear dentro da faixa (só para valores numéricos)
+        within = 0.5
+        if isinstance(value, (int, float)) and isinstance(low, (int, float)) and high > low:
+            within = min(1.0, max(0.0, (value - low) / (high - low)))
+        return (pos - 1 + within) / buckets
+
+
+@dataclass
+class TableStats:
+    """Estatísticas de uma tabela: número de linhas e estatísticas por atributo"""
+    rows: int = 0
+    columns: dict = field(default_factory=dict)
+
+    def column(self, name: str) -> ColumnStats | None:
+        return self.columns.get(name)
+
+
+def equi_depth_histogram(sorted_values, count: int, buckets: int = HISTOGRAM_BUCKETS) -> list:
+    """Limites de um histograma equi-depth a partir dos valores não nulos já ordenados.
+
+    Percorre os valores uma única vez, guardando apenas os que caem nos limites
+    das faixas (posições 0, n/k, 2n/k, ..., n-1).
+    """
+    if count == 0:
+        return []
+    buckets = max(1, min(buckets, count))
+    positions = sorted({round(i * (count - 1) / buckets) for i in range(buckets + 1)})
+    bounds, wanted = [], iter(positions)
+    target = next(wanted)
+    for index, value in enumerate(sorted_values):
+        if index == target:
+            bounds.append(value)
+            target = next(wanted, None)
+            if target is None:
+                break
+    return bounds
+
+
+def is_clustered(values) -> bool:
+    """Se os valores, na ordem em que estão armazenados, já estão em ordem
+    crescente (a ordem do executor: nulos por último, textos sem maiúsculas)"""
+    previous = None
+    for value in values:
+        key = order_key(value)
+        if previous is not None and key < previous:
+            return False
+        previous = key
+    return previous is not None
+
+
+def analyze_column(values: list, buckets: int = HISTOGRAM_BUCKETS) -> ColumnStats:
+    """Estatísticas de um atributo a partir de todos os seus valores (na ordem armazenada)"""
+    present = sorted(v for v in values if v is not None)
+    total = len(values)
+    if not present:
+        return ColumnStats(ndv=0, null_frac=1.0 if total else 0.0)
+    return ColumnStats(
+        ndv=len(set(present)),
+        null_frac=(total - len(present)) / total,
+        min=present[0],
+        max=present[-1],
+        histogram=equi_depth_histogram(present, len(present), buckets),
+        clustered=is_clustered(values),
+    )
+
+
+def analyze_table(columns: dict, buckets: int = HISTOGRAM_BUCKETS) -> TableStats:
+    """Estatísticas de uma tabela em memória (atributo -> lista de valores)"""
+    rows = max((len(values) for values in columns.values()), default=0)
+    return TableStats(rows=rows, columns={name: analyze_column(values, buckets) for name, values in columns.items()})
+
+
+def analyze_sqlite(path: str, tables=None, buckets: int = HISTOGRAM_BUCKETS) -> dict:
+    """ANALYZE sobre um banco SQLite: tabela -> TableStats.
+
+    Contagens, distintos e extremos vêm de agregações no próprio banco; o
+    histograma é montado percorrendo os valores ordenados e a ordem de
+    armazenamento é conferida percorrendo a tabela na ordem da varredura (a
+    mesma em que o executor a carrega), sem carregá-los todos em memória.
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        if tables is None:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid")]
+        result = {}
+        for table in tables:
+            rows = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            columns = {}
+            for col in [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]:
+                present, ndv, low, high = conn.execute(
+                    f'SELECT COUNT("{col}"), COUNT(DISTINCT "{col}"), MIN("{col}"), MAX("{col}") FROM "{table}"'
+                ).fetchone()
+                ordered = (row[0] for row in conn.execute(
+                    f'SELECT "{col}" FROM "{table}" WHERE "{col}" IS NOT NULL ORDER BY "{col}"'))
+                columns[col.lower()] = ColumnStats(
+                    ndv=ndv,
+                    null_frac=(rows - present) / rows if rows else 0.0,
+                    min=low,
+                    max=high,
+                    histogram=equi_depth_histogram(ordered, present, buckets),
+                    clustered=is_clustered(row[0] for row in conn.execute(f'SELECT "{col}" FROM "{table}"')),
+                )
+            result[table.lower()] = TableStats(rows=rows, columns=columns)
+        return result
+    finally:
+        conn.close()
+
+
+def analyze_columnar(directory: str, tables=None, buckets: int = HISTOGRAM_BUCKETS) -> dict:
+    """ANALYZE sobre um diretório de arquivos colunares (column_store): tabela -> TableStats"""
+    import column_store
+    result = {}
+    for table in tables or column_store.list_tables(directory):
+        mapped = column_store.open_table(column_store.table_path(directory, table))
+        result[table.lower()] = analyze_table(
+            {name.lower(): mapped.columns.columns[name].to_list() for name in mapped.names}, buckets)
+    return result
+
+
+class Statistics:
+    """Conjunto das estatísticas das tabelas, persistido em JSON"""
+
+    def __init__(self, tables: dict | None = None):
+        self.tables = dict(tables or {})
+
+    def __contains__(self, table) -> bool:
+        return table in self.tables
+
+    def table(self, name: str) -> TableStats | None:
+        return self.tables.get(name)
+
+    def column(self, table: str, column: str) -> ColumnStats | None:
+        stats = self.tables.get(table)
+        return stats.column(column) if stats is not None else None
+
+    def update(self, tables: dict):
+        """Substitui as estatísticas das tabelas analisadas, mantendo as demais"""
+        self.tables.update(tables)
+
+    def to_dict(self) -> dict:
+        return {
+            'version': STATISTICS_FORMAT_VERSION,
+            'tables': {name: asdict(stats) for name, stats in self.tables.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Statistics':
+        tables = {}
+        for name, stats in data.get('tables', {}).items():
+            columns = {col: ColumnStats(**values) for col, values in stats.get('columns', {}).items()}
+            tables[name] = TableStats(rows=stats.get('rows', 0), columns=columns)
+        return cls(tables)
+
+    def save(self, path: str):
+        """Grava em JSON (arquivo temporário + rename, para leitores nunca verem um arquivo parcial)"""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'Statistics':
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,305 @@
+import unittest
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import app as app_module
+import benchmark
+from catalog import CatalogSource
+from app import app, ValidationCache, METADATA, SQLValidator, VALIDATOR, validate_batch, run_bulk_validation
+
+
+class FakeClock:
+    """Relógio controlável para testar expiração"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestValidationCache(unittest.TestCase):
+    """Testes para o cache LRU do endpoint /validate"""
+
+    def setUp(self):
+        self.original_cache = app_module.VALIDATION_CACHE
+        self.original_source = app_module.CATALOG_SOURCE
+        app_module.VALIDATION_CACHE = ValidationCache(maxsize=16, ttl=60)
+        app_module.CATALOG_SOURCE = CatalogSource(metadata=METADATA, check_interval=0)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.VALIDATION_CACHE = self.original_cache
+        app_module.CATALOG_SOURCE = self.original_source
+
+    def test_01_repeated_query_hits(self):
+        """[CACHE] Consultas equivalentes após normalização reutilizam o resultado"""
+        first = self.client.post('/validate', json={'query': 'SELECT * FROM Cliente'}).get_json()
+        second = self.client.post('/validate', json={'query': 'select   *  from cliente'}).get_json()
+        self.assertEqual(first, second)
+        stats = self.client.get('/validate/cache').get_json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+
+    def test_02_lru_eviction(self):
+        """[CACHE] A entrada menos usada recentemente é descartada"""
+        cache = ValidationCache(maxsize=2, ttl=0)
+        cache.put('a', 'v1', {'r': 'a'})
+        cache.put('b', 'v1', {'r': 'b'})
+        cache.get('a', 'v1')
+        cache.put('c', 'v1', {'r': 'c'})
+        self.assertIsNone(cache.get('b', 'v1'))
+        self.assertEqual(cache.get('a', 'v1'), {'r': 'a'})
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_03_ttl_expiration(self):
+        """[CACHE] Entradas expiram após o TTL"""
+        clock = FakeClock()
+        cache = ValidationCache(maxsize=4, ttl=10, clock=clock)
+        cache.put('a', 'v1', {'r': 'a'})
+        clock.now = 9
+        self.assertIsNotNone(cache.get('a', 'v1'))
+        clock.now = 11
+        self.assertIsNone(cache.get('a', 'v1'))
+
+    def test_04_metadata_change_invalidates(self):
+        """[CACHE] Mudança nos metadados invalida o cache"""
+        query = 'SELECT * FROM Cliente'
+        self.client.post('/validate', json={'query': query})
+        METADATA['cliente'].append('cpf')
+        try:
+            result = self.client.post('/validate', json={'query': 'SELECT Cliente.CPF FROM Cliente'}).get_json()
+            self.assertTrue(result['valid'])
+            self.client.post('/validate', json={'query': query})
+            self.assertEqual(app_module.VALIDATION_CACHE.stats()['hits'], 0)
+        finally:
+            METADATA['cliente'].remove('cpf')
+
+
+class TestSharedValidator(unittest.TestCase):
+    """Testes para o validador compartilhado entre threads"""
+
+    def test_01_no_per_query_state(self):
+        """[CONCORRÊNCIA] Aliases ficam no resultado, não no validador"""
+        validator = SQLValidator(METADATA)
+        first = validator.validate("SELECT c.Nome FROM Cliente c")
+        second = validator.validate("SELECT p.DataPedido FROM Pedido p")
+        self.assertEqual(first['aliases'], {'c': 'cliente'})
+        self.assertEqual(second['aliases'], {'p': 'pedido'})
+        self.assertFalse(hasattr(validator, 'table_aliases'))
+
+    def test_02_concurrent_validation(self):
+        """[CONCORRÊNCIA] Uma instância atende várias threads com resultados corretos"""
+        queries = [
+            f"SELECT {alias}.Nome FROM {table} {alias} WHERE {alias}.Nome = 'x{i}'"
+            for i in range(200)
+            for table, alias in (('Cliente', 'c'), ('Produto', 'pr'), ('Categoria', 'cat'))
+        ]
+        expected = [SQLValidator(METADATA).validate(q) for q in queries]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(VALIDATOR.validate, queries))
+        self.assertEqual(results, expected)
+
+
+class TestBatchValidation(unittest.TestCase):
+    """Testes para a validação em lote (/validate/batch)"""
+
+    QUERIES = [
+        "SELECT * FROM Cliente",
+        "SELECT * FROM Funcionario",
+        "",
+        "SELECT c.Nome FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente",
+    ]
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_01_results_in_input_order(self):
+        """[LOTE] Resultados retornam na ordem de entrada, com tempo por consulta"""
+        data = self.client.post('/validate/batch', json={'queries': self.QUERIES}).get_json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual([r['valid'] for r in data['results']], [True, False, False, True])
+        self.assertTrue(all(r['elapsed_ms'] >= 0 for r in data['results']))
+
+    def test_02_process_pool(self):
+        """[LOTE] Validação distribuída em processos produz os mesmos resultados"""
+        queries = self.QUERIES * 10
+        with ProcessPoolExecutor(max_workers=2, initializer=app_module._init_batch_worker) as pool:
+            parallel = validate_batch(queries, pool=pool)
+        sequential = validate_batch(queries)
+        strip = lambda rs: [{k: v for k, v in r.items() if k != 'elapsed_ms'} for r in rs]
+        self.assertEqual(strip(parallel), strip(sequential))
+
+    def test_03_invalid_payload(self):
+        """[LOTE] Corpo sem lista de consultas é rejeitado"""
+        response = self.client.post('/validate/batch', json={'queries': 'SELECT * FROM Cliente'})
+        self.assertEqual(response.status_code, 400)
+
+
+
+class TestBulkValidationCLI(unittest.TestCase):
+    """Testes para a validação em massa pela linha de comando (JSONL)"""
+
+    INPUT = (
+        "SELECT * FROM Cliente\n"
+        "\n"
+        '{"id": "r1", "query": "SELECT * FROM Funcionario"}\n'
+        "{quebrado\n"
+    )
+
+    def run_cli(self, text, workers=0):
+        output = io.StringIO()
+        summary = run_bulk_validation(io.StringIO(text), output, workers=workers)
+        return summary, [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_01_plain_and_jsonl_lines(self):
+        """[CLI] Aceita consultas puras e JSONL, ignorando linhas vazias"""
+        summary, records = self.run_cli(self.INPUT)
+        self.assertEqual(summary, {'total': 3, 'valid': 1, 'invalid': 2})
+        self.assertEqual([r['line'] for r in records], [1, 3, 4])
+        self.assertTrue(records[0]['valid'])
+        self.assertEqual(records[1]['id'], 'r1')
+        self.assertFalse(records[1]['valid'])
+        self.assertIn('JSON inválido', records[2]['error'])
+
+    def test_02_workers_preserve_order(self):
+        """[CLI] Modo com processos mantém a ordem de entrada"""
+        text = ''.join(f"SELECT * FROM Cliente WHERE Cliente.idCliente = {i}\n" for i in range(600))
+        summary, records = self.run_cli(text, workers=2)
+        self.assertEqual(summary['valid'], 600)
+        self.assertEqual([r['line'] for r in records], list(range(1, 601)))
+
+    def test_03_non_string_query(self):
+        """[CLI] Campo 'query' que não é string gera erro na própria linha, sem interromper a execução"""
+        text = '{"id": 7, "query": 123}\n{"query": ["select"]}\nSELECT * FROM Cliente\n'
+        summary, records = self.run_cli(text)
+        self.assertEqual(summary, {'total': 3, 'valid': 1, 'invalid': 2})
+        self.assertEqual(records[0], {'line': 1, 'id': 7, 'error': "O campo 'query' deve ser uma string"})
+        self.assertIn('error', records[1])
+        self.assertTrue(records[2]['valid'])
+
+
+class TestBenchmark(unittest.TestCase):
+    """Testes para o benchmark das etapas de processamento e a comparação com a linha de base"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_01_corpus_is_valid(self):
+        """[BENCHMARK] Todas as formas do corpus (até 64 junções, 256 atributos, 32 níveis de AND/OR) são válidas"""
+        corpus = dict(benchmark.query_corpus())
+        self.assertIn('joins_64', corpus)
+        validator = SQLValidator(METADATA)
+        for name, query in corpus.items():
+            result = validator.validate(query)
+            self.assertTrue(result['valid'], (name, result['errors']))
+        self.assertEqual(corpus['joins_64'].lower().count(' join '), 64)
+
+    def test_02_stage_summaries(self):
+        """[BENCHMARK] Mínimo, mediana e p99 de cada etapa, por forma de consulta"""
+        report = benchmark.run_benchmark([('joins_2', benchmark.join_query(2))], repeat=5)
+        stages = report['results']['joins_2']
+        self.assertEqual(tuple(stages), benchmark.STAGES)
+        for summary in stages.values():
+            self.assertLessEqual(summary['min'], summary['median'])
+            self.assertLessEqual(summary['median'], summary['p99'])
+        self.assertEqual(benchmark.summarize(list(range(1, 201))), {'min': 1, 'median': 100.5, 'p99': 198})
+
+    def test_03_compare_with_baseline(self):
+        """[BENCHMARK] Regressão acima do limite e do ruído falha; melhora ou ruído não"""
+        def report(**medians):
+            return {'results': {'q': {stage: {'min': m, 'median': m, 'p99': m} for stage, m in medians.items()}}}
+        baseline = report(parse=100e-6, optimize_operator_graph=1e-3, normalize_query=2e-6)
+        current = report(parse=110e-6, optimize_operator_graph=2e-3, normalize_query=10e-6)
+        regressions = benchmark.compare(baseline, current, threshold=0.25)
+        self.assertEqual([(r['query'], r['stage']) for r in regressions], [('q', 'optimize_operator_graph')])
+        self.assertAlmostEqual(regressions[0]['ratio'], 2.0)
+        self.assertEqual(benchmark.compare(current, baseline), [])
+
+    def test_04_cli_writes_and_compares_baseline(self):
+        """[BENCHMARK] Comando benchmark grava a linha de base e falha contra uma linha de base mais rápida"""
+        path = os.path.join(self.tmpdir.name, 'baseline.json')
+        args = ['benchmark', '-k', 'joins_2', '-n', '3']
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(app_module.main(args + ['-o', path]), 0)
+            self.assertEqual(app_module.main(args + ['-c', path, '-t', '100']), 0)
+            saved = benchmark.load_baseline(path)
+            for summary in saved['results']['joins_2'].values():
+                summary['median'] /= 1000
+            benchmark.save_baseline(saved, path)
+            self.assertEqual(app_module.main(args + ['-c', path]), 1)
+        self.assertIn('optimize_operator_graph', output.getvalue())
+        self.assertEqual(list(saved['results']), ['joins_2'])
+
+
+class TestMetadataEndpoint(unittest.TestCase):
+    """Testes para o GET condicional de /metadata"""
+
+    def setUp(self):
+        self.original_source = app_module.CATALOG_SOURCE
+        app_module.CATALOG_SOURCE = CatalogSource(metadata=METADATA, check_interval=0)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app_module.CATALOG_SOURCE = self.original_source
+
+    def test_01_etag_and_revalidation(self):
+        """[METADADOS] Resposta traz ETag e a revalidação devolve 304 sem corpo"""
+        first = self.client.get('/metadata')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_json(), METADATA)
+        etag = first.headers['ETag']
+        self.assertIn('Last-Modified', first.headers)
+
+        second = self.client.get('/metadata', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+
+        since = self.client.get('/metadata', headers={'If-Modified-Since': first.headers['Last-Modified']})
+        self.assertEqual(since.status_code, 304)
+
+    def test_02_gzip_payload(self):
+        """[METADADOS] Cliente que aceita gzip recebe o payload pré-comprimido"""
+        response = self.client.get('/metadata', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.data)), METADATA)
+        self.assertIs(app_module.get_metadata_payload(), app_module.get_metadata_payload())
+
+    def test_03_schema_change_new_etag(self):
+        """[METADADOS] Mudança no esquema gera novo ETag"""
+        etag = self.client.get('/metadata').headers['ETag']
+        METADATA['cliente'].append('cpf')
+        try:
+            response = self.client.get('/metadata', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+            self.assertIn('cpf', response.get_json()['cliente'])
+        finally:
+            METADATA['cliente'].remove('cpf')
+
+    def test_04_etag_per_encoding(self):
+        """[METADADOS] Respostas gzip e sem compressão têm ETags fortes distintas"""
+        plain = self.client.get('/metadata')
+        compressed = self.client.get('/metadata', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotEqual(plain.headers['ETag'], compressed.headers['ETag'])
+        self.assertFalse(compressed.headers['ETag'].startswith('W/'))
+        self.assertIn('Accept-Encoding', compressed.headers['Vary'])
+        revalidated = self.client.get('/metadata', headers={'Accept-Encoding': 'gzip',
+                                                            'If-None-Match': compressed.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.headers['ETag'], compressed.headers['ETag'])
+        # o ETag da versão gzip não valida a representação sem compressão
+        response = self.client.get('/metadata', headers={'If-None-Match': compressed.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), METADATA)
+
+
+if __name__ == '__main__':
+    unittest.main()
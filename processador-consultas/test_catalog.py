@@ -0,0 +1,247 @@
+import unittest
+import importlib.util
+import json
+import os
+import sqlite3
+import tempfile
+from app import SQLValidator, METADATA
+from catalog import Catalog, CatalogSource, load_metadata
+from optimizer import CostModel
+from sql_parser import parse_predicate
+from table_stats import Statistics, analyze_column, analyze_table, analyze_sqlite, equi_depth_histogram
+import app as app_module
+
+
+class TestCatalog(unittest.TestCase):
+    """Testes para o catálogo indexado de metadados"""
+
+    def setUp(self):
+        self.catalog = Catalog.from_metadata(METADATA)
+        self.validator = SQLValidator(self.catalog)
+
+    def test_01_column_lookup(self):
+        """[CATÁLOGO] Consulta de atributos por tabela"""
+        self.assertIn('cliente', self.catalog)
+        self.assertTrue(self.catalog.has_column('cliente', 'email'))
+        self.assertFalse(self.catalog.has_column('cliente', 'cpf'))
+        self.assertFalse(self.catalog.has_column('funcionario', 'nome'))
+        self.assertEqual(self.catalog.columns('status'), ('idstatus', 'descricao'))
+
+    def test_02_reverse_index(self):
+        """[CATÁLOGO] Índice reverso atributo -> tabelas"""
+        self.assertEqual(self.catalog.tables_with_column('cliente_idcliente'),
+                         frozenset(['endereco', 'telefone', 'pedido']))
+        self.assertEqual(self.catalog.tables_with_column('inexistente'), frozenset())
+
+    def test_03_keys_from_naming_convention(self):
+        """[CATÁLOGO] Chaves primárias e estrangeiras inferidas pelos nomes"""
+        self.assertEqual(self.catalog.primary_key('cliente'), 'idcliente')
+        self.assertEqual(self.catalog.primary_key('pedido_has_produto'), 'idpedidoproduto')
+        self.assertIsNone(self.catalog.primary_key('telefone'))
+        self.assertEqual(self.catalog.foreign_keys['pedido'], {
+            'status_idstatus': ('status', 'idstatus'),
+            'cliente_idcliente': ('cliente', 'idcliente'),
+        })
+
+    def test_04_unqualified_column_resolved(self):
+        """[CATÁLOGO] Atributo não qualificado é resolvido entre as tabelas da consulta"""
+        result = self.validator.validate(
+            "SELECT email FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente")
+        self.assertTrue(result['valid'], result['errors'])
+
+    def test_05_unqualified_column_unknown(self):
+        """[CATÁLOGO] Atributo não qualificado inexistente gera erro"""
+        result = self.validator.validate("SELECT cpf FROM Cliente")
+        self.assertFalse(result['valid'])
+        self.assertIn("Atributo 'cpf' não existe em nenhuma tabela da consulta", result['errors'])
+
+    def test_06_unqualified_column_ambiguous(self):
+        """[CATÁLOGO] Atributo presente em mais de uma tabela da consulta é ambíguo"""
+        result = self.validator.validate(
+            "SELECT nome FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+            "JOIN Pedido_has_Produto pp ON p.idPedido = pp.Pedido_idPedido "
+            "JOIN Produto pr ON pp.Produto_idProduto = pr.idProduto")
+        self.assertFalse(result['valid'])
+        self.assertTrue(any('ambíguo' in e for e in result['errors']))
+
+
+class TestCatalogSource(unittest.TestCase):
+    """Testes para a carga do esquema (JSON/YAML/SQLite) e recarga a quente"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_json(self, name, data, mtime=None):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_01_load_json_and_yaml(self):
+        """[ESQUEMA] Carga de arquivos JSON e YAML"""
+        path = self.write_json('schema.json', {'tables': {'Loja': ['idLoja', 'Nome']}})
+        self.assertEqual(load_metadata(path), {'loja': ['idloja', 'nome']})
+        yaml_path = os.path.join(self.tmpdir.name, 'schema.yaml')
+        with open(yaml_path, 'w', encoding='utf-8') as f:
+            f.write("loja:\n  - idloja\n  - nome\n")
+        try:
+            self.assertEqual(load_metadata(yaml_path), {'loja': ['idloja', 'nome']})
+        except RuntimeError:
+            self.skipTest('PyYAML não instalado')
+
+    def test_02_introspect_sqlite(self):
+        """[ESQUEMA] Introspecção de um banco SQLite"""
+        path = os.path.join(self.tmpdir.name, 'loja.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE loja (idloja INTEGER PRIMARY KEY, nome TEXT)')
+        conn.execute('CREATE TABLE venda (idvenda INTEGER, loja_idloja INTEGER)')
+        conn.close()
+        catalog = CatalogSource(path=path).get()
+        self.assertEqual(catalog.to_metadata(), {'loja': ['idloja', 'nome'], 'venda': ['idvenda', 'loja_idloja']})
+        self.assertEqual(catalog.foreign_keys['venda'], {'loja_idloja': ('loja', 'idloja')})
+
+    def test_03_reload_on_mtime_change(self):
+        """[ESQUEMA] Catálogo é recarregado quando o arquivo muda e os ouvintes são avisados"""
+        path = self.write_json('schema.json', {'loja': ['idloja']}, mtime=1_000_000)
+        source = CatalogSource(path=path, check_interval=0)
+        reloaded = []
+        source.on_reload(reloaded.append)
+        first = source.get()
+        self.assertIs(source.get(), first)
+
+        self.write_json('schema.json', {'loja': ['idloja', 'nome']}, mtime=1_000_100)
+        second = source.get()
+        self.assertIsNot(second, first)
+        self.assertTrue(second.has_column('loja', 'nome'))
+        self.assertEqual(reloaded, [second])
+
+    def test_04_same_content_keeps_snapshot(self):
+        """[ESQUEMA] Mudança de mtime sem mudança de conteúdo não invalida o catálogo"""
+        path = self.write_json('schema.json', {'loja': ['idloja']}, mtime=1_000_000)
+        source = CatalogSource(path=path, check_interval=0)
+        reloaded = []
+        source.on_reload(reloaded.append)
+        first = source.get()
+        os.utime(path, (1_000_200, 1_000_200))
+        self.assertIs(source.get(), first)
+        self.assertEqual(reloaded, [])
+
+    def test_05_broken_file_keeps_previous(self):
+        """[ESQUEMA] Erro na recarga mantém o snapshot anterior"""
+        path = self.write_json('schema.json', {'loja': ['idloja']}, mtime=1_000_000)
+        source = CatalogSource(path=path, check_interval=0)
+        first = source.get()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{quebrado')
+        os.utime(path, (1_000_300, 1_000_300))
+        self.assertIs(source.get(), first)
+        self.assertIsNotNone(source.last_error)
+
+    def test_06_check_interval_throttles(self):
+        """[ESQUEMA] A fonte não é verificada antes do intervalo configurado"""
+        now = [0.0]
+        path = self.write_json('schema.json', {'loja': ['idloja']}, mtime=1_000_000)
+        source = CatalogSource(path=path, check_interval=10, clock=lambda: now[0])
+        first = source.get()
+        self.write_json('schema.json', {'loja': ['idloja', 'nome']}, mtime=1_000_100)
+        now[0] = 5
+        self.assertIs(source.get(), first)
+        now[0] = 11
+        self.assertTrue(source.get().has_column('loja', 'nome'))
+
+    @unittest.skipUnless(importlib.util.find_spec('yaml'), 'PyYAML não instalado')
+    def test_07_broken_yaml_keeps_previous(self):
+        """[ESQUEMA] YAML malformado na recarga mantém o snapshot anterior"""
+        now = [0.0]
+        path = os.path.join(self.tmpdir.name, 'schema.yaml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("loja:\n  - idloja\n")
+        source = CatalogSource(path=path, check_interval=10, clock=lambda: now[0])
+        first = source.get()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("loja: [idloja\n  - : nome\n")
+        os.utime(path, (1_000_300, 1_000_300))
+        now[0] = 11
+        self.assertIs(source.get(), first)
+        self.assertIn('YAML inválido', source.last_error)
+        # corrigido o arquivo, a nova versão é lida na próxima verificação
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("loja:\n  - idloja\n  - nome\n")
+        os.utime(path, (1_000_400, 1_000_400))
+        now[0] = 15
+        self.assertIs(source.get(), first)
+        now[0] = 22
+        self.assertTrue(source.get().has_column('loja', 'nome'))
+        self.assertIsNone(source.last_error)
+
+
+
+class TestTableStatistics(unittest.TestCase):
+    """Testes para as estatísticas das tabelas (ANALYZE) e seu uso nas estimativas"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmpdir.name, 'loja.db')
+        conn = sqlite3.connect(self.db)
+        conn.execute('CREATE TABLE status (idstatus INTEGER, descricao TEXT)')
+        conn.execute('CREATE TABLE pedido (idpedido INTEGER, status_idstatus INTEGER, valortotalpedido REAL)')
+        conn.executemany('INSERT INTO status VALUES (?, ?)', [(i, f's{i}') for i in range(4)])
+        conn.executemany('INSERT INTO pedido VALUES (?, ?, ?)',
+                         [(i, i % 4, None if i % 10 == 0 else float(i)) for i in range(1000)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_01_column_statistics(self):
+        """[ESTATÍSTICAS] Distintos, nulos, extremos e histograma equi-depth"""
+        stats = analyze_column([5, None, 1, 3, 3, None, 9, 7])
+        self.assertEqual((stats.ndv, stats.min, stats.max), (5, 1, 9))
+        self.assertAlmostEqual(stats.null_frac, 0.25)
+        self.assertEqual(equi_depth_histogram(range(101), 101, buckets=4), [0, 25, 50, 75, 100])
+        self.assertEqual(analyze_table({'a': [1, 2], 'b': [None, None]}).rows, 2)
+        self.assertFalse(stats.clustered)
+        self.assertTrue(analyze_column(['a', 'B', 'c', None]).clustered)
+
+    def test_02_analyze_sqlite_and_persist(self):
+        """[ESTATÍSTICAS] ANALYZE de um banco SQLite, gravado e relido em JSON"""
+        path = os.path.join(self.tmpdir.name, 'stats.json')
+        Statistics(analyze_sqlite(self.db)).save(path)
+        stats = Statistics.load(path)
+        self.assertEqual(stats.table('pedido').rows, 1000)
+        self.assertEqual(stats.table('status').rows, 4)
+        valor = stats.column('pedido', 'valortotalpedido')
+        self.assertAlmostEqual(valor.null_frac, 0.1)
+        self.assertEqual((valor.min, valor.max), (1.0, 999.0))
+        self.assertEqual(stats.column('pedido', 'status_idstatus').ndv, 4)
+        self.assertTrue(stats.column('pedido', 'idpedido').clustered)
+        self.assertFalse(stats.column('pedido', 'status_idstatus').clustered)
+        self.assertFalse(valor.clustered)
+
+    def test_03_estimates_use_statistics(self):
+        """[ESTATÍSTICAS] Modelo de custo usa linhas, distintos e histogramas"""
+        model = CostModel(statistics=Statistics(analyze_sqlite(self.db)))
+        relations = {'p': 'pedido', 's': 'status'}
+        self.assertEqual(model.table_rows('pedido'), 1000)
+        self.assertAlmostEqual(model.selectivity(parse_predicate('p.status_idstatus=2'), relations), 0.25)
+        self.assertAlmostEqual(model.selectivity(parse_predicate('p.valortotalpedido<250'), relations), 0.225, delta=0.02)
+        self.assertAlmostEqual(model.selectivity(parse_predicate('500<=p.valortotalpedido'), relations), 0.45, delta=0.02)
+        self.assertAlmostEqual(model.selectivity(parse_predicate('p.status_idstatus=s.idstatus'), relations), 0.25)
+
+    def test_04_analyze_command(self):
+        """[ESTATÍSTICAS] Comando analyze atualiza o arquivo de estatísticas"""
+        path = os.path.join(self.tmpdir.name, 'stats.json')
+        Statistics({'cliente': analyze_table({'idcliente': [1, 2, 3]})}).save(path)
+        self.assertEqual(app_module.main(['analyze', self.db, 'status', '-o', path]), 0)
+        stats = Statistics.load(path)
+        self.assertEqual(sorted(stats.tables), ['cliente', 'status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
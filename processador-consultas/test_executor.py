@@ -0,0 +1,645 @@
+import unittest
+import importlib.util
+import os
+import random
+import sqlite3
+import tempfile
+from app import app, execute_query, generate_execution_plan, SQLValidator, METADATA, OperatorGraph
+from catalog import Catalog
+from executor import Database, ExecutionError, PlanBuilder, HashJoin, MergeJoin, execute_graph, merge_pairs
+from optimizer import PlanGraph, optimize_operator_graph
+from sql_parser import parse
+from table_stats import Statistics, analyze_table
+from test_optimizer import sized_model
+import app as app_module
+
+# Modos de execução disponíveis (o vetorizado exige NumPy)
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+MODES = ('row', 'vectorized') if HAS_NUMPY else ('row',)
+
+# Testes que medem tempo de relógio só rodam quando pedidos (TIMING_TESTS=1)
+TIMING_TESTS = os.environ.get('TIMING_TESTS') == '1'
+
+
+def sample_database() -> Database:
+    """Poucas linhas de clientes, pedidos e status para conferir os resultados à mão"""
+    return Database(Catalog.from_metadata(METADATA), {
+        'cliente': [
+            {'idcliente': 1, 'nome': 'Ana', 'email': 'ana@x.com'},
+            {'idcliente': 2, 'nome': 'Bruno', 'email': 'bruno@x.com'},
+            {'idcliente': 3, 'nome': 'Carla', 'email': None},
+        ],
+        'pedido': [
+            {'idpedido': 10, 'status_idstatus': 1, 'valortotalpedido': 50.0, 'cliente_idcliente': 1},
+            {'idpedido': 11, 'status_idstatus': 2, 'valortotalpedido': 5.0, 'cliente_idcliente': 1},
+            {'idpedido': 12, 'status_idstatus': 1, 'valortotalpedido': 500.0, 'cliente_idcliente': 2},
+        ],
+        'status': [(1, 'Aberto'), (2, 'Entregue')],
+    })
+
+
+class TestExecutor(unittest.TestCase):
+    """Testes para o executor (modelo de iteradores) do grafo otimizado"""
+
+    def setUp(self):
+        self.database = sample_database()
+        self.validator = SQLValidator(METADATA)
+
+    def run_query(self, query):
+        result = execute_query(query, self.database)
+        self.assertTrue(result['valid'], result['errors'])
+        return result
+
+    def test_01_scan_selection_projection(self):
+        """[EXECUÇÃO] Filtro e projeção sobre uma tabela (texto sem diferenciar maiúsculas)"""
+        result = self.run_query("SELECT Nome, Email FROM Cliente WHERE Nome = 'BRUNO' OR idCliente >= 3")
+        self.assertEqual(result['columns'], ['nome', 'email'])
+        self.assertEqual(result['rows'], [['Bruno', 'bruno@x.com'], ['Carla', None]])
+
+    def test_02_join_with_filter(self):
+        """[EXECUÇÃO] Junção com filtros empurrados produz as linhas corretas"""
+        result = self.run_query(
+            "SELECT c.Nome, p.idPedido AS pid, s.Descricao FROM Cliente c "
+            "JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+            "JOIN Status s ON p.Status_idStatus = s.idStatus WHERE p.ValorTotalPedido > 10")
+        self.assertEqual(result['columns'], ['c.nome', 'pid', 's.descricao'])
+        self.assertEqual(sorted(result['rows']), [['Ana', 10, 'Aberto'], ['Bruno', 12, 'Aberto']])
+        scans = [op['rows'] for op in result['operators'] if op['type'] == 'SCAN']
+        self.assertEqual(sorted(scans), [2, 3, 3])
+
+    def test_03_cross_product_and_star(self):
+        """[EXECUÇÃO] Produto cartesiano e expansão de *"""
+        result = self.run_query("SELECT * FROM Cliente c, Status s")
+        self.assertEqual(result['row_count'], 6)
+        self.assertEqual(len(result['columns']), 9)
+        self.assertEqual(result['columns'][0], 'c.idcliente')
+
+    def test_04_optimized_matches_original(self):
+        """[EXECUÇÃO] Grafo otimizado e grafo original devolvem as mesmas linhas"""
+        validation = self.validator.validate(
+            "SELECT c.Nome, p.idPedido FROM Cliente c, Pedido p "
+            "WHERE c.idCliente = p.Cliente_idCliente AND p.Status_idStatus = 1")
+        original = execute_graph(validation['operator_graph'], self.database)
+        optimized = execute_graph(validation['optimized_graph'], self.database)
+        self.assertEqual(sorted(optimized['rows']), sorted(original['rows']))
+        self.assertEqual(sorted(optimized['rows']), [['Ana', 10], ['Bruno', 12]])
+
+    def test_05_empty_plan_reads_nothing(self):
+        """[EXECUÇÃO] Consulta contraditória não lê nenhuma tabela"""
+        result = self.run_query("SELECT c.Nome FROM Cliente c WHERE c.idCliente = 1 AND c.idCliente = 2")
+        self.assertEqual(result['rows'], [])
+        self.assertNotIn('SCAN', [op['type'] for op in result['operators']])
+
+    def test_06_limit_and_iterator_protocol(self):
+        """[EXECUÇÃO] LIMIT interrompe a execução; linhas de tamanho errado são rejeitadas"""
+        result = execute_query("SELECT * FROM Pedido", self.database, limit=1)
+        self.assertEqual(result['row_count'], 1)
+        with self.assertRaises(ExecutionError):
+            self.database.insert('status', [(3,)])
+
+    def test_07_sqlite_source(self):
+        """[EXECUÇÃO] Tabelas carregadas de um banco SQLite"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'loja.db')
+            conn = sqlite3.connect(path)
+            conn.execute('CREATE TABLE Status (idStatus INTEGER, Descricao TEXT)')
+            conn.executemany('INSERT INTO Status VALUES (?, ?)', [(1, 'Aberto'), (2, 'Entregue')])
+            conn.commit()
+            conn.close()
+            database = Database.from_sqlite(path, Catalog.from_metadata(METADATA))
+        self.assertEqual(database.rows('status'), [(1, 'Aberto'), (2, 'Entregue')])
+        self.assertEqual(database.rows('cliente'), [])
+
+    def test_08_execute_endpoint(self):
+        """[EXECUÇÃO] Endpoint /execute devolve as linhas e rejeita consultas inválidas"""
+        original = app_module.DATABASE
+        app_module.DATABASE = Database(app_module.get_catalog(), self.database.tables)
+        try:
+            client = app.test_client()
+            response = client.post('/execute', json={'query': 'SELECT s.Descricao FROM Status s WHERE s.idStatus = 2'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['rows'], [['Entregue']])
+            invalid = client.post('/execute', json={'query': 'SELECT * FROM Funcionario'})
+            self.assertEqual(invalid.status_code, 400)
+            self.assertFalse(invalid.get_json()['valid'])
+            bad_mode = client.post('/execute', json={'query': 'SELECT * FROM Status', 'mode': 'gpu'})
+            self.assertEqual(bad_mode.status_code, 400)
+        finally:
+            app_module.DATABASE = original
+
+    def test_09_execute_limit_must_be_integer(self):
+        """[EXECUÇÃO] Endpoint /execute rejeita 'limit' booleano, negativo ou não inteiro"""
+        client = app.test_client()
+        for limit in (True, False, -1, 1.5, '2'):
+            with self.subTest(limit=limit):
+                response = client.post('/execute', json={'query': 'SELECT * FROM Status', 'limit': limit})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("O campo 'limit' deve ser um inteiro não negativo", response.get_json()['errors'])
+
+
+class TestVectorizedExecutor(unittest.TestCase):
+    """Testes para o executor vetorizado (lotes de colunas NumPy)"""
+
+    QUERIES = [
+        "SELECT Nome, Email FROM Cliente WHERE Nome = 'BRUNO' OR idCliente >= 3",
+        "SELECT c.Nome, p.idPedido AS pid, s.Descricao FROM Cliente c "
+        "JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+        "JOIN Status s ON p.Status_idStatus = s.idStatus WHERE p.ValorTotalPedido > 10",
+        "SELECT * FROM Cliente c, Status s WHERE s.Descricao <> 'aberto'",
+        "SELECT c.Nome FROM Cliente c WHERE c.Email > 'b' AND c.idCliente < 10",
+        "SELECT c.Nome FROM Cliente c WHERE c.idCliente = 1 AND c.idCliente = 2",
+    ]
+
+    def setUp(self):
+        try:
+            import vectorized
+        except ImportError:
+            self.skipTest('NumPy não instalado')
+        self.vectorized = vectorized
+        self.database = sample_database()
+
+    def test_01_same_results_as_row_mode(self):
+        """[VETORIZADO] Mesmas linhas e contagens por operador que o executor tupla a tupla"""
+        for query in self.QUERIES:
+            row = execute_query(query, self.database, mode='row')
+            vec = execute_query(query, self.database, mode='vectorized')
+            self.assertEqual(vec['columns'], row['columns'], query)
+            self.assertEqual(sorted(map(str, vec['rows'])), sorted(map(str, row['rows'])), query)
+            self.assertEqual(vec['operators'], row['operators'], query)
+
+    def test_02_batches_and_zero_copy(self):
+        """[VETORIZADO] SCAN entrega lotes de BATCH_SIZE linhas; PROJECTION não copia colunas"""
+        size = self.vectorized.BATCH_SIZE * 2 + 10
+        self.database.insert('produto', [(i, f'p{i}', None, float(i), i % 7, 1) for i in range(size)])
+        graph = SQLValidator(METADATA).validate("SELECT Preco, Nome FROM Produto")['optimized_graph']
+        builder = self.vectorized.VectorizedPlanBuilder(graph, self.database)
+        root = builder.build()
+        root.open()
+        batches = []
+        while (batch := root.next()) is not None:
+            batches.append(batch)
+        root.close()
+        self.assertEqual([b.size for b in batches], [self.vectorized.BATCH_SIZE] * 2 + [10])
+        preco = self.database.columnar('produto').columns['preco'].values
+        self.assertTrue(all(self.vectorized.np.shares_memory(b.columns[0].values, preco) for b in batches))
+
+    def test_03_nulls_and_mixed_types(self):
+        """[VETORIZADO] Nulos nunca satisfazem comparações; tipos misturados são comparados valor a valor"""
+        self.database.insert('telefone', [('85 9999', 1), (None, 2), (123, 3), ('11 1234', None)])
+        result = execute_query("SELECT Numero FROM Telefone WHERE Numero > '5' OR Cliente_idCliente = 3",
+                               self.database, mode='vectorized')
+        self.assertEqual(result['rows'], [['85 9999'], [123]])
+
+    def large_scan(self):
+        """Grafo otimizado de uma varredura com filtro sobre 100 mil itens de pedido"""
+        rng = random.Random(7)
+        self.database.insert('pedido_has_produto', [
+            (i, rng.randrange(1000), rng.randrange(100), rng.randrange(1, 10), rng.random() * 100)
+            for i in range(100000)])
+        self.database.columnar('pedido_has_produto')
+        return SQLValidator(METADATA).validate(
+            "SELECT pp.idPedidoProduto FROM Pedido_has_Produto pp "
+            "WHERE pp.Quantidade >= 8 AND pp.PrecoUnitario < 20")['optimized_graph']
+
+    def test_04_large_scan_matches_row_mode(self):
+        """[VETORIZADO] Varredura com filtro sobre 100 mil linhas devolve as mesmas linhas que tupla a tupla"""
+        graph = self.large_scan()
+        row = execute_graph(graph, self.database, mode='row')
+        vec = execute_graph(graph, self.database, mode='vectorized')
+        self.assertGreater(row['row_count'], 0)
+        self.assertEqual(vec['row_count'], row['row_count'])
+        self.assertEqual(vec['rows'], row['rows'])
+
+    @unittest.skipUnless(TIMING_TESTS, 'medição de tempo (defina TIMING_TESTS=1)')
+    def test_05_faster_than_row_mode(self):
+        """[VETORIZADO] Varredura com filtro várias vezes mais rápida que tupla a tupla"""
+        graph = self.large_scan()
+        timings = {}
+        for mode in ('row', 'vectorized'):
+            timings[mode] = min(execute_graph(graph, self.database, mode=mode)['elapsed_ms'] for _ in range(3))
+        self.assertGreater(timings['row'] / timings['vectorized'], 5)
+
+
+class TestOrderBy(unittest.TestCase):
+    """Testes para a execução de ORDER BY (operador SORT)"""
+
+    def setUp(self):
+        self.modes = MODES
+
+    def test_01_order_by(self):
+        """[ORDENAÇÃO] ORDER BY com DESC, nulos por último (primeiro em DESC) e texto sem maiúsculas"""
+        database = sample_database()
+        database.insert('cliente', [{'idcliente': 4, 'nome': 'ana', 'email': 'b@x.com'}])
+        for mode in self.modes:
+            result = execute_query("SELECT Nome, idCliente FROM Cliente ORDER BY Nome DESC, idCliente",
+                                   database, mode=mode)
+            self.assertEqual(result['rows'], [['Carla', 3], ['Bruno', 2], ['Ana', 1], ['ana', 4]], mode)
+            result = execute_query("SELECT idCliente FROM Cliente ORDER BY Email", database, mode=mode)
+            self.assertEqual(result['rows'], [[1], [4], [2], [3]], mode)
+            sort = next(step for step in result['execution_plan'] if step['type'] == 'SORT')
+            self.assertEqual(sort['description'], 'SORT chaves=email')
+
+
+class TestMemoryBudget(unittest.TestCase):
+    """Testes para o orçamento de memória e os operadores que gravam em disco"""
+
+    JOIN = ("SELECT c.Nome, p.idPedido FROM Cliente c "
+            "JOIN Pedido p ON c.idCliente = p.Cliente_idCliente")
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.database = Database(Catalog.from_metadata(METADATA))
+        self.database.insert('cliente', [
+            {'idcliente': i, 'nome': rng.choice(['Ana', 'bia', 'Caio', None, 'ANA']), 'email': f'c{i}'}
+            for i in range(2000)])
+        self.database.insert('pedido', [
+            {'idpedido': i, 'cliente_idcliente': rng.choice([None] + list(range(2500))),
+             'valortotalpedido': rng.choice([None, 1.5, 3, 10])} for i in range(6000)])
+        self.validator = SQLValidator(METADATA)
+        self.modes = MODES
+
+    def run_graph(self, query, **kwargs):
+        graph = self.validator.validate(query)['optimized_graph']
+        return execute_graph(graph, self.database, **kwargs)
+
+    def spilled(self, result, kind):
+        return sum(op['spilled_bytes'] for op in result['operators'] if op['type'] == kind)
+
+    def test_01_grace_hash_join(self):
+        """[MEMÓRIA] Hash join acima do orçamento particiona em disco e devolve as mesmas linhas"""
+        expected = sorted(self.run_graph(self.JOIN)['rows'], key=str)
+        for mode in self.modes:
+            result = self.run_graph(self.JOIN, mode=mode, memory_budget=20000)
+            self.assertEqual(sorted(result['rows'], key=str), expected, mode)
+            self.assertGreater(self.spilled(result, 'JOIN'), 0, mode)
+            self.assertEqual(result['spilled_bytes'], self.spilled(result, 'JOIN'))
+        unlimited = self.run_graph(self.JOIN, memory_budget=10 ** 9)
+        self.assertEqual(unlimited['spilled_bytes'], 0)
+
+    def test_02_external_sort(self):
+        """[MEMÓRIA] Ordenação acima do orçamento usa runs em disco e mantém a ordem"""
+        query = self.JOIN + " ORDER BY c.Nome DESC, p.idPedido"
+        expected = self.run_graph(query)['rows']
+        keys = [(row[0] is None, (row[0] or '').casefold(), -row[1]) for row in expected]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+        for mode in self.modes:
+            result = self.run_graph(query, mode=mode, memory_budget=50000)
+            self.assertEqual(result['rows'], expected, mode)
+            self.assertGreater(self.spilled(result, 'SORT'), 0, mode)
+
+    def test_03_block_nested_loop(self):
+        """[MEMÓRIA] Laços aninhados acima do orçamento releem a entrada interna em blocos"""
+        query = ("SELECT c.idCliente, p.idPedido FROM Cliente c, Pedido p "
+                 "WHERE c.idCliente < 40 AND p.idPedido < 3000 AND p.Cliente_idCliente < c.idCliente")
+        expected = sorted(self.run_graph(query)['rows'])
+        self.assertTrue(expected)
+        for mode in self.modes:
+            result = self.run_graph(query, mode=mode, memory_budget=1000)
+            self.assertEqual(sorted(result['rows']), expected, mode)
+            self.assertGreater(result['spilled_bytes'], 0, mode)
+
+    def test_04_spill_reported_per_plan_step(self):
+        """[MEMÓRIA] Cada passo do plano informa linhas e bytes gravados; o cache não é alterado"""
+        query = self.JOIN + " ORDER BY p.idPedido"
+        result = execute_query(query, self.database, memory_budget=20000)
+        steps = {step['type']: step for step in result['execution_plan']}
+        self.assertGreater(steps['JOIN']['spilled_bytes'], 0)
+        self.assertGreater(steps['SORT']['spilled_bytes'], 0)
+        self.assertEqual(steps['SCAN']['spilled_bytes'], 0)
+        self.assertEqual(sum(s['spilled_bytes'] for s in result['execution_plan']), result['spilled_bytes'])
+        self.assertEqual(steps['SORT']['rows'], result['row_count'])
+        cached = app_module.validate_cached(query)['execution_plan']
+        self.assertTrue(all('spilled_bytes' not in step for step in cached))
+
+
+class TestHashJoin(unittest.TestCase):
+    """Testes para o hash join e a escolha do lado de construção"""
+
+    QUERY = ("SELECT c.Nome, p.idPedido FROM Cliente c "
+             "JOIN Pedido p ON c.idCliente = p.Cliente_idCliente")
+
+    def setUp(self):
+        self.database = sample_database()
+
+    def optimized(self, query, rows):
+        graph = OperatorGraph().build_from_query(parse(query.lower()))
+        return optimize_operator_graph(graph, sized_model(rows))
+
+    def join_node(self, graph):
+        return next(n for n in graph['nodes'] if n['type'] == 'JOIN')
+
+    def test_01_build_side_from_estimates(self):
+        """[HASH JOIN] Tabela de hash sobre a entrada com menos linhas estimadas, informada no plano"""
+        small_left = self.optimized(self.QUERY, {'cliente': 10, 'pedido': 100000})
+        small_right = self.optimized(self.QUERY, {'cliente': 100000, 'pedido': 10})
+        for graph, label in ((small_left, 'c'), (small_right, 'p')):
+            join = self.join_node(graph)
+            self.assertEqual(join['details']['algorithm'], 'hash')
+            self.assertEqual(join['details']['build_relations'], [label])
+            step = next(s for s in generate_execution_plan(graph) if s['type'] == 'JOIN')
+            self.assertIn("[hash join, construção: ", step['description'])
+            self.assertIn(f"({label})]", step['description'])
+
+    def test_02_physical_operator(self):
+        """[HASH JOIN] Igualdades viram hash join; sem igualdade entre as entradas, laços aninhados"""
+        graph = self.optimized(self.QUERY, {'cliente': 10, 'pedido': 100000})
+        root = PlanBuilder(graph, self.database).build()
+        ops, stack = [], [root]
+        while stack:
+            op = stack.pop()
+            ops.append(op)
+            stack.extend(op.children())
+        hash_join = next(op for op in ops if isinstance(op, HashJoin))
+        self.assertIs(hash_join.left if hash_join.build == 'left' else hash_join.right,
+                      next(op for op in hash_join.children() if ('c', 'idcliente') in op.columns))
+        other = self.optimized("SELECT c.Nome FROM Cliente c JOIN Pedido p ON c.idCliente < p.Cliente_idCliente",
+                               {'cliente': 10, 'pedido': 10})
+        self.assertEqual(self.join_node(other)['details']['algorithm'], 'nested_loop')
+
+    def test_03_multi_column_keys_and_residual(self):
+        """[HASH JOIN] Chave de dois atributos, termo residual e nulos, nos dois modos e lados"""
+        self.database.insert('telefone', [('85 1', 1), ('85 2', 2), (None, 3), ('85 3', None)])
+        self.database.insert('endereco', [
+            {'idendereco': 1, 'cliente_idcliente': 1, 'numero': '85 1', 'cep': 'a'},
+            {'idendereco': 2, 'cliente_idcliente': 2, 'numero': '85 1', 'cep': 'b'},
+            {'idendereco': 3, 'cliente_idcliente': 3, 'numero': None, 'cep': 'c'},
+            {'idendereco': 4, 'cliente_idcliente': None, 'numero': '85 3', 'cep': 'd'},
+            {'idendereco': 5, 'cliente_idcliente': 2, 'numero': '85 2', 'cep': 'e'},
+        ])
+        graph = SQLValidator(METADATA).validate(
+            "SELECT e.Cep FROM Telefone t JOIN Endereco e ON t.Cliente_idCliente = e.Cliente_idCliente "
+            "AND t.Numero = e.Numero AND e.idEndereco > 1")['optimized_graph']
+        for mode in MODES:
+            for build in ('left', 'right'):
+                self.join_node(graph)['details']['build'] = build
+                result = execute_graph(graph, self.database, mode=mode)
+                self.assertEqual(result['rows'], [['e']], (mode, build))
+
+    def test_04_single_pass_on_large_inputs(self):
+        """[HASH JOIN] pedido ⋈ pedido_has_produto com 100 mil linhas lê cada entrada uma única vez"""
+        rng = random.Random(3)
+        self.database.insert('pedido', [(i, 1, None, 1.0, 1) for i in range(100, 20000)])
+        self.database.insert('pedido_has_produto', [
+            (i, rng.randrange(20000), rng.randrange(50), 1, 1.0) for i in range(100000)])
+        result = execute_query("SELECT pp.Quantidade FROM Pedido p "
+                               "JOIN Pedido_has_Produto pp ON p.idPedido = pp.Pedido_idPedido "
+                               "WHERE pp.Produto_idProduto = 7", self.database, mode='row')
+        # tabela de hash sobre a entrada filtrada (menor estimativa); nenhuma entrada é relida
+        join = next(step for step in result['execution_plan'] if step['type'] == 'JOIN')
+        self.assertIn("[hash join, construção: direita (pp)]", join['description'])
+        scans = sorted(op['rows'] for op in result['operators'] if op['type'] == 'SCAN')
+        self.assertEqual(scans, [len(self.database.rows('pedido')), len(self.database.rows('pedido_has_produto'))])
+        self.assertEqual(result['row_count'],
+                         sum(1 for r in self.database.rows('pedido_has_produto') if r[2] == 7 and r[1] >= 100))
+
+
+class TestMergeJoin(unittest.TestCase):
+    """Testes para o merge join sobre entradas armazenadas em ordem"""
+
+    QUERY = ("SELECT pp.Quantidade, p.idPedido FROM Pedido p "
+             "JOIN Pedido_has_Produto pp ON p.idPedido = pp.Pedido_idPedido")
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.database = Database(Catalog.from_metadata(METADATA))
+        self.database.insert('pedido', [(i, 1, None, 1.0, 1) for i in range(3000)])
+        items = [(i, rng.choice([None] + list(range(3500))), rng.randrange(50), rng.randrange(5), 1.0)
+                 for i in range(12000)]
+        items.sort(key=lambda row: (row[1] is None, row[1] or 0))
+        self.database.insert('pedido_has_produto', items)
+        self.modes = MODES
+
+    def analyzed(self, database) -> Statistics:
+        """Estatísticas (com a ordem de armazenamento) das tabelas de `database`"""
+        return Statistics({table: analyze_table({
+            column: [row[i] for row in database.rows(table)] for i, column in enumerate(database.columns(table))
+        }) for table in ('pedido', 'pedido_has_produto')})
+
+    def optimized(self, query, database=None):
+        validator = SQLValidator(METADATA, self.analyzed(database or self.database))
+        return validator.validate(query)['optimized_graph']
+
+    def expected(self, query, database=None):
+        graph = SQLValidator(METADATA).validate(query)['optimized_graph']
+        return execute_graph(graph, database or self.database)['rows']
+
+    def test_01_sorted_inputs_use_merge_join(self):
+        """[MERGE JOIN] Entradas armazenadas em ordem da chave: merge join sem ordenação, no plano"""
+        graph = self.optimized(self.QUERY)
+        join = next(n for n in graph['nodes'] if n['type'] == 'JOIN')
+        self.assertEqual(join['details']['algorithm'], 'merge')
+        self.assertEqual(join['details']['merge_keys'], ['p.idpedido', 'pp.pedido_idpedido'])
+        self.assertFalse(any(n['type'] == 'SORT' for n in graph['nodes']))
+        step = next(s for s in generate_execution_plan(graph) if s['type'] == 'JOIN')
+        self.assertTrue(step['description'].endswith('[merge join: p.idpedido = pp.pedido_idpedido]'))
+        root = PlanBuilder(graph, self.database).build()
+        self.assertIsInstance(root.children()[0], MergeJoin)
+        expected = sorted(self.expected(self.QUERY))
+        for mode in self.modes:
+            self.assertEqual(sorted(execute_graph(graph, self.database, mode=mode)['rows']), expected, mode)
+
+    def test_02_order_by_reuses_merge_order(self):
+        """[MERGE JOIN] ORDER BY na chave: só a entrada fora de ordem é ordenada e o τ final é dispensado"""
+        rows = self.database.rows('pedido')[:]
+        random.Random(1).shuffle(rows)
+        database = Database(Catalog.from_metadata(METADATA), {
+            'pedido': rows, 'pedido_has_produto': self.database.rows('pedido_has_produto')})
+        query = self.QUERY + " ORDER BY pp.Pedido_idPedido"
+        graph = self.optimized(query, database)
+        steps = [s['description'] for s in generate_execution_plan(graph)]
+        self.assertIn('SORT chaves=p.idpedido', steps)
+        self.assertIn('SORT chaves=pp.pedido_idpedido [entrada já ordenada]', steps)
+        self.assertTrue(any(s.endswith('[merge join: p.idpedido = pp.pedido_idpedido]') for s in steps))
+        expected = self.expected(query, database)
+        for mode in self.modes:
+            rows = execute_graph(graph, database, mode=mode)['rows']
+            self.assertEqual([row[1] for row in rows], [row[1] for row in expected], mode)
+            self.assertEqual(sorted(rows), sorted(expected), mode)
+
+        # com uma segunda chave o τ final é necessário de qualquer forma e o hash join é mais barato
+        steps = [s['description'] for s in generate_execution_plan(
+            self.optimized(query + ", p.idPedido DESC", database))]
+        self.assertIn('SORT chaves=pp.pedido_idpedido, p.idpedido desc', steps)
+        self.assertFalse(any('merge join' in s for s in steps))
+
+    def test_03_extra_keys_nulls_and_case(self):
+        """[MERGE JOIN] Igualdades extras viram filtro; nulos não casam; texto sem diferenciar maiúsculas"""
+        database = sample_database()
+        database.insert('telefone', [('85 1', 1), ('85 2', 2), (None, 3), ('85 3', None)])
+        database.insert('endereco', [
+            {'idendereco': 1, 'cliente_idcliente': 1, 'numero': '85 1', 'cep': 'a'},
+            {'idendereco': 2, 'cliente_idcliente': 2, 'numero': '85 1', 'cep': 'b'},
+            {'idendereco': 5, 'cliente_idcliente': 2, 'numero': '85 2', 'cep': 'e'},
+            {'idendereco': 3, 'cliente_idcliente': 3, 'numero': None, 'cep': 'c'},
+            {'idendereco': 4, 'cliente_idcliente': None, 'numero': '85 3', 'cep': 'd'},
+        ])
+        graph = SQLValidator(METADATA).validate(
+            "SELECT e.Cep FROM Telefone t JOIN Endereco e ON t.Cliente_idCliente = e.Cliente_idCliente "
+            "AND t.Numero = e.Numero")['optimized_graph']
+        join = next(n for n in graph['nodes'] if n['type'] == 'JOIN')
+        plan = PlanGraph.from_dict(graph)
+        labels = [plan.labels_below(nid) for nid in plan.inputs(join['id'])]
+        join['details'] = {'condition': join['details']['condition'], 'algorithm': 'merge',
+                           'merge_keys': [f'{label}.cliente_idcliente' for (label,) in labels]}
+        for mode in self.modes:
+            self.assertEqual(sorted(execute_graph(graph, database, mode=mode)['rows']), [['a'], ['e']], mode)
+        strings = [(1, 'ana'), (2, 'Ana'), (3, 'bia')]
+        self.assertEqual([(l[0], r[0]) for l, r in merge_pairs(strings, [('ANA',), ('BIA',)], 1, 0)],
+                         [(1, 'ANA'), (2, 'ANA'), (3, 'BIA')])
+
+    def test_04_unsorted_input_is_an_error(self):
+        """[MERGE JOIN] Estatísticas de ordem desatualizadas: a entrada fora de ordem é detectada"""
+        graph = self.optimized(self.QUERY)
+        rows = self.database.rows('pedido')[:]
+        rows[10], rows[2000] = rows[2000], rows[10]
+        stale = Database(Catalog.from_metadata(METADATA), {
+            'pedido': rows, 'pedido_has_produto': self.database.rows('pedido_has_produto')})
+        for mode in self.modes:
+            with self.assertRaisesRegex(ExecutionError, 'fora de ordem'):
+                execute_graph(graph, stale, mode=mode)
+
+
+
+class TestColumnStore(unittest.TestCase):
+    """Testes para o formato colunar em disco (mmap) e a carga de CSV"""
+
+    def setUp(self):
+        try:
+            import column_store
+        except ImportError:
+            self.skipTest('NumPy não instalado')
+        self.column_store = column_store
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self.tmpdir.name
+        self.catalog = Catalog.from_metadata(METADATA)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_01_round_trip_as_mmap_views(self):
+        """[COLUNAR] Números, textos, nulos e tipos misturados relidos do arquivo; números sem cópia"""
+        import mmap
+        path = os.path.join(self.directory, 't.col')
+        columns = {'n': [3, None, -7, 2 ** 40], 'r': [1.5, 2.0, None, -0.25],
+                   't': ['Ana', None, 'ÇÃO', ''], 'm': [1, 'x', None, 2.5]}
+        self.column_store.write_table(path, ['n', 'r', 't', 'm'], columns, 't')
+        mapped = self.column_store.open_table(path)
+        self.assertEqual((mapped.table, mapped.names, mapped.columns.size), ('t', ('n', 'r', 't', 'm'), 4))
+        for name, values in columns.items():
+            self.assertEqual(mapped.columns.columns[name].to_list(), values, name)
+        number = mapped.columns.columns['n']
+        self.assertIsInstance(number.values.base.obj, mmap.mmap)
+        self.assertFalse(number.values.flags.writeable)
+        text = mapped.columns.columns['t'].take(slice(1, 3))
+        self.assertIsInstance(text, self.column_store.MappedText)
+        self.assertEqual(text.folded.tolist(), ['', 'ção'])
+        self.assertEqual(text.to_list(), [None, 'ÇÃO'])
+
+    def test_02_csv_loader_and_queries(self):
+        """[COLUNAR] CSV carregado pelo comando load e consultado nos dois modos como os dados em memória"""
+        clientes = self.write('Cliente.csv', 'idCliente,Nome,Email\n1,Ana,ana@x.com\n2,Bruno,bruno@x.com\n3,Carla,\n')
+        pedidos = self.write('pedido.csv', 'idpedido;status_idstatus;valortotalpedido;cliente_idcliente\n'
+                                           '10;1;50;1\n11;2;5.0;1\n12;1;500;2\n')
+        data = os.path.join(self.directory, 'data')
+        self.assertEqual(app_module.main(['load', clientes, '-d', data]), 0)
+        self.assertEqual(app_module.main(['load', pedidos, '-d', data, '--delimiter', ';']), 0)
+        database = app_module.load_database(data, self.catalog)
+        self.assertEqual(database.rows('pedido')[1], (11, 2, None, 5.0, 1))
+        query = ("SELECT c.Nome, p.idPedido FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+                 "WHERE p.ValorTotalPedido > 10 ORDER BY p.idPedido")
+        expected = execute_query(query, sample_database())['rows']
+        for mode in ('row', 'vectorized'):
+            self.assertEqual(execute_query(query, app_module.load_database(data, self.catalog), mode=mode)['rows'],
+                             expected, mode)
+
+    def test_03_invalid_inputs(self):
+        """[COLUNAR] Coluna desconhecida no CSV, arquivo que não é colunar e atributo faltando"""
+        bad = self.write('status.csv', 'idstatus,cor\n1,azul\n')
+        with self.assertRaisesRegex(ValueError, 'cor'):
+            self.column_store.load_csv(bad, os.path.join(self.directory, 'status.col'), ('idstatus', 'descricao'))
+        self.write('status.col', 'idstatus,descricao\n')
+        with self.assertRaisesRegex(ExecutionError, "'status' inválido"):
+            Database.from_columnar(self.directory, self.catalog)
+        self.column_store.write_table(os.path.join(self.directory, 'status.col'), ['idstatus'], {'idstatus': [1]})
+        with self.assertRaisesRegex(ExecutionError, 'descricao'):
+            Database.from_columnar(self.directory, self.catalog)
+
+
+
+class TestDataGenerator(unittest.TestCase):
+    """Testes para o gerador de dados sintéticos"""
+
+    def setUp(self):
+        try:
+            import datagen
+        except ImportError:
+            self.skipTest('NumPy não instalado')
+        self.datagen = datagen
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.catalog = Catalog.from_metadata(METADATA)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def generate(self, name, **kwargs):
+        output = os.path.join(self.tmpdir.name, name)
+        kwargs.setdefault('chunk_rows', 64)
+        rows = self.datagen.generate(output, scale=0.02, metadata=METADATA, **kwargs)
+        return output, rows
+
+    def test_01_deterministic_with_any_number_of_workers(self):
+        """[DADOS] Mesma semente gera os mesmos arquivos em um ou vários processos; outra semente, outros dados"""
+        serial, rows = self.generate('serial')
+        parallel, _ = self.generate('parallel', workers=2)
+        other, _ = self.generate('other', seed=7)
+        self.assertEqual(set(rows), set(METADATA))
+        self.assertEqual((rows['cliente'], rows['pedido']), (200, 2000))
+        for table in METADATA:
+            with open(os.path.join(serial, f'{table}.col'), 'rb') as a, \
+                    open(os.path.join(parallel, f'{table}.col'), 'rb') as b:
+                self.assertEqual(a.read(), b.read(), table)
+        with open(os.path.join(serial, 'pedido.col'), 'rb') as a, open(os.path.join(other, 'pedido.col'), 'rb') as b:
+            self.assertNotEqual(a.read(), b.read())
+
+    def test_02_foreign_keys_and_totals(self):
+        """[DADOS] Chaves estrangeiras válidas, valor total igual à soma dos itens e clientes assimétricos"""
+        output, rows = self.generate('data')
+        database = Database.from_columnar(output, self.catalog)
+        for table, count in rows.items():
+            self.assertEqual(len(database.rows(table)), count, table)
+        keys = {table: {row[0] for row in database.rows(table)}
+                for table in ('cliente', 'produto', 'pedido', 'status', 'categoria')}
+        for table, column, target in (('pedido', 4, 'cliente'), ('pedido', 1, 'status'), ('endereco', 10, 'cliente'),
+                                      ('telefone', 1, 'cliente'), ('pedido_has_produto', 1, 'pedido'),
+                                      ('pedido_has_produto', 2, 'produto'), ('produto', 5, 'categoria')):
+            self.assertTrue({row[column] for row in database.rows(table)} <= keys[target], (table, target))
+        totals = {}
+        for _, order, _, quantity, price in database.rows('pedido_has_produto'):
+            totals[order] = totals.get(order, 0) + quantity * price
+        for order, _, _, total, _ in database.rows('pedido'):
+            self.assertAlmostEqual(total, totals[order], places=6)
+        orders = [row[4] for row in database.rows('pedido')]
+        self.assertGreater(max(orders.count(c) for c in set(orders)), 5 * len(orders) / len(keys['cliente']))
+        result = execute_query("SELECT c.Nome, p.idPedido FROM Cliente c JOIN Pedido p "
+                               "ON c.idCliente = p.Cliente_idCliente WHERE p.Status_idStatus = 5", database)
+        self.assertEqual(result['row_count'], sum(1 for row in database.rows('pedido') if row[1] == 5))
+
+    def test_03_sqlite_output(self):
+        """[DADOS] Saída em SQLite com as mesmas linhas da saída colunar e comando generate"""
+        columnar, _ = self.generate('data', chunk_rows=self.datagen.CHUNK_ROWS)
+        path = os.path.join(self.tmpdir.name, 'loja.db')
+        self.assertEqual(app_module.main(['generate', '-s', '0.02', '-f', 'sqlite', '-o', path]), 0)
+        from_sqlite = Database.from_sqlite(path, self.catalog)
+        from_files = Database.from_columnar(columnar, self.catalog)
+        for table in METADATA:
+            self.assertEqual(from_sqlite.rows(table), from_files.rows(table), table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,398 @@
+import unittest
+from unittest import mock
+from app import SQLValidator, METADATA, OperatorGraph
+from optimizer import (
+    PlanGraph, CostModel, optimize_operator_graph, simplify_conjuncts, DP_MAX_RELATIONS, _simplify_predicates,
+)
+from sql_parser import parse, parse_predicate, format_predicate, conjuncts, conjoin
+from table_stats import Statistics, TableStats
+from catalog import Catalog
+
+
+def chain_join_query(n: int) -> str:
+    """Consulta com n tabelas encadeadas por JOIN (t0 ⋈ t1 ⋈ ... ⋈ tn-1)"""
+    joins = ' '.join(f"join t{i} on t{i - 1}.a = t{i}.a" for i in range(1, n))
+    return f"select t0.a, t{n - 1}.b from t0 {joins} where t{n // 2}.a = 1"
+
+
+class TestPlanGraph(unittest.TestCase):
+    """Testes para o grafo de operadores com adjacência indexada"""
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+        result = self.validator.validate(
+            "SELECT c.Nome FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente")
+        self.graph = result['operator_graph']
+
+    def test_01_roundtrip(self):
+        """[GRAFO] Carregar e exportar preserva nós, arestas e raiz"""
+        self.assertEqual(PlanGraph.from_dict(self.graph).to_dict(), self.graph)
+
+    def test_02_type_and_scan_index(self):
+        """[GRAFO] Nós por tipo e SCAN por label ou tabela"""
+        plan = PlanGraph.from_dict(self.graph)
+        self.assertEqual([n['label'] for n in plan.of_type('SCAN')], ['c', 'p'])
+        self.assertEqual(plan.scan('p')['details']['table'], 'pedido')
+        self.assertIs(plan.scan('pedido'), plan.scan('p'))
+        self.assertIsNone(plan.scan('produto'))
+
+    def test_03_adjacency_and_ids(self):
+        """[GRAFO] Arestas indexadas nos dois sentidos e ids monotônicos"""
+        plan = PlanGraph.from_dict(self.graph)
+        join = plan.of_type('JOIN')[0]
+        self.assertEqual(sorted(plan.inputs(join['id'])), [n['id'] for n in plan.of_type('SCAN')])
+        first = plan.add_node('PROJECTION', 'π')
+        plan.remove_node(first['id'])
+        second = plan.add_node('PROJECTION', 'π')
+        self.assertGreater(second['id'], first['id'])
+        scan = plan.scan('c')
+        plan.remove_edge(scan['id'], join['id'])
+        self.assertNotIn(join['id'], plan.outputs(scan['id']))
+        self.assertFalse(plan.has_edge(scan['id'], join['id']))
+
+    def test_04_large_join_graph(self):
+        """[GRAFO] Consultas de adjacência na otimização crescem linearmente com o número de junções"""
+        def optimize(joins):
+            lookups = [0]
+            inputs, outputs = PlanGraph.inputs, PlanGraph.outputs
+
+            def counted(method):
+                def lookup(plan, nid):
+                    lookups[0] += 1
+                    return method(plan, nid)
+                return lookup
+
+            graph = OperatorGraph().build_from_query(parse(chain_join_query(joins)))
+            with mock.patch.object(PlanGraph, 'inputs', counted(inputs)), \
+                    mock.patch.object(PlanGraph, 'outputs', counted(outputs)):
+                optimized = optimize_operator_graph(graph)
+            self.assertGreater(len(optimized['nodes']), len(graph['nodes']))
+            return lookups[0]
+
+        # dobrar o número de junções no máximo dobra as consultas (quadrático: 4x)
+        self.assertLess(optimize(200), 2.5 * optimize(100))
+
+
+
+def sized_model(rows: dict) -> CostModel:
+    """Modelo de custo com o número de linhas de cada tabela fixado pelas estatísticas"""
+    statistics = Statistics({table: TableStats(rows=n) for table, n in rows.items()})
+    return CostModel(Catalog.from_metadata(METADATA), statistics)
+
+
+def join_steps(graph: dict) -> list:
+    """Pares de labels das relações combinadas por cada junção, de baixo para cima"""
+    plan = PlanGraph.from_dict(graph)
+    steps = []
+    for node in plan.of_type('JOIN', 'CROSS_PRODUCT'):
+        left, right = plan.inputs(node['id'])
+        steps.append((node['type'], plan.labels_below(left), plan.labels_below(right)))
+    return steps
+
+
+class TestJoinOrdering(unittest.TestCase):
+    """Testes para a ordenação de junções por custo"""
+
+    QUERY = ("SELECT c.Nome FROM Pedido_has_Produto pp "
+             "JOIN Produto pr ON pp.Produto_idProduto = pr.idProduto "
+             "JOIN Pedido p ON pp.Pedido_idPedido = p.idPedido "
+             "JOIN Cliente c ON p.Cliente_idCliente = c.idCliente "
+             "WHERE c.Nome = 'Ana'")
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def optimize(self, query, cost_model=None):
+        graph = self.validator.validate(query)['operator_graph']
+        return optimize_operator_graph(graph, cost_model or self.validator.cost_model)
+
+    def test_01_selective_relation_first(self):
+        """[JUNÇÕES] Relação filtrada e pequena (pelas estatísticas) entra na primeira junção"""
+        rows = {'pedido_has_produto': 1_000_000, 'pedido': 100_000, 'cliente': 10_000, 'produto': 1_000}
+        steps = join_steps(self.optimize(self.QUERY, sized_model(rows)))
+        self.assertEqual(len(steps), 3)
+        self.assertEqual(steps[0][1] | steps[0][2], {'c', 'p'})
+        self.assertEqual(steps[-1][1] | steps[-1][2], {'c', 'p', 'pp', 'pr'})
+
+    def test_02_no_cross_product_for_connected_graph(self):
+        """[JUNÇÕES] Reordenação não introduz produto cartesiano"""
+        rows = {'produto': 10, 'pedido_has_produto': 1_000_000}
+        optimized = self.optimize(self.QUERY, sized_model(rows))
+        self.assertTrue(all(t == 'JOIN' for t, _, _ in join_steps(optimized)))
+        conditions = sorted(n['details']['condition'] for n in optimized['nodes'] if n['type'] == 'JOIN')
+        self.assertEqual(conditions, sorted([
+            'p.cliente_idcliente=c.idcliente', 'pp.pedido_idpedido=p.idpedido',
+            'pp.produto_idproduto=pr.idproduto']))
+
+    def test_03_good_order_kept(self):
+        """[JUNÇÕES] Ordem textual já ótima não é alterada"""
+        query = ("SELECT c.Nome FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+                 "JOIN Pedido_has_Produto pp ON p.idPedido = pp.Pedido_idPedido WHERE c.Nome = 'Ana'")
+        graph = self.validator.validate(query)['operator_graph']
+        optimized = optimize_operator_graph(graph, self.validator.cost_model)
+        original_joins = [n['id'] for n in graph['nodes'] if n['type'] == 'JOIN']
+        self.assertEqual([n['id'] for n in optimized['nodes'] if n['type'] == 'JOIN'], original_joins)
+
+    def test_04_greedy_for_many_relations(self):
+        """[JUNÇÕES] Muitas relações usam a heurística gulosa e mantêm todas as junções"""
+        n = DP_MAX_RELATIONS + 10
+        graph = OperatorGraph().build_from_query(parse(chain_join_query(n)))
+        steps = join_steps(optimize_operator_graph(graph))
+        self.assertEqual(len(steps), n - 1)
+        self.assertTrue(all(t == 'JOIN' for t, _, _ in steps))
+        self.assertEqual(steps[-1][1] | steps[-1][2], {f"t{i}" for i in range(n)})
+
+
+
+class TestSelectionPushdown(unittest.TestCase):
+    """Testes para a decomposição do WHERE e o push-down de cada termo"""
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def optimized_plan(self, query):
+        result = self.validator.validate(query)
+        self.assertTrue(result['valid'], result['errors'])
+        return PlanGraph.from_dict(result['optimized_graph'])
+
+    def selections(self, plan):
+        return {n['details']['condition']: n['id'] for n in plan.of_type('SELECTION')}
+
+    def test_01_conjuncts_reach_scans(self):
+        """[SELEÇÃO] Cada termo de uma única tabela desce até o seu SCAN"""
+        plan = self.optimized_plan(
+            "SELECT c.Nome FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+            "WHERE c.Nome = 'Ana' AND p.ValorTotalPedido > 100")
+        sels = self.selections(plan)
+        self.assertEqual(set(sels), {"c.nome='ana'", 'p.valortotalpedido>100'})
+        self.assertEqual(plan.labels_below(sels["c.nome='ana'"]), {'c'})
+        self.assertEqual(plan.labels_below(sels['p.valortotalpedido>100']), {'p'})
+        for sel_id in sels.values():
+            consumer = plan.outputs(sel_id)[0]
+            while plan.nodes[consumer]['type'] == 'PROJECTION':
+                consumer = plan.outputs(consumer)[0]
+            self.assertEqual(plan.nodes[consumer]['type'], 'JOIN')
+
+    def test_02_two_table_conjunct_joins(self):
+        """[SELEÇÃO] Termo com duas tabelas passa para a condição da junção"""
+        plan = self.optimized_plan(
+            "SELECT c.Nome FROM Cliente c JOIN Endereco e ON c.idCliente = e.Cliente_idCliente "
+            "WHERE e.UF = 'CE' AND c.Nome = e.Cidade")
+        self.assertEqual(list(self.selections(plan)), ["e.uf='ce'"])
+        join = plan.of_type('JOIN')[0]
+        self.assertEqual(join['details']['condition'], 'c.idcliente=e.cliente_idcliente ∧ c.nome=e.cidade')
+
+    def test_03_cross_product_conjuncts(self):
+        """[SELEÇÃO] Termo de duas tabelas fica logo acima do produto cartesiano"""
+        plan = self.optimized_plan(
+            "SELECT * FROM Cliente, Pedido "
+            "WHERE Cliente.DataRegistro < Pedido.DataPedido AND Pedido.ValorTotalPedido > 10")
+        sels = self.selections(plan)
+        cross = plan.of_type('CROSS_PRODUCT')[0]
+        self.assertEqual(plan.inputs(sels['cliente.dataregistro<pedido.datapedido']), [cross['id']])
+        self.assertEqual(plan.nodes[plan.inputs(sels['pedido.valortotalpedido>10'])[0]]['type'], 'SCAN')
+
+    def test_04_disjunction_kept_whole(self):
+        """[SELEÇÃO] Disjunções não são decompostas e atributos não qualificados são resolvidos"""
+        plan = self.optimized_plan("SELECT numero FROM Endereco WHERE numero >= 200 AND (uf = 'ce' OR uf = 'sp')")
+        sels = self.selections(plan)
+        self.assertEqual(set(sels), {'numero≥200', "(uf='ce' ∨ uf='sp')"})
+        scan = plan.of_type('SCAN')[0]
+        self.assertEqual(plan.outputs(scan['id']), [sels['numero≥200']])
+
+
+
+class TestCrossProductRewrite(unittest.TestCase):
+    """Testes para a reescrita de produto cartesiano + igualdade em JOIN"""
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def test_01_cross_product_becomes_join(self):
+        """[JUNÇÕES] FROM com vírgula e igualdade no WHERE vira JOIN"""
+        result = self.validator.validate(
+            "SELECT c.Nome FROM Cliente c, Pedido p WHERE c.idCliente = p.Cliente_idCliente AND p.idPedido > 5")
+        types = [n['type'] for n in result['optimized_graph']['nodes']]
+        self.assertNotIn('CROSS_PRODUCT', types)
+        join = next(n for n in result['optimized_graph']['nodes'] if n['type'] == 'JOIN')
+        self.assertEqual(join['details']['condition'], 'c.idcliente=p.cliente_idcliente')
+        self.assertEqual(result['warnings'], [])
+
+    def test_02_three_tables_without_cross_product(self):
+        """[JUNÇÕES] Três tabelas ligadas pelo WHERE formam apenas junções"""
+        result = self.validator.validate(
+            "SELECT c.Nome FROM Cliente c, Pedido_has_Produto pp, Pedido p "
+            "WHERE c.idCliente = p.Cliente_idCliente AND p.idPedido = pp.Pedido_idPedido")
+        types = [n['type'] for n in result['optimized_graph']['nodes']]
+        self.assertEqual(types.count('JOIN'), 2)
+        self.assertNotIn('CROSS_PRODUCT', types)
+        self.assertEqual(result['warnings'], [])
+
+    def test_03_remaining_product_warns(self):
+        """[JUNÇÕES] Produto cartesiano sem predicado de junção gera aviso"""
+        result = self.validator.validate("SELECT * FROM Cliente c, Status s WHERE c.Nome = 'Ana'")
+        self.assertTrue(result['valid'])
+        self.assertEqual(result['warnings'], [
+            'Produto cartesiano entre c e s: nenhum predicado de junção liga as duas entradas'])
+
+
+
+class TestTransitiveInference(unittest.TestCase):
+    """Testes para a inferência transitiva de filtros pelas igualdades das junções"""
+
+    JOIN = ("SELECT c.Nome FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+            "JOIN Endereco e ON e.Cliente_idCliente = p.Cliente_idCliente ")
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def filters(self, query):
+        """Condição -> (labels abaixo da seleção, se foi inferida)"""
+        plan = PlanGraph.from_dict(self.validator.validate(query)['optimized_graph'])
+        return {n['details']['condition']: (plan.labels_below(n['id']), n['details'].get('inferred', False))
+                for n in plan.of_type('SELECTION')}
+
+    def test_01_constant_propagated_through_classes(self):
+        """[INFERÊNCIA] Filtro constante chega a todas as tabelas da classe de equivalência"""
+        filters = self.filters(self.JOIN + "WHERE c.idCliente = 42")
+        self.assertEqual(filters, {
+            'c.idcliente=42': ({'c'}, False),
+            'p.cliente_idcliente=42': ({'p'}, True),
+            'e.cliente_idcliente=42': ({'e'}, True),
+        })
+
+    def test_02_range_with_literal_first(self):
+        """[INFERÊNCIA] Comparações de intervalo também são propagadas"""
+        filters = self.filters(self.JOIN + "WHERE 100 < c.idCliente")
+        self.assertEqual(filters['p.cliente_idcliente>100'], ({'p'}, True))
+
+    def test_03_existing_filter_not_duplicated(self):
+        """[INFERÊNCIA] Filtro já presente na consulta não é repetido"""
+        filters = self.filters(self.JOIN + "WHERE c.idCliente = 42 AND p.Cliente_idCliente = 42")
+        self.assertEqual(len(filters), 3)
+        self.assertFalse(filters['p.cliente_idcliente=42'][1])
+
+
+
+class TestPredicateSimplification(unittest.TestCase):
+    """Testes para a simplificação de predicados e a detecção de contradições"""
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def simplify(self, text):
+        result = simplify_conjuncts(conjuncts(parse_predicate(text)))
+        return None if result is None else format_predicate(conjoin(result)) if result else ''
+
+    def test_01_redundant_terms(self):
+        """[SIMPLIFICAÇÃO] Constantes, repetições e limites redundantes"""
+        self.assertEqual(self.simplify('a.x > 5 and a.x > 10 and a.y = 1 and a.y = 1'), 'a.x>10 ∧ a.y=1')
+        self.assertEqual(self.simplify('1 = 1 and a.x >= 3 and a.x <= 3'), 'a.x=3')
+        self.assertEqual(self.simplify('a.x < 10 and a.x <> 20 and a.x <> 5'), 'a.x<10 ∧ a.x<>5')
+        self.assertEqual(self.simplify("2 > 1"), '')
+        self.assertEqual(self.simplify('a.x = 1 or a.x = 2'), 'a.x=1 ∨ a.x=2')
+
+    def test_02_contradictions(self):
+        """[SIMPLIFICAÇÃO] Conjunções impossíveis são detectadas"""
+        for text in ('a.x = 1 and a.x = 2', 'a.preco > 10 and a.preco < 5', 'a.x = 5 and a.x <> 5',
+                     'a.x > 3 and a.x <= 3', "a.s = 'ce' and a.s = 'sp'", '1 = 2'):
+            self.assertIsNone(self.simplify(text), text)
+
+    def test_03_redundant_filters_in_plan(self):
+        """[SIMPLIFICAÇÃO] Filtros redundantes viram uma única seleção no plano"""
+        result = self.validator.validate(
+            "SELECT p.Nome FROM Produto p WHERE p.Preco > 5 AND p.Preco > 10 AND p.Preco > 5")
+        conditions = [s['description'] for s in result['execution_plan'] if s['type'] == 'SELECTION']
+        self.assertEqual(conditions, ['SELECTION cond=p.preco>10'])
+
+    def test_04_contradiction_empty_plan(self):
+        """[SIMPLIFICAÇÃO] Consulta contraditória vira EMPTY sem nenhum SCAN"""
+        result = self.validator.validate(
+            "SELECT c.Nome FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+            "WHERE c.idCliente = 42 AND p.Cliente_idCliente = 7")
+        self.assertTrue(result['valid'])
+        self.assertEqual([s['type'] for s in result['execution_plan']], ['EMPTY', 'PROJECTION'])
+        self.assertTrue(any('nunca retorna linhas' in w for w in result['warnings']))
+
+    def selection_stack(self, conditions):
+        """PlanGraph SCAN p -> seleções com as condições dadas (de baixo para cima) -> projeção"""
+        plan = PlanGraph()
+        top = plan.add_node('SCAN', 'p', {'table': 'produto', 'alias': 'p'})['id']
+        for condition in conditions:
+            node = plan.add_node('SELECTION', 'σ', {'condition': condition})['id']
+            plan.add_edge(top, node)
+            top = node
+        plan.root = plan.add_node('PROJECTION', 'π', {'attributes': 'p.nome'})['id']
+        plan.add_edge(top, plan.root)
+        return plan
+
+    def chain_conditions(self, plan):
+        conditions, current = [], plan.scan('p')['id']
+        while plan.outputs(current):
+            current = plan.outputs(current)[0]
+            if plan.nodes[current]['type'] == 'SELECTION':
+                conditions.append(plan.nodes[current]['details']['condition'])
+        return conditions
+
+    def test_05_stacked_selections_keep_every_term(self):
+        """[SIMPLIFICAÇÃO] Seleções empilhadas com mais termos que nós não perdem filtros"""
+        plan = self.selection_stack(['p.preco>5 ∧ p.quantestoque=2', 'p.categoria_idcategoria=3'])
+        self.assertIsNone(_simplify_predicates(plan))
+        self.assertEqual(self.chain_conditions(plan),
+                         ['p.preco>5', 'p.quantestoque=2', 'p.categoria_idcategoria=3'])
+        self.assertEqual(plan.nodes[plan.root]['type'], 'PROJECTION')
+
+    def test_06_unparsable_condition_is_kept(self):
+        """[SIMPLIFICAÇÃO] Condição ilegível em uma pilha de seleções é mantida sem interromper a otimização"""
+        plan = self.selection_stack(['p.preco>5', 'p.preco=>1 x'])
+        self.assertIsNone(_simplify_predicates(plan))
+        self.assertEqual(self.chain_conditions(plan), ['p.preco>5', 'p.preco=>1 x'])
+
+
+class TestRequiredColumns(unittest.TestCase):
+    """Testes para a análise de atributos necessários e as projeções inseridas"""
+
+    JOIN = "FROM Cliente c JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def projections(self, query):
+        """Atributos das projeções inseridas, na ordem do plano de execução (sem a raiz)"""
+        result = self.validator.validate(query)
+        self.assertTrue(result['valid'], result['errors'])
+        return [s['description'].split('attrs=', 1)[1]
+                for s in result['execution_plan'] if s['type'] == 'PROJECTION'][:-1]
+
+    def test_01_filter_columns_kept(self):
+        """[PROJEÇÃO] Atributos do WHERE e do JOIN chegam até as seleções"""
+        attrs = self.projections("SELECT c.Nome " + self.JOIN + "WHERE p.ValorTotalPedido > 10")
+        self.assertEqual(attrs, ['c.idcliente,c.nome', 'p.valortotalpedido,p.cliente_idcliente',
+                                 'p.cliente_idcliente'])
+
+    def test_02_narrowed_after_filter_and_join(self):
+        """[PROJEÇÃO] Atributos usados só no filtro ou na junção são descartados logo depois"""
+        attrs = self.projections(
+            "SELECT pr.Nome " + self.JOIN +
+            "JOIN Pedido_has_Produto pp ON p.idPedido = pp.Pedido_idPedido "
+            "JOIN Produto pr ON pp.Produto_idProduto = pr.idProduto WHERE c.Email = 'x'")
+        self.assertIn('c.idcliente,c.email', attrs)
+        self.assertIn('c.idcliente', attrs)
+        self.assertIn('p.idpedido', attrs)
+        self.assertIn('pp.produto_idproduto', attrs)
+
+    def test_03_star_expansion(self):
+        """[PROJEÇÃO] * e alias.* são expandidos pelo catálogo"""
+        self.assertEqual(self.projections("SELECT * " + self.JOIN), [])
+        attrs = self.projections("SELECT c.*, p.DataPedido " + self.JOIN)
+        self.assertEqual(attrs, ['p.datapedido,p.cliente_idcliente'])
+
+    def test_04_unqualified_columns(self):
+        """[PROJEÇÃO] Atributos não qualificados são resolvidos; sem junção não há projeção extra"""
+        attrs = self.projections("SELECT Email, DataPedido " + self.JOIN)
+        self.assertEqual(attrs, ['c.idcliente,c.email', 'p.datapedido,p.cliente_idcliente'])
+        self.assertEqual(self.projections("SELECT Nome FROM Cliente WHERE Email = 'x'"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
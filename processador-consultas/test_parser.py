@@ -0,0 +1,202 @@
+import unittest
+from unittest import mock
+from app import SQLValidator, METADATA, app
+from sql_parser import (
+    parse, parse_predicate, format_predicate, ParseError, MAX_NESTING, Comparison, BoolOp, ColumnRef, Literal,
+    tokenize, KEYWORD, IDENT, QUALIFIED, NUMBER, STRING, OPERATOR, LPAREN, RPAREN, COMMA, STAR, SEMICOLON,
+)
+
+
+class TestLexer(unittest.TestCase):
+    """Testes para o lexer (tokenização em passada única)"""
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def test_01_token_kinds(self):
+        """[LEXER] Classifica palavras-chave, nomes, literais e pontuação"""
+        tokens = tokenize("select c.nome, * from cliente c where (c.idcliente >= 10) and c.nome = 'ana';")
+        kinds = [t.kind for t in tokens]
+        self.assertEqual(kinds, [
+            KEYWORD, QUALIFIED, COMMA, STAR, KEYWORD, IDENT, IDENT, KEYWORD,
+            LPAREN, QUALIFIED, OPERATOR, NUMBER, RPAREN, KEYWORD, QUALIFIED, OPERATOR, STRING, SEMICOLON,
+        ])
+
+    def test_02_operators_maximal_munch(self):
+        """[LEXER] Operadores compostos formam um único token"""
+        values = [t.value for t in tokenize("a <> 1 and b <= 2 and c != 3") if t.kind == OPERATOR]
+        self.assertEqual(values, ['<>', '<=', '!='])
+
+    def test_03_keywords_inside_strings(self):
+        """[LEXER] Palavras-chave dentro de literais não viram tokens"""
+        tokens = tokenize("select * from cliente where cliente.nome = 'joão and maria'")
+        self.assertEqual([t.value for t in tokens if t.kind == KEYWORD], ['select', 'from', 'where'])
+        self.assertEqual(tokens[-1].value, "'joão and maria'")
+
+    def test_04_relational_algebra_symbols(self):
+        """[LEXER] Símbolos ∧, ∨, ≥ e ≤ são traduzidos"""
+        values = [t.value for t in tokenize("c.preco≥10 ∧ c.preco≤20 ∨ c.id=1")]
+        self.assertEqual(values, ['c.preco', '>=', '10', 'and', 'c.preco', '<=', '20', 'or', 'c.id', '=', '1'])
+
+    def test_05_string_with_parenthesis(self):
+        """[LEXER] Parênteses dentro de literais não afetam o balanceamento"""
+        result = self.validator.validate("SELECT * FROM Cliente WHERE Cliente.Nome = 'a (b'")
+        self.assertNotIn('Parênteses não estão balanceados', result['errors'])
+
+    def test_06_invalid_operator(self):
+        """[LEXER] Operadores fora do conjunto suportado são reportados"""
+        errors = self.validator.validate_operators("select * from cliente where cliente.idcliente != 1")
+        self.assertEqual(errors, ["Operador '!=' não é válido"])
+
+    def test_07_long_query_linear(self):
+        """[LEXER] Consultas longas (centenas de KB) são tokenizadas uma única vez, um token por elemento"""
+        conditions = ' AND '.join(f"Cliente.idCliente <> {i}" for i in range(12000))
+        query = self.validator.normalize_query(f"SELECT * FROM Cliente WHERE {conditions}")
+        self.assertGreater(len(query), 200_000)
+        tokens = tokenize(query)
+        # select * from cliente where + 3 tokens por condição + 11999 AND
+        self.assertEqual(len(tokens), 5 + 3 * 12000 + 11999)
+        # a validação sintática trabalha sobre os tokens recebidos, sem nova passada do lexer
+        with mock.patch('app.tokenize', side_effect=AssertionError('consulta tokenizada de novo')):
+            errors, _ = self.validator.validate_syntax(query, tokens)
+        self.assertEqual(errors, [])
+
+    def test_08_negative_numbers(self):
+        """[LEXER] Sinal de menos em posição de operando faz parte do literal numérico"""
+        tokens = tokenize("c.idcliente = -1 and -2.5 < c.preco")
+        self.assertEqual([(t.kind, t.value) for t in tokens if t.kind == NUMBER], [(NUMBER, '-1'), (NUMBER, '-2.5')])
+        self.assertEqual([t.value for t in tokenize("a-1")], ['a', '-', '1'])
+        result = self.validator.validate("SELECT * FROM Cliente c WHERE c.idCliente = -1")
+        self.assertTrue(result['valid'], result['errors'])
+        self.assertEqual(parse(result['query']).where.right.value, -1)
+
+    def test_09_escaped_quote_in_string(self):
+        """[LEXER] Aspas duplicadas ('') dentro de um literal string são aceitas"""
+        tokens = tokenize("c.nome = 'it''s' and c.email = ''")
+        self.assertEqual([t.value for t in tokens if t.kind == STRING], ["'it''s'", "''"])
+        result = self.validator.validate("SELECT * FROM Cliente c WHERE c.Nome = 'it''s'")
+        self.assertTrue(result['valid'], result['errors'])
+        self.assertEqual(parse(result['query']).where.right.value, "it's")
+
+
+
+class TestParser(unittest.TestCase):
+    """Testes para o parser descendente recursivo (AST compartilhada)"""
+
+    def setUp(self):
+        self.validator = SQLValidator(METADATA)
+
+    def test_01_select_statement_ast(self):
+        """[PARSER] Consulta com alias, JOIN e WHERE gera a AST esperada"""
+        stmt = parse("select c.nome as n, p.datapedido from cliente c "
+                     "join pedido p on c.idcliente = p.cliente_idcliente where c.nome = 'ana'")
+        self.assertEqual([i.text for i in stmt.items], ['c.nome', 'p.datapedido'])
+        self.assertEqual(stmt.items[0].alias, 'n')
+        self.assertEqual(stmt.items[0].column, ColumnRef('c', 'nome'))
+        self.assertEqual([(t.name, t.alias) for t in stmt.tables], [('cliente', 'c'), ('pedido', 'p')])
+        self.assertEqual(stmt.aliases, {'c': 'cliente', 'p': 'pedido'})
+        self.assertEqual(stmt.joins[0].condition,
+                         Comparison(ColumnRef('c', 'idcliente'), '=', ColumnRef('p', 'cliente_idcliente')))
+        self.assertEqual(stmt.where, Comparison(ColumnRef('c', 'nome'), '=', Literal('STRING', "'ana'")))
+
+    def test_02_predicate_precedence(self):
+        """[PARSER] AND tem precedência sobre OR e parênteses são preservados"""
+        pred = parse_predicate("a.x = 1 or a.y = 2 and (a.z = 3 or a.w = 4)")
+        self.assertIsInstance(pred, BoolOp)
+        self.assertEqual(pred.op, 'or')
+        self.assertEqual(pred.operands[1].op, 'and')
+        self.assertEqual(format_predicate(pred), "a.x=1 ∨ a.y=2 ∧ (a.z=3 ∨ a.w=4)")
+
+    def test_03_formatted_predicate_roundtrip(self):
+        """[PARSER] Predicados na notação da álgebra relacional podem ser relidos"""
+        text = "c.nome='maria' ∧ p.datapedido≥'2024-01-01'"
+        self.assertEqual(format_predicate(parse_predicate(text)), text)
+
+    def test_04_where_before_from(self):
+        """[PARSER] WHERE antes de FROM é aceito"""
+        stmt = parse("select numero where numero >= 200 from endereco;")
+        self.assertEqual([t.name for t in stmt.tables], ['endereco'])
+        self.assertEqual(format_predicate(stmt.where), 'numero≥200')
+
+    def test_05_trailing_garbage_is_error(self):
+        """[PARSER] Conteúdo inesperado gera erro de sintaxe"""
+        with self.assertRaises(ParseError):
+            parse("select * from cliente where cliente.nome = 'a' extra")
+        result = self.validator.validate("SELECT * FROM Cliente WHERE Cliente.Nome = 'a' extra")
+        self.assertFalse(result['valid'])
+        self.assertTrue(any(e.startswith('Erro de sintaxe') for e in result['errors']))
+
+    def test_06_literals_are_not_attributes(self):
+        """[PARSER] Literais com ponto não são tratados como atributos"""
+        query = "SELECT * FROM Cliente WHERE Cliente.Email = 'joao@email.com'"
+        result = self.validator.validate(query)
+        self.assertTrue(result['valid'], result['errors'])
+        self.assertEqual(result['attributes_found'], ['cliente.email'])
+
+    def test_07_stages_agree(self):
+        """[PARSER] Validador, álgebra relacional e grafo usam as mesmas tabelas"""
+        result = self.validator.validate("SELECT numero WHERE numero >= 200 FROM endereco")
+        self.assertEqual(result['tables_found'], ['endereco'])
+        scans = [n['details']['table'] for n in result['operator_graph']['nodes'] if n['type'] == 'SCAN']
+        self.assertEqual(scans, ['endereco'])
+        self.assertEqual(result['relational_algebra'], 'π{numero}(σ{numero≥200}(endereco))')
+
+    def test_08_order_by(self):
+        """[PARSER] ORDER BY com ASC/DESC vira τ na álgebra e SORT abaixo da projeção"""
+        stmt = parse("select c.nome from cliente c where c.idcliente > 1 order by c.email desc, nome asc;")
+        self.assertEqual([(k.column.qualified, k.descending) for k in stmt.order_by],
+                         [('c.email', True), ('nome', False)])
+        with self.assertRaises(ParseError):
+            parse("select nome from cliente order by nome where idcliente = 1")
+        result = self.validator.validate("SELECT c.Nome FROM Cliente c ORDER BY c.Email DESC, c.Cpf")
+        self.assertIn("Atributo 'cpf' não existe na tabela 'cliente'", result['errors'])
+        result = self.validator.validate("SELECT c.Nome FROM Cliente c WHERE c.idCliente > 1 ORDER BY c.Email DESC")
+        self.assertTrue(result['valid'], result['errors'])
+        self.assertEqual(result['relational_algebra'], 'π{c.nome}(τ{c.email desc}(σ{c.idcliente>1}(c)))')
+        graph = result['optimized_graph']
+        sort = next(n for n in graph['nodes'] if n['type'] == 'SORT')
+        self.assertEqual(sort['details']['keys'], 'c.email desc')
+        self.assertIn({'from': sort['id'], 'to': graph['root']}, graph['edges'])
+
+    def test_09_select_items_must_be_attributes(self):
+        """[PARSER] Itens do SELECT que não são atributo, * ou tabela.* são rejeitados"""
+        for query in ("SELECT c.naoexiste + 1 FROM Cliente c",
+                      "SELECT qualquer coisa aqui FROM Cliente c",
+                      "SELECT DISTINCT c.nome FROM Cliente c"):
+            with self.subTest(query=query):
+                result = self.validator.validate(query)
+                self.assertFalse(result['valid'])
+                self.assertTrue(any(e.startswith('Erro de sintaxe') for e in result['errors']), result['errors'])
+        stmt = parse("select c.*, c.nome as n, * from cliente c")
+        self.assertEqual([(i.text, i.alias, i.column) for i in stmt.items],
+                         [('c.*', None, None), ('c.nome', 'n', ColumnRef('c', 'nome')), ('*', None, None)])
+
+
+    def test_10_nesting_limit(self):
+        """[PARSER] Parênteses aninhados além do limite são erro de sintaxe, não RecursionError"""
+        def nested(depth):
+            return "SELECT * FROM Cliente c WHERE " + "(" * depth + "c.idCliente = 1" + ")" * depth
+        self.assertTrue(self.validator.validate(nested(MAX_NESTING))['valid'])
+        with self.assertRaises(ParseError):
+            parse_predicate("(" * (MAX_NESTING + 1) + "a.x = 1" + ")" * (MAX_NESTING + 1))
+        response = app.test_client().post('/validate', json={'query': nested(1000)})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertFalse(body['valid'])
+        self.assertIn('parênteses aninhados demais', body['errors'][0])
+
+
+    def test_11_inner_join(self):
+        """[PARSER] INNER JOIN é aceito como sinônimo de JOIN"""
+        query = ("SELECT c.Nome FROM Cliente c INNER JOIN Pedido p ON c.idCliente = p.Cliente_idCliente "
+                 "WHERE p.idPedido > 1")
+        result = self.validator.validate(query)
+        self.assertTrue(result['valid'], result['errors'])
+        self.assertEqual(result['tables_found'], ['cliente', 'pedido'])
+        self.assertEqual(parse(result['query']), parse(result['query'].replace('inner join', 'join')))
+        with self.assertRaises(ParseError):
+            parse("select * from cliente c inner pedido p on c.idcliente = p.cliente_idcliente")
+
+
+if __name__ == '__main__':
+    unittest.main()
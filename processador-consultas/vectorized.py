@@ -0,0 +1,863 @@
+"""Execução vetorizada do grafo de operadores sobre colunas NumPy.
+
+Cada tabela é guardada como um array NumPy por atributo (ColumnarTable) e os
+operadores trocam lotes (Batch) de até BATCH_SIZE linhas em vez de tuplas:
+o SCAN entrega fatias dos arrays (sem cópia), a SELECTION avalia o predicado
+inteiro como uma máscara booleana sobre o lote, a PROJECTION apenas escolhe
+colunas do lote e as junções combinam lotes inteiros por índices.
+
+As comparações seguem a semântica do executor tupla a tupla (executor.py):
+textos sem diferenciar maiúsculas, nulos e tipos diferentes nunca satisfazem
+a comparação.
+
+Os lotes materializados pelas junções e pela ordenação contam no mesmo
+orçamento de memória do executor tupla a tupla; quando ele acaba, o operador
+converte os lotes em tuplas e usa os algoritmos em disco de spill.py,
+devolvendo o resultado novamente em lotes.
+"""
+import itertools
+import operator
+from collections import deque
+
+import numpy as np
+
+from executor import Operator, PlanBuilder, check_order, column_index, fold_case, key_function, merge_pairs
+from spill import (
+    MemoryBudget, Spiller, block_nested_loop, external_sort, grace_hash_join, partition, sort_key,
+)
+from sql_parser import Comparison, ColumnRef
+
+
+# Linhas por lote trocado entre os operadores
+BATCH_SIZE = 4096
+
+NUMBER, TEXT, MIXED = 'number', 'text', 'mixed'
+
+_COMPARE = {
+    '=': operator.eq, '<>': operator.ne, '<': operator.lt,
+    '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+}
+
+
+def kind_of(values: list) -> tuple:
+    """Tipo da coluna (número, texto ou misto) e dtype NumPy dos valores não nulos"""
+    dtype, kind = np.int64, None
+    for v in values:
+        if v is None:
+            continue
+        if isinstance(v, str):
+            new = TEXT
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            new = NUMBER
+            if isinstance(v, float):
+                dtype = np.float64
+        else:
+            return MIXED, object
+        if kind is not None and new != kind:
+            return MIXED, object
+        kind = new
+    if kind == TEXT:
+        return TEXT, object
+    return NUMBER, dtype
+
+
+class Column:
+    """Valores de um atributo: array NumPy, máscara de nulos e tipo.
+
+    Textos são mantidos como objetos (para devolver o valor original) e como
+    array de strings em caixa dobrada, usado nas comparações.
+    """
+
+    __slots__ = ('values', 'nulls', 'kind', '_folded')
+
+    def __init__(self, values, nulls=None, kind=NUMBER, folded=None):
+        self.values = values
+        self.nulls = nulls
+        self.kind = kind
+        self._folded = folded
+
+    @classmethod
+    def from_values(cls, values: list) -> 'Column':
+        kind, dtype = kind_of(values)
+        nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+        if not nulls.any():
+            nulls = None
+        if kind == NUMBER and nulls is not None:
+            values = [0 if v is None else v for v in values]
+        array = np.empty(len(values), dtype=object) if dtype is object else None
+        if array is not None:
+            array[:] = values
+        else:
+            array = np.asarray(values, dtype=dtype)
+        column = cls(array, nulls, kind)
+        if kind == TEXT:
+            # calculado uma vez na carga; os lotes recebem fatias dele
+            column.folded
+        return column
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def folded(self):
+        """Textos em caixa dobrada (array de strings NumPy), para comparações vetorizadas"""
+        if self._folded is None:
+            self._folded = np.array([v.casefold() if isinstance(v, str) else '' for v in self.values], dtype=str)
+        return self._folded
+
+    def valid(self):
+        """Máscara das linhas não nulas (None se não há nulos)"""
+        return None if self.nulls is None else ~self.nulls
+
+    def take(self, index) -> 'Column':
+        """Linhas escolhidas por fatia (sem cópia), máscara booleana ou vetor de posições"""
+        return Column(self.values[index],
+                      None if self.nulls is None else self.nulls[index],
+                      self.kind,
+                      None if self._folded is None else self._folded[index])
+
+    def to_list(self) -> list:
+        values = self.values.tolist()
+        if self.nulls is not None:
+            for i in np.flatnonzero(self.nulls).tolist():
+                values[i] = None
+        return values
+
+    @classmethod
+    def concat(cls, columns: list) -> 'Column':
+        kinds = {c.kind for c in columns}
+        kind = kinds.pop() if len(kinds) == 1 else MIXED
+        if kind == MIXED:
+            values = np.empty(sum(len(c) for c in columns), dtype=object)
+            values[:] = [v for c in columns for v in c.to_list()]
+            nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+            return cls(values, nulls if nulls.any() else None, MIXED)
+        values = np.concatenate([c.values for c in columns])
+        nulls = None
+        if any(c.nulls is not None for c in columns):
+            nulls = np.concatenate([c.nulls if c.nulls is not None else np.zeros(len(c), dtype=bool)
+                                    for c in columns])
+        folded = None
+        if kind == TEXT and all(c._folded is not None for c in columns):
+            folded = np.concatenate([c._folded for c in columns])
+        return cls(values, nulls, kind, folded)
+
+
+class ColumnarTable:
+    """Tabela em colunas: atributo -> Column, todas com `size` linhas"""
+
+    def __init__(self, columns: dict, size: int):
+        self.columns = columns
+        self.size = size
+
+    @classmethod
+    def from_rows(cls, names: tuple, rows: list) -> 'ColumnarTable':
+        transposed = list(zip(*rows)) if rows else [()] * len(names)
+        return cls({name: Column.from_values(list(values)) for name, values in zip(names, transposed)}, len(rows))
+
+
+class Batch:
+    """Lote de linhas trocado entre operadores: uma Column por atributo de saída"""
+
+    __slots__ = ('columns', 'size')
+
+    def __init__(self, columns: list, size: int):
+        self.columns = columns
+        self.size = size
+
+    def take(self, index, size: int) -> 'Batch':
+        return Batch([c.take(index) for c in self.columns], size)
+
+    def to_rows(self) -> list:
+        if not self.columns:
+            return [[] for _ in range(self.size)]
+        return [list(row) for row in zip(*(c.to_list() for c in self.columns))]
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos arrays do lote (textos contam pelo array em caixa dobrada)"""
+        total = 0
+        for c in self.columns:
+            total += c.values.nbytes
+            if c.nulls is not None:
+                total += c.nulls.nbytes
+            if c._folded is not None:
+                total += c._folded.nbytes
+        return total
+
+    @classmethod
+    def concat(cls, batches: list, width: int) -> 'Batch':
+        if not batches:
+            return cls([Column(np.empty(0, dtype=np.int64)) for _ in range(width)], 0)
+        if len(batches) == 1:
+            return batches[0]
+        return cls([Column.concat([b.columns[i] for b in batches]) for i in range(width)],
+                   sum(b.size for b in batches))
+
+
+# ==================== PREDICADOS ====================
+
+def compile_mask(pred, columns: tuple, labels: dict):
+    """Transforma a AST de um predicado em uma função lote -> máscara booleana"""
+    if isinstance(pred, Comparison):
+        return _comparison_mask(pred, columns, labels)
+    masks = [compile_mask(p, columns, labels) for p in pred.operands]
+    combine = np.logical_and if pred.op == 'and' else np.logical_or
+
+    def evaluate(batch):
+        result = masks[0](batch)
+        for mask in masks[1:]:
+            result = combine(result, mask(batch))
+        return result
+    return evaluate
+
+
+def _comparison_mask(pred, columns: tuple, labels: dict):
+    compare = _COMPARE[pred.op]
+    left, right = pred.left, pred.right
+    left_index = column_index(columns, left, labels) if isinstance(left, ColumnRef) else None
+    right_index = column_index(columns, right, labels) if isinstance(right, ColumnRef) else None
+
+    if left_index is None and right_index is None:
+        a, b = fold_case(left.value), fold_case(right.value)
+        constant = isinstance(a, str) == isinstance(b, str) and compare(a, b)
+        return lambda batch: np.full(batch.size, constant, dtype=bool)
+
+    if left_index is None or right_index is None:
+        # atributo comparado com literal (com o atributo sempre à esquerda)
+        if right_index is None:
+            index, value = left_index, right.value
+        else:
+            index, value, compare = right_index, left.value, _flipped(pred.op)
+        is_text = isinstance(value, str)
+        value = fold_case(value)
+
+        def evaluate(batch):
+            col = batch.columns[index]
+            if col.kind == MIXED:
+                return _elementwise(compare, col.values, np.full(batch.size, value, dtype=object))
+            if (col.kind == TEXT) != is_text:
+                return np.zeros(batch.size, dtype=bool)
+            result = compare(col.folded if is_text else col.values, value)
+            return _without_nulls(result, col)
+        return evaluate
+
+    def evaluate(batch):
+        a, b = batch.columns[left_index], batch.columns[right_index]
+        if a.kind == MIXED or b.kind == MIXED:
+            return _elementwise(compare, a.values, b.values)
+        if a.kind != b.kind:
+            return np.zeros(batch.size, dtype=bool)
+        if a.kind == TEXT:
+            result = compare(a.folded, b.folded)
+        else:
+            result = compare(a.values, b.values)
+        return _without_nulls(_without_nulls(result, a), b)
+    return evaluate
+
+
+def _flipped(op: str):
+    """Comparação equivalente com os operandos trocados (5 < x  ->  x > 5)"""
+    return _COMPARE[{'<': '>', '>': '<', '<=': '>=', '>=': '<='}.get(op, op)]
+
+
+def _without_nulls(mask, column: Column):
+    valid = column.valid()
+    return mask if valid is None else mask & valid
+
+
+def _elementwise(compare, left, right):
+    """Comparação valor a valor, para colunas com tipos misturados"""
+    def test(a, b):
+        a, b = fold_case(a), fold_case(b)
+        return a is not None and b is not None and isinstance(a, str) == isinstance(b, str) and compare(a, b)
+    return np.fromiter((test(a, b) for a, b in zip(left, right)), dtype=bool, count=len(left))
+
+
+# ==================== OPERADORES ====================
+
+class VectorOperator(Operator):
+    """Operador vetorizado: next() devolve um Batch (ou None quando acabam).
+
+    Os lotes são produzidos por um gerador criado no open(); `rows` conta as
+    linhas (não os lotes) produzidas.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._batches = None
+
+    def open(self):
+        super().open()
+        self._batches = self.batches()
+
+    def next(self):
+        batch = next(self._batches, None)
+        if batch is not None:
+            self.rows += batch.size
+        return batch
+
+    def close(self):
+        self._batches = None
+
+    def batches(self):
+        raise NotImplementedError
+
+
+class VectorScan(VectorOperator):
+    """Leitura da tabela em fatias de BATCH_SIZE linhas (visões dos arrays, sem cópia)"""
+
+    def __init__(self, label: str, names: tuple, table: ColumnarTable):
+        super().__init__()
+        self.label = label
+        self.columns = tuple((label, name) for name in names)
+        self.table = table
+        self._order = [table.columns[name] for name in names]
+
+    def batches(self):
+        for start in range(0, self.table.size, BATCH_SIZE):
+            stop = min(start + BATCH_SIZE, self.table.size)
+            yield Batch([c.take(slice(start, stop)) for c in self._order], stop - start)
+
+
+class VectorEmpty(VectorOperator):
+    """Relação vazia (predicado contraditório): não lê nenhuma tabela"""
+
+    def __init__(self, columns: tuple):
+        super().__init__()
+        self.columns = columns
+
+    def batches(self):
+        return iter(())
+
+
+class _VectorUnary(VectorOperator):
+    def __init__(self, child: VectorOperator):
+        super().__init__()
+        self.child = child
+
+    def open(self):
+        self.child.open()
+        super().open()
+
+    def close(self):
+        super().close()
+        self.child.close()
+
+    def children(self) -> list:
+        return [self.child]
+
+
+class VectorSelection(_VectorUnary):
+    """Filtra cada lote pela máscara booleana do predicado"""
+
+    def __init__(self, child: VectorOperator, mask):
+        super().__init__(child)
+        self.columns = child.columns
+        self.mask = mask
+
+    def batches(self):
+        while (batch := self.child.next()) is not None:
+            keep = self.mask(batch)
+            selected = int(np.count_nonzero(keep))
+            if selected == batch.size:
+                yield batch
+            elif selected:
+                yield batch.take(keep, selected)
+
+
+class VectorProjection(_VectorUnary):
+    """Escolhe colunas do lote (sem copiar os valores)"""
+
+    def __init__(self, child: VectorOperator, indexes: list):
+        super().__init__(child)
+        self.indexes = indexes
+        self.columns = tuple(child.columns[i] for i in indexes)
+
+    def batches(self):
+        while (batch := self.child.next()) is not None:
+            yield Batch([batch.columns[i] for i in self.indexes], batch.size)
+
+
+class VectorNestedLoopJoin(VectorOperator):
+    """Junção por laços aninhados vetorizada: a entrada direita é materializada e
+    cada bloco de linhas da esquerda é combinado com ela inteira por índices.
+
+    Sem predicado, é o produto cartesiano. Acima do orçamento de memória, usa
+    os laços aninhados em blocos sobre arquivo temporário de spill.py.
+    """
+
+    def __init__(self, left: VectorOperator, right: VectorOperator, mask=None,
+                 budget: MemoryBudget | None = None):
+        super().__init__()
+        self.left = left
+        self.right = right
+        self.mask = mask
+        self.budget = budget or MemoryBudget()
+        self.columns = left.columns + right.columns
+        self._spiller = Spiller(self.budget)
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spiller.bytes
+
+    def open(self):
+        self.left.open()
+        self._spiller = Spiller(self.budget)
+        super().open()
+
+    def close(self):
+        super().close()
+        self.left.close()
+        self._spiller.close()
+
+    def children(self) -> list:
+        return [self.left, self.right]
+
+    def batches(self):
+        held = _Materialized(self.budget)
+        try:
+            rest = held.fill(_drain(self.right))
+            if rest is not None:
+                # não coube: a entrada direita vai inteira para disco
+                held.release()
+                inner = self._spiller.write_all(_tuples(held.chain(rest)))
+                pairs = block_nested_loop(_tuples(_pull(self.left)), inner, self.budget)
+                yield from _rebatch((outer + inner_row for outer, inner_row in pairs), self.mask)
+                return
+            yield from self._join(Batch.concat(held.batches, len(self.right.columns)))
+        finally:
+            held.release()
+
+    def _join(self, inner: Batch):
+        if inner.size == 0:
+            return
+        # linhas da esquerda por bloco, para que cada combinação tenha cerca de BATCH_SIZE linhas
+        step = max(1, BATCH_SIZE // inner.size)
+        while (outer := self.left.next()) is not None:
+            for start in range(0, outer.size, step):
+                count = min(step, outer.size - start)
+                outer_index = np.repeat(np.arange(start, start + count), inner.size)
+                inner_index = np.tile(np.arange(inner.size), count)
+                combined = Batch([c.take(outer_index) for c in outer.columns] +
+                                 [c.take(inner_index) for c in inner.columns], len(outer_index))
+                if self.mask is None:
+                    yield combined
+                    continue
+                keep = self.mask(combined)
+                selected = int(np.count_nonzero(keep))
+                if selected:
+                    yield combined.take(keep, selected)
+
+
+class VectorHashJoin(VectorOperator):
+    """Hash join vetorizado sobre igualdades entre as entradas.
+
+    A entrada `build` é materializada e as suas chaves viram códigos inteiros:
+    para cada atributo da chave, a posição do valor entre os valores distintos
+    ordenados (np.unique), combinadas atributo a atributo e recompactadas. A
+    "tabela de hash" é o vetor de códigos ordenado; cada lote da outra entrada
+    é codificado com searchsorted sobre os mesmos valores e casado por faixas
+    (searchsorted à esquerda e à direita), sem laço por tupla. Atributos com
+    tipos misturados caem em um dicionário Python.
+
+    Se a entrada de construção não couber no orçamento de memória, a junção
+    vira o grace hash join de spill.py sobre as tuplas dos lotes.
+    """
+
+    def __init__(self, left: VectorOperator, right: VectorOperator, left_keys: list, right_keys: list,
+                 build: str = 'right', mask=None, budget: MemoryBudget | None = None):
+        super().__init__()
+        self.left = left
+        self.right = right
+        self.left_keys = left_keys
+        self.right_keys = right_keys
+        self.build = build
+        self.mask = mask
+        self.budget = budget or MemoryBudget()
+        self.columns = left.columns + right.columns
+        self._spiller = Spiller(self.budget)
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spiller.bytes
+
+    def _sides(self):
+        if self.build == 'left':
+            return self.left, self.left_keys, self.right, self.right_keys
+        return self.right, self.right_keys, self.left, self.left_keys
+
+    def open(self):
+        self._sides()[2].open()
+        self._spiller = Spiller(self.budget)
+        super().open()
+
+    def close(self):
+        super().close()
+        self._sides()[2].close()
+        self._spiller.close()
+
+    def children(self) -> list:
+        return [self.left, self.right]
+
+    def batches(self):
+        build_op, build_keys, probe_op, probe_keys = self._sides()
+        held = _Materialized(self.budget)
+        try:
+            rest = held.fill(_drain(build_op))
+            if rest is not None:
+                held.release()
+                yield from self._grace(held.chain(rest))
+                return
+            yield from self._join(Batch.concat(held.batches, len(build_op.columns)))
+        finally:
+            held.release()
+
+    def _grace(self, build_batches):
+        """Grace hash join sobre as tuplas dos lotes, com a saída reagrupada em lotes"""
+        _, build_keys, probe_op, probe_keys = self._sides()
+        build_key, probe_key = key_function(build_keys), key_function(probe_keys)
+        build_files = partition(_tuples(build_batches), build_key, 1, self._spiller)
+        probe_files = partition(_tuples(_pull(probe_op)), probe_key, 1, self._spiller)
+        pairs = grace_hash_join(build_files, probe_files, build_key, probe_key, self._spiller)
+        if self.build == 'left':
+            rows = (match + row for match, row in pairs)
+        else:
+            rows = (row + match for match, row in pairs)
+        yield from _rebatch(rows, self.mask)
+
+    def _join(self, build: Batch):
+        _, build_keys, probe_op, probe_keys = self._sides()
+        if build.size == 0:
+            return
+        index = _KeyIndex([build.columns[i] for i in build_keys], build.size)
+        while (probe := probe_op.next()) is not None:
+            probe_index, build_index = index.lookup([probe.columns[i] for i in probe_keys], probe.size)
+            if not len(probe_index):
+                continue
+            matched_build = [c.take(build_index) for c in build.columns]
+            matched_probe = [c.take(probe_index) for c in probe.columns]
+            if self.build == 'left':
+                combined = Batch(matched_build + matched_probe, len(probe_index))
+            else:
+                combined = Batch(matched_probe + matched_build, len(probe_index))
+            if self.mask is None:
+                yield combined
+                continue
+            keep = self.mask(combined)
+            selected = int(np.count_nonzero(keep))
+            if selected:
+                yield combined.take(keep, selected)
+
+
+class VectorMergeJoin(VectorOperator):
+    """Merge join sobre entradas ordenadas pela chave (executor.merge_pairs).
+
+    A intercalação avança tupla a tupla sobre as linhas dos lotes (só o grupo
+    da chave atual fica em memória) e o resultado é reagrupado em lotes.
+    """
+
+    def __init__(self, left: VectorOperator, right: VectorOperator, left_key: int, right_key: int, mask=None):
+        super().__init__()
+        self.left = left
+        self.right = right
+        self.left_key = left_key
+        self.right_key = right_key
+        self.mask = mask
+        self.columns = left.columns + right.columns
+
+    def children(self) -> list:
+        return [self.left, self.right]
+
+    def batches(self):
+        pairs = merge_pairs(_tuples(_drain(self.left)), _tuples(_drain(self.right)), self.left_key, self.right_key)
+        yield from _rebatch((left + right for left, right in pairs), self.mask)
+
+
+class VectorSort(_VectorUnary):
+    """Ordena a entrada pelas chaves, pares (posição, descendente).
+
+    Os lotes são concatenados e ordenados de uma vez por np.lexsort sobre o
+    posto de cada valor (nulos por último, primeiro em DESC); chaves com tipos
+    misturados usam a ordenação de Python. Acima do orçamento de memória, a
+    ordenação é a externa de spill.py. Com `presorted`, os lotes passam direto
+    (a ordem é conferida).
+    """
+
+    def __init__(self, child: VectorOperator, keys: list, budget: MemoryBudget | None = None,
+                 presorted: bool = False):
+        super().__init__(child)
+        self.columns = child.columns
+        self.keys = keys
+        self.budget = budget or MemoryBudget()
+        self.presorted = presorted
+        self._spiller = Spiller(self.budget)
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spiller.bytes
+
+    def open(self):
+        self._spiller = Spiller(self.budget)
+        super().open()
+
+    def close(self):
+        super().close()
+        self._spiller.close()
+
+    def batches(self):
+        key = sort_key(self.keys)
+        if self.presorted:
+            yield from _checked(_pull(self.child), key)
+            return
+        held = _Materialized(self.budget)
+        try:
+            rest = held.fill(_pull(self.child))
+            if rest is not None:
+                held.release()
+                yield from _rebatch(external_sort(_tuples(held.chain(rest)), key, self._spiller))
+                return
+            data = Batch.concat(held.batches, len(self.columns))
+            order = _sort_order(data, self.keys)
+            if order is None:
+                yield from _rebatch(sorted(_tuples([data]), key=key))
+                return
+            for start in range(0, data.size, BATCH_SIZE):
+                index = order[start:start + BATCH_SIZE]
+                yield data.take(index, len(index))
+        finally:
+            held.release()
+
+
+def _sort_order(batch: Batch, keys: list):
+    """Permutação estável que ordena o lote (None se alguma chave tem tipos misturados)"""
+    arrays = []
+    # np.lexsort usa a última chave como a principal
+    for index, descending in reversed(keys):
+        column = batch.columns[index]
+        if column.kind == MIXED:
+            return None
+        _, ranks = np.unique(_key_values(column), return_inverse=True)
+        nulls = column.nulls if column.nulls is not None else np.zeros(batch.size, dtype=bool)
+        if descending:
+            ranks, nulls = -ranks, ~nulls
+        arrays.extend([ranks, nulls])
+    return np.lexsort(arrays) if arrays else np.arange(batch.size)
+
+
+class _Materialized:
+    """Lotes guardados por um operador, reservados um a um no orçamento de memória"""
+
+    def __init__(self, budget: MemoryBudget):
+        self.budget = budget
+        self.batches = deque()
+        self.reserved = 0
+
+    def fill(self, batches):
+        """Guarda os lotes enquanto cabem; devolve None ou o iterador com o lote que
+        não coube e os seguintes"""
+        batches = iter(batches)
+        for batch in batches:
+            size = batch.nbytes
+            if not self.budget.reserve(size):
+                return itertools.chain([batch], batches)
+            self.reserved += size
+            self.batches.append(batch)
+        return None
+
+    def chain(self, rest):
+        """Os lotes guardados (liberados à medida que são consumidos) seguidos de `rest`"""
+        while self.batches:
+            yield self.batches.popleft()
+        yield from rest
+
+    def release(self):
+        self.budget.release(self.reserved)
+        self.reserved = 0
+
+
+def _checked(batches, key):
+    """Repassa os lotes, conferindo que as suas linhas, em sequência, estão na ordem de `key`"""
+    pending = deque()
+    for _ in check_order(_tuples(_remembered(batches, pending)), key):
+        while len(pending) > 1:
+            yield pending.popleft()
+    yield from pending
+
+
+def _remembered(batches, pending: deque):
+    """Repassa os lotes, guardando cada um em `pending` até ser liberado"""
+    for batch in batches:
+        pending.append(batch)
+        yield batch
+
+
+def _tuples(batches):
+    """Tuplas Python das linhas dos lotes"""
+    for batch in batches:
+        yield from zip(*(c.to_list() for c in batch.columns))
+
+
+def _rebatch(rows, mask=None):
+    """Agrupa tuplas em lotes de até BATCH_SIZE linhas (filtrados pela máscara, se houver)"""
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, BATCH_SIZE)):
+        batch = Batch([Column.from_values(list(values)) for values in zip(*chunk)], len(chunk))
+        if mask is None:
+            yield batch
+            continue
+        keep = mask(batch)
+        selected = int(np.count_nonzero(keep))
+        if selected:
+            yield batch.take(keep, selected)
+
+
+class _KeyIndex:
+    """Índice das chaves do lado de construção de um hash join vetorizado"""
+
+    def __init__(self, columns: list, size: int):
+        self.columns = columns
+        self.table = None
+        self.generic = any(c.kind == MIXED for c in columns)
+        if self.generic:
+            return
+        self.kinds = [c.kind for c in columns]
+        valid = np.ones(size, dtype=bool)
+        codes = np.zeros(size, dtype=np.int64)
+        self.levels = []
+        for column in columns:
+            values = _key_values(column)
+            distinct = np.unique(values)
+            column_codes = np.searchsorted(distinct, values)
+            combined = codes * len(distinct) + column_codes
+            combos, codes = np.unique(combined, return_inverse=True)
+            self.levels.append((distinct, combos))
+            valid &= _valid(column, size)
+        rows = np.flatnonzero(valid)
+        order = np.argsort(codes[rows], kind='stable')
+        self.rows = rows[order]
+        self.sorted_codes = codes[rows][order]
+
+    def lookup(self, columns: list, size: int) -> tuple:
+        """Pares (posições no lote, posições no lado de construção) com chaves iguais"""
+        if self.generic or any(c.kind == MIXED for c in columns):
+            return self._lookup_generic(columns)
+        found = np.ones(size, dtype=bool)
+        codes = np.zeros(size, dtype=np.int64)
+        for column, kind, (distinct, combos) in zip(columns, self.kinds, self.levels):
+            if column.kind != kind:
+                # texto contra número: nenhuma chave casa
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+            found &= _valid(column, size)
+            codes, hit = _positions(distinct, _key_values(column), codes, len(distinct))
+            found &= hit
+            codes, hit = _positions(combos, codes, None, None)
+            found &= hit
+        probe_rows = np.flatnonzero(found)
+        codes = codes[probe_rows]
+        low = np.searchsorted(self.sorted_codes, codes, side='left')
+        high = np.searchsorted(self.sorted_codes, codes, side='right')
+        counts = high - low
+        total = int(counts.sum())
+        probe_index = np.repeat(probe_rows, counts)
+        # posição de cada par dentro da faixa [low, high) da sua chave
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        build_index = self.rows[np.repeat(low, counts) + offsets]
+        return probe_index, build_index
+
+    def _lookup_generic(self, columns: list) -> tuple:
+        """Casamento por dicionário, valor a valor (chaves com tipos misturados)"""
+        if self.table is None:
+            self.table = {}
+            for row, key in enumerate(zip(*(c.to_list() for c in self.columns))):
+                key = tuple(fold_case(v) for v in key)
+                if None not in key:
+                    self.table.setdefault(key, []).append(row)
+        probe_index, build_index = [], []
+        for row, key in enumerate(zip(*(c.to_list() for c in columns))):
+            for match in self.table.get(tuple(fold_case(v) for v in key), ()):
+                probe_index.append(row)
+                build_index.append(match)
+        return np.asarray(probe_index, dtype=np.int64), np.asarray(build_index, dtype=np.int64)
+
+
+def _key_values(column: Column):
+    return column.folded if column.kind == TEXT else column.values
+
+
+def _valid(column: Column, size: int):
+    valid = column.valid()
+    return np.ones(size, dtype=bool) if valid is None else valid
+
+
+def _positions(distinct, values, prefix, radix) -> tuple:
+    """Posição de cada valor em `distinct` (ordenado) e se ele está lá; com `prefix`,
+    combina a posição ao código dos atributos anteriores (prefix * radix + posição)"""
+    if len(distinct) == 0:
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    position = np.searchsorted(distinct, values)
+    clipped = np.minimum(position, len(distinct) - 1)
+    hit = distinct[clipped] == values
+    if prefix is not None:
+        clipped = prefix * radix + clipped
+    return clipped, hit
+
+
+def _drain(op: VectorOperator):
+    op.open()
+    try:
+        yield from _pull(op)
+    finally:
+        op.close()
+
+
+def _pull(op: VectorOperator):
+    """Lotes de um operador já aberto"""
+    while (batch := op.next()) is not None:
+        yield batch
+
+
+# ==================== MONTAGEM DO PLANO ====================
+
+class VectorizedPlanBuilder(PlanBuilder):
+    """Monta a árvore de operadores vetorizados (mesmo grafo, mesmas regras do PlanBuilder)"""
+
+    def scan(self, label: str, table: str) -> VectorOperator:
+        return VectorScan(label, self.database.columns(table), self.database.columnar(table))
+
+    def empty(self, columns: tuple) -> VectorOperator:
+        return VectorEmpty(columns)
+
+    def selection(self, child, pred) -> VectorOperator:
+        return VectorSelection(child, compile_mask(pred, child.columns, self.labels))
+
+    def projection(self, child, indexes: list) -> VectorOperator:
+        return VectorProjection(child, indexes)
+
+    def sort(self, child, keys: list, presorted: bool = False) -> VectorOperator:
+        return VectorSort(child, keys, self.budget, presorted)
+
+    def join(self, left, right, pred) -> VectorOperator:
+        mask = compile_mask(pred, left.columns + right.columns, self.labels) if pred else None
+        return VectorNestedLoopJoin(left, right, mask, self.budget)
+
+    def hash_join(self, left, right, left_keys: list, right_keys: list, build: str, residual) -> VectorOperator:
+        mask = compile_mask(residual, left.columns + right.columns, self.labels) if residual else None
+        return VectorHashJoin(left, right, left_keys, right_keys, build, mask, self.budget)
+
+    def merge_join(self, left, right, left_key: int, right_key: int, residual) -> VectorOperator:
+        mask = compile_mask(residual, left.columns + right.columns, self.labels) if residual else None
+        return VectorMergeJoin(left, right, left_key, right_key, mask)
+
+    def fetch(self, root: VectorOperator, limit: int | None) -> list:
+        rows = []
+        root.open()
+        try:
+            while limit is None or len(rows) < limit:
+                batch = root.next()
+                if batch is None:
+                    break
+                rows.extend(batch.to_rows())
+        finally:
+            root.close()
+        return rows if limit is None else rows[:limit]